@@ -0,0 +1,368 @@
+# backfill.py
+#
+# Восстановление таблиц отчётов из истории каналов CHANNELS['activity']
+# и CHANNELS['interrogation']. Используется командой /backfill и как офлайн-CLI:
+#
+#     python backfill.py                      # оба канала, с контрольной точки
+#     python backfill.py --only activity      # только активность
+#     python backfill.py --reset              # начать заново
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+
+import discord
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import config  # DEVELOPMENT_GUILD_ID
+from database import SessionLocal, User, ActivityReport, InterrogationReport
+from ingest import (
+    extract_report_text,
+    parse_activity_report,
+    parse_interrogation_report,
+    report_hash,
+)
+from roles.constants import CHANNELS
+
+log = logging.getLogger("backfill")
+
+# Файл с контрольными точками: channel_id → последний обработанный message id
+CHECKPOINT_PATH = "backfill_checkpoint.json"
+# Размер страницы истории (столько же отдаёт Discord за один запрос)
+PAGE_SIZE = 100
+# Допросы восстанавливаем первыми — от них зависит interviews в отчётах активности
+BACKFILL_ORDER = ("interrogation", "activity")
+
+# Пересчёт interviews во всех отчётах активности затронутых недель пользователей:
+# после вставки отчётов активности — их собственных недель, после вставки
+# допросов — недель, в которые допросы добавились (отчёты там могли быть раньше).
+# date_trunc('week') в PostgreSQL начинает неделю с понедельника, как и weekday().
+_RECOUNT_INTERVIEWS = text("""
+    UPDATE activity_reports AS ar
+       SET interviews = (
+           SELECT count(*)
+             FROM interrogation_reports AS ir
+            WHERE ir.user_id = ar.user_id
+              AND ir.date BETWEEN date_trunc('week', ar.date)::date
+                              AND date_trunc('week', ar.date)::date + 6
+       )
+      FROM unnest(CAST(:user_ids AS integer[]), CAST(:weeks AS date[])) AS w(user_id, week)
+     WHERE ar.user_id = w.user_id
+       AND ar.date BETWEEN w.week AND w.week + 6
+""")
+
+class Checkpoint:
+    """Контрольные точки backfill в JSON-файле, чтобы прерванный прогон можно было продолжить."""
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self.data: dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = {k: int(v) for k, v in json.load(f).items()}
+
+    def get(self, channel_id: int) -> int | None:
+        return self.data.get(str(channel_id))
+
+    def set(self, channel_id: int, message_id: int):
+        self.data[str(channel_id)] = message_id
+        self.save()
+
+    def reset(self, channel_id: int):
+        self.data.pop(str(channel_id), None)
+        self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+
+class BackfillStats:
+    """Счётчики одного прогона по каналу."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.fetched = 0
+        self.parsed = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self._started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def tick(self):
+        self.elapsed = time.perf_counter() - self._started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.inserted / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.kind}: сообщений {self.fetched}, отчётов {self.parsed}, "
+            f"вставлено {self.inserted}, дублей {self.duplicates}, пропущено {self.skipped} "
+            f"за {self.elapsed:.1f} c ({self.rows_per_sec:.1f} строк/с)"
+        )
+
+
+def build_callsign_index(members) -> dict[str, int]:
+    """Позывной (в нижнем регистре) → discord id. display_name важнее name, как в Events."""
+    index: dict[str, int] = {}
+    for m in members:
+        if m.name:
+            index.setdefault(m.name.lower(), m.id)
+    for m in members:
+        if m.display_name:
+            index[m.display_name.lower()] = m.id
+    return index
+
+
+# ─────────────────── Разбор и запись (в пуле потоков) ───────────────────
+def _parse_page(kind: str, items: list[tuple[int, int, str]], index: dict[str, int]):
+    rows = []
+    for message_id, author_id, raw in items:
+        if kind == "activity":
+            parsed = parse_activity_report(raw)
+            if not parsed:
+                continue
+            call_sign, duties, date = parsed
+        else:
+            parsed = parse_interrogation_report(raw)
+            if not parsed:
+                continue
+            call_sign, date = parsed
+            duties = 0
+        rows.append({
+            "message_id": message_id,
+            "discord_id": index.get(call_sign.lower(), author_id),
+            "call_sign": call_sign,
+            "date": date,
+            "duties": duties,
+            "content_hash": report_hash(raw),
+        })
+    return rows, items[-1][0]
+
+
+def _ensure_users(db, rows: list[dict]) -> dict[int, int]:
+    """discord id → users.id; недостающих пользователей создаёт одним INSERT."""
+    wanted: dict[int, str] = {}
+    for r in rows:
+        wanted.setdefault(r["discord_id"], r["call_sign"])
+
+    existing = dict(db.execute(
+        select(User.discord_id, User.id).where(User.discord_id.in_(list(wanted)))
+    ).all())
+    missing = [
+        {"discord_id": did, "call_sign": cs, "black_mark": False}
+        for did, cs in wanted.items() if did not in existing
+    ]
+    if missing:
+        # позывной может быть уже занят другим пользователем — такие строки пропускаем
+        db.execute(pg_insert(User).values(missing).on_conflict_do_nothing())
+        existing.update(db.execute(
+            select(User.discord_id, User.id)
+            .where(User.discord_id.in_([m["discord_id"] for m in missing]))
+        ).all())
+    return existing
+
+
+def _write_page(kind: str, rows: list[dict]) -> tuple[int, int, int]:
+    """Пишет страницу одной транзакцией. Возвращает (вставлено, дублей, пропущено)."""
+    if not rows:
+        return 0, 0, 0
+    model = ActivityReport if kind == "activity" else InterrogationReport
+    db = SessionLocal()
+    try:
+        user_ids = _ensure_users(db, rows)
+
+        # репосты: такой же текст от того же пользователя уже есть в БД или на странице
+        hashes = {r["content_hash"] for r in rows}
+        seen_hashes = set(db.execute(
+            select(model.user_id, model.content_hash)
+            .where(model.user_id.in_(set(user_ids.values())), model.content_hash.in_(hashes))
+        ).all())
+
+        payload = []
+        skipped = 0
+        for r in rows:
+            uid = user_ids.get(r["discord_id"])
+            if uid is None:
+                skipped += 1
+                continue
+            key = (uid, r["content_hash"])
+            if key in seen_hashes:
+                continue
+            seen_hashes.add(key)
+            row = {
+                "user_id": uid,
+                "date": r["date"],
+                "source_message_id": r["message_id"],
+                "content_hash": r["content_hash"],
+            }
+            if kind == "activity":
+                row["duties"] = r["duties"]
+                row["interviews"] = 0
+            payload.append(row)
+
+        inserted = []
+        if payload:
+            # список словарей → executemany (psycopg2 склеивает в пачки VALUES);
+            # уже известные message id отсекает уникальный индекс
+            inserted = db.execute(
+                pg_insert(model)
+                .on_conflict_do_nothing(index_elements=[model.source_message_id])
+                .returning(model.user_id, model.date),
+                payload
+            ).all()
+        if inserted:
+            weeks = {(uid, date - datetime.timedelta(days=date.weekday())) for uid, date in inserted}
+            db.execute(_RECOUNT_INTERVIEWS, {
+                "user_ids": [uid for uid, _ in weeks],
+                "weeks": [week for _, week in weeks],
+            })
+        db.commit()
+        return len(inserted), len(rows) - len(inserted) - skipped, skipped
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ─────────────────── Прогон по каналу ───────────────────
+async def backfill_channel(
+    channel: discord.TextChannel,
+    kind: str,
+    index: dict[str, int],
+    checkpoint: Checkpoint,
+    *,
+    self_id: int | None = None,
+    progress=None
+) -> BackfillStats:
+    """
+    Листает историю канала от контрольной точки к новым сообщениям.
+    Пока страница разбирается в пуле потоков, следующая уже скачивается;
+    запись идёт постранично, после каждой страницы сохраняется контрольная точка.
+    """
+    stats = BackfillStats(kind)
+    loop = asyncio.get_running_loop()
+    pages: asyncio.Queue = asyncio.Queue(maxsize=4)
+    after_id = checkpoint.get(channel.id)
+    after = discord.Object(id=after_id) if after_id else None
+
+    async def produce():
+        try:
+            page = []
+            async for msg in channel.history(limit=None, after=after, oldest_first=True):
+                stats.fetched += 1
+                if self_id and msg.author.id == self_id:
+                    continue
+                page.append((msg.id, msg.author.id, extract_report_text(msg)))
+                if len(page) >= PAGE_SIZE:
+                    await pages.put(loop.run_in_executor(None, _parse_page, kind, page, index))
+                    page = []
+            if page:
+                await pages.put(loop.run_in_executor(None, _parse_page, kind, page, index))
+        finally:
+            await pages.put(None)
+
+    producer = asyncio.create_task(produce())
+    seen: set[int] = set()
+    try:
+        while True:
+            fut = await pages.get()
+            if fut is None:
+                break
+            rows, last_id = await fut
+            fresh = [r for r in rows if r["message_id"] not in seen]
+            seen.update(r["message_id"] for r in fresh)
+            stats.parsed += len(rows)
+            stats.duplicates += len(rows) - len(fresh)
+
+            inserted, dups, skipped = await asyncio.to_thread(_write_page, kind, fresh)
+            stats.inserted += inserted
+            stats.duplicates += dups
+            stats.skipped += skipped
+            checkpoint.set(channel.id, last_id)
+            stats.tick()
+            log.info("[backfill] %s", stats.summary())
+            if progress:
+                await progress(stats)
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+    stats.tick()
+    return stats
+
+
+async def run_backfill(
+    guild: discord.Guild,
+    members,
+    *,
+    kinds=BACKFILL_ORDER,
+    reset: bool = False,
+    self_id: int | None = None,
+    checkpoint_path: str = CHECKPOINT_PATH,
+    progress=None
+) -> list[BackfillStats]:
+    checkpoint = Checkpoint(checkpoint_path)
+    index = build_callsign_index(members)
+    results = []
+    for kind in BACKFILL_ORDER:
+        if kind not in kinds:
+            continue
+        channel = guild.get_channel(CHANNELS[kind]) or await guild.fetch_channel(CHANNELS[kind])
+        if reset:
+            checkpoint.reset(channel.id)
+        results.append(await backfill_channel(
+            channel, kind, index, checkpoint, self_id=self_id, progress=progress
+        ))
+    return results
+
+
+# ─────────────────── CLI ───────────────────
+async def _main(args):
+    load_dotenv(dotenv_path="token.env")
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        raise RuntimeError("Не найден DISCORD_TOKEN в token.env")
+
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    client = discord.Client(intents=intents)
+    # подключение к gateway не нужно — достаточно REST
+    await client.login(token)
+    try:
+        guild = await client.fetch_guild(config.DEVELOPMENT_GUILD_ID)
+        members = [m async for m in guild.fetch_members(limit=None)]
+        kinds = (args.only,) if args.only else BACKFILL_ORDER
+        results = await run_backfill(
+            guild, members,
+            kinds=kinds,
+            reset=args.reset,
+            self_id=client.user.id,
+            checkpoint_path=args.checkpoint
+        )
+        for st in results:
+            print(st.summary())
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Восстановление отчётов из истории каналов")
+    parser.add_argument("--only", choices=BACKFILL_ORDER, help="обработать только один канал")
+    parser.add_argument("--reset", action="store_true", help="игнорировать контрольную точку")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="путь к файлу контрольных точек")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
@@ -1,4 +1,7 @@
 import os
+import time
+import signal
+import asyncio
 import logging
 from dotenv import load_dotenv
 
@@ -6,6 +9,14 @@ import discord
 from discord.ext import commands
 
 import config
+import instrumentation
+import logconfig
+import metrics
+import slowlog
+import watchdog
+from scheduler import Scheduler
+from supervisor import TaskSupervisor
+import database
 
 # Загрузка токена
 load_dotenv(dotenv_path="token.env")
@@ -13,8 +24,14 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 if not TOKEN:
     raise RuntimeError("Не найден DISCORD_TOKEN в token.env")
 
-# Логирование
-logging.basicConfig(level=logging.INFO)
+# Логирование: JSON в файл с ротацией, запись в отдельном потоке
+logconfig.setup_logging(
+    level=config.LOG_LEVEL,
+    levels=config.LOG_LEVELS,
+    sample=config.LOG_SAMPLE,
+    path=config.LOG_PATH,
+    console_format=config.LOG_CONSOLE_FORMAT
+)
 
 # Интенты
 intents = discord.Intents.default()
@@ -39,19 +56,83 @@ INITIAL_EXTENSIONS = [
     "commands.info",
     "commands.steam",
     "commands.results",
+    "commands.inactive",
     "commands.fullclearroles",
     "commands.jltinfo",
-    "commands.logs"
+    "commands.logs",
+    "commands.backfill",
+    "commands.botstats",
+    "commands.tasks",
+    "commands.reconcile",
 ]
 
 class JIBot(commands.Bot):
     def __init__(self):
         # Отключаем текстовый префикс — оставляем только слэш-команды
-        super().__init__(command_prefix=lambda *_: [], intents=intents, help_command=None)
+        super().__init__(
+            command_prefix=lambda *_: [],
+            intents=intents,
+            help_command=None,
+            tree_cls=instrumentation.InstrumentedTree
+        )
         self.logger = logging.getLogger("JIBot")
         self._synced = False  # чтобы синхронизировать только один раз
+        self.shutting_down = False
+        # все фоновые циклы и отложенные задачи — под надзором (см. /tasks)
+        self.supervisor = TaskSupervisor(config.MAX_BACKGROUND_TASKS)
+        self._shutdown_task: asyncio.Task | None = None
 
     async def setup_hook(self):
+        # Замеры команд, SQL и REST — до загрузки Cog-ов
+        instrumentation.install(self)
+        slowlog.install(
+            database.engine, config.SLOW_QUERY_MS, config.SLOW_QUERY_LOG_PATH,
+            explain=config.SLOW_QUERY_EXPLAIN
+        )
+        self.supervisor.spawn(
+            "botstats-dump",
+            lambda: instrumentation.dump_periodically(config.BOTSTATS_DUMP_PATH, config.BOTSTATS_DUMP_INTERVAL),
+            restart=True
+        )
+
+        # Сторож цикла событий: кто и где блокирует цикл
+        watchdog.start(
+            config.WATCHDOG_THRESHOLD_MS,
+            profile_path=config.WATCHDOG_PROFILE_PATH,
+            sample_hz=config.WATCHDOG_SAMPLE_HZ
+        )
+
+        # Метрики для Prometheus: лаг цикла событий и HTTP-эндпоинт
+        self.supervisor.spawn("loop-lag", metrics.monitor_loop_lag, restart=True)
+        self.metrics_runner = None
+        if config.METRICS_PORT:
+            try:
+                self.metrics_runner = await metrics.start_metrics_server(
+                    self, config.METRICS_HOST, config.METRICS_PORT
+                )
+            except OSError as e:
+                self.logger.exception(f"❌ Не удалось запустить эндпоинт метрик: {e}")
+
+        # Пул БД: открываем соединения заранее и следим за утечками
+        try:
+            warmed = await asyncio.to_thread(database.warm_pool)
+            self.logger.info(f"✅ Пул БД прогрет: {warmed} соединений")
+        except Exception as e:
+            self.logger.exception(f"❌ Не удалось прогреть пул БД: {e}")
+        self.supervisor.spawn("db-pool-monitor", database.monitor_pool, restart=True)
+
+        # Отложенные задачи (снятие временных ролей, конец отпусков) — переживают перезапуск
+        self.scheduler = Scheduler(config.SCHEDULER_STATE_PATH)
+        self.scheduler.start(self.supervisor, wait_until_ready=self.wait_until_ready)
+
+        # SIGTERM → упорядоченная остановка (на Windows сигналов в цикле нет)
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except NotImplementedError:
+            pass
+
         # Загружаем все ваши Cog-ы
         for ext in INITIAL_EXTENSIONS:
             try:
@@ -60,6 +141,66 @@ class JIBot(commands.Bot):
             except Exception as e:
                 self.logger.exception(f"❌ Не удалось загрузить {ext}: {e}")
 
+    # ─────────────────── Остановка ───────────────────
+    async def close(self):
+        # close() зовут и обработчик SIGTERM, и bot.run() — последовательность выполняем один раз
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self._graceful_shutdown())
+        await asyncio.shield(self._shutdown_task)
+        started = time.perf_counter()
+        await super().close()
+        self.logger.info(f"Остановка: отключение от Discord — {(time.perf_counter() - started) * 1000:.0f} мс")
+        # последним дописываем очередь логов
+        logconfig.stop_logging()
+
+    async def _phase(self, name: str, coro, timeout: float):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(coro, timeout)
+            status = "ок"
+        except asyncio.TimeoutError:
+            status = f"не уложились в {timeout:.0f} c"
+        except Exception:
+            self.logger.exception(f"Остановка: ошибка на этапе «{name}»")
+            status = "ошибка"
+        self.logger.info(f"Остановка: {name} — {(time.perf_counter() - started) * 1000:.0f} мс ({status})")
+
+    async def _graceful_shutdown(self):
+        started = time.perf_counter()
+        # 1) новые команды и отчёты больше не принимаем (см. InstrumentedTree и Events)
+        self.shutting_down = True
+        self.logger.info("Остановка: новые команды и отчёты не принимаются")
+
+        # 2) дописываем очереди отчётов
+        await self._phase("очереди отчётов", self._drain_queues(), config.SHUTDOWN_DRAIN_TIMEOUT)
+
+        # 3) сохраняем расписание; выполняющимся задачам даём доработать
+        if hasattr(self, "scheduler"):
+            await self._phase(
+                "планировщик", self.scheduler.stop(config.SHUTDOWN_DRAIN_TIMEOUT),
+                config.SHUTDOWN_DRAIN_TIMEOUT + 5
+            )
+
+        # 4) фоновые задачи, метрики, финальная выгрузка статистики
+        await self._phase("фоновые задачи", self._stop_background(), 10)
+
+        # 5) закрываем пул БД
+        await self._phase("пул БД", asyncio.to_thread(database.engine.dispose), 10)
+        self.logger.info(f"Остановка: всего {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    async def _drain_queues(self):
+        events = self.get_cog("Events")
+        if events is not None:
+            await events.reports.stop(config.SHUTDOWN_DRAIN_TIMEOUT)
+            await events.ingest.stop()
+
+    async def _stop_background(self):
+        await self.supervisor.stop()
+        watchdog.stop()
+        if getattr(self, "metrics_runner", None) is not None:
+            await self.metrics_runner.cleanup()
+        await asyncio.to_thread(instrumentation.dump, config.BOTSTATS_DUMP_PATH, instrumentation.snapshot())
+
     async def on_ready(self):
         # Синхронизируем команды в DEVELOPMENT-гильдии при первом on_ready
         if not self._synced:
@@ -86,4 +227,5 @@ class JIBot(commands.Bot):
 
 if __name__ == "__main__":
     bot = JIBot()
-    bot.run(TOKEN)
+    # log_handler=None: логирование уже настроено в logconfig
+    bot.run(TOKEN, log_handler=None)
@@ -15,22 +15,8 @@ from roles.constants import (
     CORPS_MAP,
     VACATION_MAP,
     POST_MAP,
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-    curator_id,
-    worker_office_id,
-    master_office_id,
 )
+from roles import permissions
 
 # Собираем все мапы ролей
 ROLE_MAP = {}
@@ -42,25 +28,6 @@ ROLE_MAP.update(POST_MAP)
 # ID ролей, которые можно выдавать через эту команду
 ALLOWED_ROLE_IDS = set(ROLE_MAP.values())
 
-# Роли, которым разрешено вызывать /addrole
-ALLOWED_ISSUER_ROLES = [
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-    curator_id,
-    worker_office_id,
-    master_office_id,
-]
-
 
 class AddRoleCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -75,7 +42,7 @@ class AddRoleCog(commands.Cog):
         role="Роль для выдачи (выберите из списка)",
         member="Пользователь, которому выдаём роль (по умолчанию — вы)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("addrole")
     async def slash_addrole(
         self,
         interaction: discord.Interaction,
@@ -165,21 +132,8 @@ class AddRoleCog(commands.Cog):
     @slash_addrole.error
     async def slash_addrole_error(self, interaction: discord.Interaction, error):
         # Если у пользователя нет одной из спец-ролей
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступ к этой команде.",
-                color=discord.Color.red(),
-                timestamp=datetime.datetime.utcnow()
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         # Прочие ошибки
         logging.exception("Необработанная ошибка в slash_addrole")
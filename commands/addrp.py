@@ -11,32 +11,8 @@ from discord.ext import commands
 
 from database import get_db, User, RPEntry
 import config  # DEVELOPMENT_GUILD_ID и EMBLEM_URL в config.py
-from roles.constants import (
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-)
-
-# Роли, которым разрешено вызывать /addrp и /removerp
-ALLOWED_ISSUER_ROLES = [
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-]
+from roles import permissions
+
 
 class RPCommands(commands.Cog):
     """Cog для выдачи и списания RP через слэш-команды /addrp и /removerp"""
@@ -127,7 +103,7 @@ class RPCommands(commands.Cog):
         amount="Количество очков (>0)",
         reason="Причина"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("addrp")
     async def slash_addrp(
         self,
         interaction: discord.Interaction,
@@ -163,7 +139,7 @@ class RPCommands(commands.Cog):
         amount="Количество очков (>0)",
         reason="Причина списания"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("removerp")
     async def slash_removerp(
         self,
         interaction: discord.Interaction,
@@ -191,19 +167,8 @@ class RPCommands(commands.Cog):
 
     @slash_addrp.error
     async def slash_addrp_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            err = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            err.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=err, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Ошибка в slash_addrp/removerp")
         if interaction.response.is_done():
@@ -0,0 +1,107 @@
+# commands/backfill.py
+
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
+from backfill import BACKFILL_ORDER, run_backfill
+from roles import permissions
+
+
+class BackfillCog(commands.Cog):
+    """
+    Cog для слэш-команды /backfill:
+      перечитывает историю каналов отчётов и дописывает недостающие записи в БД.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._lock = asyncio.Lock()
+
+    async def _reply(self, interaction: discord.Interaction, **kwargs):
+        # прогон может идти дольше жизни interaction-токена (15 минут) — тогда пишем в канал
+        try:
+            await interaction.followup.send(**kwargs)
+        except discord.HTTPException:
+            await interaction.channel.send(**kwargs)
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="backfill",
+        description="Восстановить отчёты из истории каналов активности и допросов"
+    )
+    @app_commands.describe(
+        channel="Какой канал обработать (по умолчанию — оба)",
+        reset="Начать с начала истории, игнорируя контрольную точку"
+    )
+    @app_commands.choices(channel=[
+        app_commands.Choice(name="Активность", value="activity"),
+        app_commands.Choice(name="Допросы", value="interrogation"),
+    ])
+    @permissions.check("backfill")
+    async def slash_backfill(
+        self,
+        interaction: discord.Interaction,
+        channel: Optional[app_commands.Choice[str]] = None,
+        reset: bool = False
+    ):
+        if self._lock.locked():
+            return await interaction.response.send_message(
+                "❗ Восстановление уже выполняется.", ephemeral=True
+            )
+
+        await interaction.response.defer(thinking=True)
+        kinds = (channel.value,) if channel else BACKFILL_ORDER
+        async with self._lock:
+            try:
+                results = await run_backfill(
+                    interaction.guild,
+                    interaction.guild.members,
+                    kinds=kinds,
+                    reset=reset,
+                    self_id=self.bot.user.id
+                )
+            except Exception as e:
+                logging.exception("Ошибка при выполнении backfill")
+                return await self._reply(interaction, content=f"❗ Восстановление прервано: {e}")
+
+        em = discord.Embed(
+            title="✅ Восстановление отчётов завершено",
+            color=discord.Color.from_rgb(255, 255, 255),
+            timestamp=datetime.datetime.utcnow()
+        )
+        em.set_thumbnail(url=config.EMBLEM_URL)
+        for st in results:
+            em.add_field(
+                name="Активность" if st.kind == "activity" else "Допросы",
+                value=(
+                    f"• Сообщений — {st.fetched}\n"
+                    f"• Отчётов — {st.parsed}\n"
+                    f"• Вставлено — {st.inserted}\n"
+                    f"• Дублей — {st.duplicates}\n"
+                    f"• Пропущено — {st.skipped}\n"
+                    f"• {st.elapsed:.1f} c, {st.rows_per_sec:.1f} строк/с"
+                ),
+                inline=True
+            )
+        await self._reply(interaction, embed=em)
+
+    @slash_backfill.error
+    async def slash_backfill_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
+
+        logging.exception("Необработанная ошибка в slash_backfill")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
+        else:
+            await interaction.followup.send("❗ Произошла ошибка.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(BackfillCog(bot))
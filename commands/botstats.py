@@ -0,0 +1,94 @@
+# commands/botstats.py
+
+import datetime
+import logging
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL, BOTSTATS_DUMP_PATH
+import instrumentation
+from roles import permissions
+
+
+# Сколько самых медленных команд показывать в эмбеде
+TOP_N = 15
+
+
+class BotStatsCog(commands.Cog):
+    """
+    Cog для слэш-команды /botstats:
+      время выполнения, время до defer, SQL и REST по каждой команде.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    def _build_embed(self) -> discord.Embed:
+        em = discord.Embed(
+            title="Judgement Investigation — Статистика команд",
+            color=discord.Color.from_rgb(255, 255, 255),
+            timestamp=datetime.datetime.utcnow()
+        )
+        em.set_thumbnail(url=config.EMBLEM_URL)
+
+        totals = instrumentation.TOTALS
+        em.description = (
+            f"SQL-запросов всего: **{totals['db_queries']}** ({totals['db_ms']:.0f} мс)\n"
+            f"REST-вызовов всего: **{totals['rest_calls']}**\n"
+            f"Задержка gateway: **{self.bot.latency * 1000:.0f} мс**"
+        )
+
+        ranked = sorted(
+            instrumentation.COMMANDS.items(),
+            key=lambda kv: kv[1].wall_ms.quantile(0.95),
+            reverse=True
+        )
+        for name, st in ranked[:TOP_N]:
+            calls = st.calls or 1
+            em.add_field(
+                name=f"/{name}",
+                value=(
+                    f"• Вызовов — {st.calls} (ошибок {st.errors})\n"
+                    f"• Время p50/p95 — {st.wall_ms.quantile(0.5):.0f}/{st.wall_ms.quantile(0.95):.0f} мс\n"
+                    f"• До defer p95 — {st.defer_ms.quantile(0.95):.0f} мс\n"
+                    f"• SQL — {st.db_queries.sum / calls:.1f} запр., {st.db_ms.sum / calls:.0f} мс\n"
+                    f"• REST — {st.rest_calls.sum / calls:.1f}"
+                ),
+                inline=True
+            )
+        if not ranked:
+            em.add_field(name="\u200b", value="Пока нет данных.", inline=False)
+        em.set_footer(text=f"Полная выгрузка: {config.BOTSTATS_DUMP_PATH}")
+        return em
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="botstats",
+        description="Статистика производительности слэш-команд"
+    )
+    @permissions.check("botstats")
+    async def slash_botstats(self, interaction: discord.Interaction):
+        await interaction.response.send_message(embed=self._build_embed(), ephemeral=True)
+
+    @slash_botstats.error
+    async def slash_botstats_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
+
+        logging.exception("Необработанная ошибка в slash_botstats")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
+        else:
+            await interaction.followup.send("❗ Произошла ошибка.", ephemeral=True)
+
+    async def cog_unload(self):
+        # при выгрузке сохраняем последний снимок
+        try:
+            instrumentation.dump(config.BOTSTATS_DUMP_PATH)
+        except OSError:
+            logging.exception("Не удалось сохранить статистику команд")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(BotStatsCog(bot))
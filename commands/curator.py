@@ -1,7 +1,9 @@
 # commands/curator.py
 
+import asyncio
 import datetime
 import logging
+import re
 from sqlalchemy.exc import SQLAlchemyError
 
 import discord
@@ -9,39 +11,12 @@ from discord import app_commands
 from discord.ext import commands
 
 import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
-from database import get_db, User
-from roles.constants import (
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-    curator_id,
-)
+import curators
+from database import db_session, User
+from pagination import Paginator, chunk
+from roles import permissions
+from rules import RULES
 
-# Роли, которым разрешено пользоваться curator-командами
-ALLOWED_CURATOR_ROLES = [
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-    curator_id,
-]
 
 # URL вашего bottom-изображения
 LEGENDS_URL = (
@@ -49,12 +24,32 @@ LEGENDS_URL = (
     "1303690765163036672/1360325913761415200/Legends.png"
 )
 
+# Строк на странице /mentees и /curatorload
+PAGE_SIZE = 15
+
+# Упоминание или голый ID участника в текстовом параметре
+MEMBER_REF_RE = re.compile(r"<@!?(\d+)>|\b(\d{15,20})\b")
+
+
+def _parse_members(guild: discord.Guild, text: str) -> dict[int, str]:
+    """discord id → отображаемое имя для всех упомянутых участников сервера."""
+    out: dict[int, str] = {}
+    for a, b in MEMBER_REF_RE.findall(text or ""):
+        m = guild.get_member(int(a or b))
+        if m is not None:
+            out[m.id] = m.display_name
+    return out
+
 class CuratorCog(commands.Cog):
     """
     Cog для управления куратором через слэш-команды:
       • /assigncurator — назначить куратора
       • /removecurator  — удалить куратора
       • /whoiscurator   — узнать куратора
+      • /mentees        — подопечные куратора с недельной нормой
+      • /curatorload    — нагрузка кураторов
+      • /reassigncurator   — все подопечные одного куратора → другому
+      • /distributementees — раздать участников кураторам по нагрузке
     """
 
     def __init__(self, bot: commands.Bot):
@@ -90,7 +85,7 @@ class CuratorCog(commands.Cog):
         member="Пользователь, которому назначаем куратора",
         curator="Кто станет куратором"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_CURATOR_ROLES)
+    @permissions.check("assigncurator")
     async def assigncurator(
         self,
         interaction: discord.Interaction,
@@ -99,23 +94,23 @@ class CuratorCog(commands.Cog):
     ):
         """Сохраняет в БД, что curator теперь куратор для member."""
         await interaction.response.defer(thinking=True)
-        db = next(get_db())
         try:
-            # 1) User для member
-            user = db.query(User).filter_by(discord_id=member.id).first()
-            if not user:
-                user = User(discord_id=member.id, call_sign=member.display_name)
-                db.add(user); db.flush()
-
-            # 2) User для curator
-            cur = db.query(User).filter_by(discord_id=curator.id).first()
-            if not cur:
-                cur = User(discord_id=curator.id, call_sign=curator.display_name)
-                db.add(cur); db.flush()
-
-            # 3) Привязываем
-            user.curator_id = cur.id
-            db.commit()
+            async with db_session() as db:
+                # 1) User для member
+                user = db.query(User).filter_by(discord_id=member.id).first()
+                if not user:
+                    user = User(discord_id=member.id, call_sign=member.display_name)
+                    db.add(user); db.flush()
+
+                # 2) User для curator
+                cur = db.query(User).filter_by(discord_id=curator.id).first()
+                if not cur:
+                    cur = User(discord_id=curator.id, call_sign=curator.display_name)
+                    db.add(cur); db.flush()
+
+                # 3) Привязываем
+                user.curator_id = cur.id
+                db.commit()
 
             em = self._make_embed(
                 title="✅ Куратор назначен",
@@ -123,7 +118,6 @@ class CuratorCog(commands.Cog):
             )
             await interaction.followup.send(embed=em)
         except SQLAlchemyError:
-            db.rollback()
             logging.exception("Ошибка при назначении куратора")
             em = self._make_embed(
                 title="❗ Ошибка",
@@ -131,25 +125,11 @@ class CuratorCog(commands.Cog):
                 color=discord.Color.red()
             )
             await interaction.followup.send(embed=em, ephemeral=True)
-        finally:
-            db.close()
 
     @assigncurator.error
     async def assigncurator_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_CURATOR_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
         else:
             logging.exception("Ошибка в assigncurator")
             await interaction.response.send_message(
@@ -164,7 +144,7 @@ class CuratorCog(commands.Cog):
     @app_commands.describe(
         member="Пользователь, у которого удаляем куратора"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_CURATOR_ROLES)
+    @permissions.check("removecurator")
     async def removecurator(
         self,
         interaction: discord.Interaction,
@@ -172,25 +152,24 @@ class CuratorCog(commands.Cog):
     ):
         """Удаляет у member назначенного куратора."""
         await interaction.response.defer(thinking=True)
-        db = next(get_db())
         try:
-            user = db.query(User).filter_by(discord_id=member.id).first()
-            if not user or user.curator_id is None:
-                em = self._make_embed(
-                    title="ℹ️ Куратор не найден",
-                    description=f"У {member.mention} куратор не назначен.",
-                    color=discord.Color.orange()
-                )
-            else:
-                user.curator_id = None
-                db.commit()
-                em = self._make_embed(
-                    title="✅ Куратор удалён",
-                    description=f"Куратор для {member.mention} успешно удалён."
-                )
+            async with db_session() as db:
+                user = db.query(User).filter_by(discord_id=member.id).first()
+                if not user or user.curator_id is None:
+                    em = self._make_embed(
+                        title="ℹ️ Куратор не найден",
+                        description=f"У {member.mention} куратор не назначен.",
+                        color=discord.Color.orange()
+                    )
+                else:
+                    user.curator_id = None
+                    db.commit()
+                    em = self._make_embed(
+                        title="✅ Куратор удалён",
+                        description=f"Куратор для {member.mention} успешно удалён."
+                    )
             await interaction.followup.send(embed=em)
         except SQLAlchemyError:
-            db.rollback()
             logging.exception("Ошибка при удалении куратора")
             em = self._make_embed(
                 title="❗ Ошибка",
@@ -198,25 +177,11 @@ class CuratorCog(commands.Cog):
                 color=discord.Color.red()
             )
             await interaction.followup.send(embed=em, ephemeral=True)
-        finally:
-            db.close()
 
     @removecurator.error
     async def removecurator_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_CURATOR_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
         else:
             logging.exception("Ошибка в removecurator")
             await interaction.response.send_message(
@@ -231,7 +196,7 @@ class CuratorCog(commands.Cog):
     @app_commands.describe(
         member="Пользователь (по умолчанию — вы)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_CURATOR_ROLES)
+    @permissions.check("whoiscurator")
     async def whoiscurator(
         self,
         interaction: discord.Interaction,
@@ -242,19 +207,19 @@ class CuratorCog(commands.Cog):
             member = interaction.user  # type: ignore
 
         await interaction.response.defer(thinking=True)
-        db = next(get_db())
         try:
-            user = db.query(User).filter_by(discord_id=member.id).first()
-            if user and user.curator_id:
-                curator_rec = db.query(User).get(user.curator_id)
-                if curator_rec:
-                    cm = interaction.guild.get_member(curator_rec.discord_id) if interaction.guild else None
-                    mention = cm.mention if cm else f"<@{curator_rec.discord_id}>"
-                    desc = f"🔹 Куратор для {member.mention}: {mention}"
+            async with db_session() as db:
+                user = db.query(User).filter_by(discord_id=member.id).first()
+                if user and user.curator_id:
+                    curator_rec = db.query(User).get(user.curator_id)
+                    if curator_rec:
+                        cm = interaction.guild.get_member(curator_rec.discord_id) if interaction.guild else None
+                        mention = cm.mention if cm else f"<@{curator_rec.discord_id}>"
+                        desc = f"🔹 Куратор для {member.mention}: {mention}"
+                    else:
+                        desc = f"ℹ️ Куратор для {member.mention} не найден в гильдии."
                 else:
-                    desc = f"ℹ️ Куратор для {member.mention} не найден в гильдии."
-            else:
-                desc = f"ℹ️ Для {member.mention} куратор не назначен."
+                    desc = f"ℹ️ Для {member.mention} куратор не назначен."
             em = self._make_embed(
                 title="ℹ️ Информация о кураторе",
                 description=desc,
@@ -269,30 +234,291 @@ class CuratorCog(commands.Cog):
                 color=discord.Color.red()
             )
             await interaction.followup.send(embed=em, ephemeral=True)
-        finally:
-            db.close()
 
     @whoiscurator.error
     async def whoiscurator_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_CURATOR_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
+        else:
+            logging.exception("Ошибка в whoiscurator")
+            await interaction.response.send_message(
+                "❗ Произошла непредвиденная ошибка.", ephemeral=True
+            )
+
+    # ─────────────────── Подопечные и нагрузка ───────────────────
+    def _call_sign_taken_embed(self, discord_ids: list[int]) -> discord.Embed:
+        return self._make_embed(
+            title="❗ Позывной занят",
+            description=(
+                "Нельзя завести в базе: позывной уже принадлежит другому участнику — "
+                + ", ".join(f"<@{d}>" for d in discord_ids)
+                + ". Исправьте ник или позывной в базе и повторите."
+            ),
+            color=discord.Color.orange()
+        )
+
+    def _paged_embed(self, title: str, header: str, lines: list[str], page: int, pages: int) -> discord.Embed:
+        em = self._make_embed(title=title, description=header + "\n\n" + ("\n".join(lines) or "—"))
+        em.set_footer(text=f"Страница {page + 1}/{pages}", icon_url=config.EMBLEM_URL)
+        return em
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="mentees",
+        description="Подопечные куратора и их недельная норма"
+    )
+    @app_commands.describe(
+        curator="Куратор (по умолчанию — вы)",
+        recursive="Включить подопечных подопечных (всё поддерево)"
+    )
+    @permissions.check("mentees")
+    async def mentees(
+        self,
+        interaction: discord.Interaction,
+        curator: discord.Member = None,
+        recursive: bool = False
+    ):
+        """Список подопечных одним рекурсивным запросом, постранично."""
+        if curator is None:
+            curator = interaction.user  # type: ignore
+
+        await interaction.response.defer(thinking=True)
+        week_start, week_end = curators.current_week()
+        try:
+            rows = await asyncio.to_thread(
+                curators.load_mentees, curator.id, week_start, week_end,
+                recursive=recursive, norms=RULES.guild_norms(interaction.guild)
+            )
+        except SQLAlchemyError:
+            logging.exception("Ошибка при получении подопечных")
+            em = self._make_embed(
+                title="❗ Ошибка",
+                description="Не удалось получить данные из базы.",
+                color=discord.Color.red()
+            )
+            return await interaction.followup.send(embed=em, ephemeral=True)
+
+        active = [r for r in rows if not r.on_vacation]
+        header = (
+            f"Куратор: {curator.mention}\n"
+            f"Неделя {week_start:%d.%m.%Y}–{week_end:%d.%m.%Y}\n"
+            f"Подопечных: **{len(rows)}**, норму выполнили **{sum(r.ok for r in active)}** из {len(active)}"
+        )
+        lines = [
+            f"{'　' * (r.depth - 1)}• <@{r.discord_id}> — дежурств {r.duties}, допросов {r.interviews} "
+            + ("🏖️" if r.on_vacation else ("✅" if r.ok else "❌"))
+            for r in rows
+        ]
+        pages = chunk(lines, PAGE_SIZE)
+        view = Paginator(
+            lambda i: self._paged_embed("🕵 Подопечные", header, pages[i], i, len(pages)),
+            len(pages),
+            author_id=interaction.user.id
+        )
+        await view.send(interaction.followup)
+
+    @mentees.error
+    async def mentees_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
+        else:
+            logging.exception("Ошибка в mentees")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+            else:
+                await interaction.followup.send("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="curatorload",
+        description="Нагрузка кураторов и выполнение нормы их подопечными"
+    )
+    @permissions.check("curatorload")
+    async def curatorload(self, interaction: discord.Interaction):
+        """Отчёт по всем кураторам: прямые подопечные, поддерево, норма — одним запросом."""
+        await interaction.response.defer(thinking=True)
+        week_start, week_end = curators.current_week()
+        try:
+            loads = await asyncio.to_thread(
+                curators.load_workload, week_start, week_end, RULES.guild_norms(interaction.guild)
+            )
+        except SQLAlchemyError:
+            logging.exception("Ошибка при получении нагрузки кураторов")
+            em = self._make_embed(
+                title="❗ Ошибка",
+                description="Не удалось получить данные из базы.",
+                color=discord.Color.red()
+            )
+            return await interaction.followup.send(embed=em, ephemeral=True)
+
+        header = (
+            f"Неделя {week_start:%d.%m.%Y}–{week_end:%d.%m.%Y}\n"
+            f"Кураторов: **{len(loads)}**"
+        )
+        lines = [
+            f"<@{c.discord_id}> — прямых {c.direct}, всего {c.subtree}, "
+            f"норма {c.compliant}/{c.subtree - c.on_vacation}"
+            + (f", в отпуске {c.on_vacation}" if c.on_vacation else "")
+            for c in loads
+        ]
+        pages = chunk(lines, PAGE_SIZE)
+        view = Paginator(
+            lambda i: self._paged_embed("📊 Нагрузка кураторов", header, pages[i], i, len(pages)),
+            len(pages),
+            author_id=interaction.user.id
+        )
+        await view.send(interaction.followup)
+
+    @curatorload.error
+    async def curatorload_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
+        else:
+            logging.exception("Ошибка в curatorload")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+            else:
+                await interaction.followup.send("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+
+    # ─────────────────── Массовые назначения ───────────────────
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="reassigncurator",
+        description="Передать всех подопечных одного куратора другому"
+    )
+    @app_commands.describe(
+        from_curator="Текущий куратор",
+        to_curator="Новый куратор"
+    )
+    @permissions.check("reassigncurator")
+    async def reassigncurator(
+        self,
+        interaction: discord.Interaction,
+        from_curator: discord.Member,
+        to_curator: discord.Member
+    ):
+        """Одна транзакция: UPDATE всех прямых подопечных from_curator."""
+        await interaction.response.defer(thinking=True)
+        try:
+            moved = await asyncio.to_thread(
+                curators.reassign_all, from_curator.id, to_curator.id, to_curator.display_name
+            )
+        except curators.CuratorCycle:
+            em = self._make_embed(
+                title="❗ Нельзя переназначить",
+                description=f"{to_curator.mention} сам находится среди подопечных {from_curator.mention}.",
+                color=discord.Color.orange()
+            )
+            return await interaction.followup.send(embed=em, ephemeral=True)
+        except curators.CallSignTaken:
+            return await interaction.followup.send(embed=self._call_sign_taken_embed([to_curator.id]), ephemeral=True)
+        except SQLAlchemyError:
+            logging.exception("Ошибка при переназначении подопечных")
+            em = self._make_embed(
+                title="❗ Ошибка",
+                description="Не удалось сохранить изменения в базе.",
+                color=discord.Color.red()
+            )
+            return await interaction.followup.send(embed=em, ephemeral=True)
+
+        em = self._make_embed(
+            title="✅ Подопечные переданы",
+            description=f"{moved} подопечных {from_curator.mention} переданы {to_curator.mention}."
+        )
+        await interaction.followup.send(embed=em)
+
+    @reassigncurator.error
+    async def reassigncurator_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
+        else:
+            logging.exception("Ошибка в reassigncurator")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+            else:
+                await interaction.followup.send("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="distributementees",
+        description="Раздать участников кураторам по текущей нагрузке"
+    )
+    @app_commands.describe(
+        members="Участники: упоминания или ID через пробел",
+        curators_list="Кураторы: упоминания или ID через пробел"
+    )
+    @app_commands.rename(curators_list="curators")
+    @permissions.check("distributementees")
+    async def distributementees(
+        self,
+        interaction: discord.Interaction,
+        members: str,
+        curators_list: str
+    ):
+        """Каждый следующий участник — наименее загруженному куратору; одна транзакция."""
+        guild = interaction.guild
+        member_names = _parse_members(guild, members)
+        curator_names = _parse_members(guild, curators_list)
+        if not member_names or not curator_names:
+            return await interaction.response.send_message(
+                "❗ Укажите хотя бы одного участника и одного куратора.", ephemeral=True
+            )
+
+        await interaction.response.defer(thinking=True)
+        try:
+            dist = await asyncio.to_thread(curators.distribute, member_names, curator_names)
+        except curators.CallSignTaken as e:
+            return await interaction.followup.send(embed=self._call_sign_taken_embed(e.discord_ids), ephemeral=True)
+        except curators.CuratorCycle as e:
+            em = self._make_embed(
+                title="❗ Нельзя распределить",
+                description=(
+                    "Эти кураторы сами находятся среди подопечных распределяемых участников: "
+                    + ", ".join(f"<@{d}>" for d in e.discord_ids)
+                    + ". Уберите их из списка кураторов или участников."
+                ),
+                color=discord.Color.orange()
+            )
+            return await interaction.followup.send(embed=em, ephemeral=True)
+        except SQLAlchemyError:
+            logging.exception("Ошибка при распределении подопечных")
+            em = self._make_embed(
+                title="❗ Ошибка",
+                description="Не удалось сохранить изменения в базе.",
                 color=discord.Color.red()
             )
+            return await interaction.followup.send(embed=em, ephemeral=True)
+
+        total = sum(len(v) for v in dist.assigned.values())
+        em = self._make_embed(
+            title="✅ Подопечные распределены",
+            description=f"Назначено: **{total}** из {len(member_names)}"
+        )
+        for cur_id, assigned in dist.assigned.items():
+            if assigned:
+                em.add_field(
+                    name=curator_names.get(cur_id, str(cur_id)),
+                    value=" ".join(f"<@{m}>" for m in assigned)[:1024],
+                    inline=False
+                )
+        if dist.skipped:
             em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
+                name="Не назначены",
+                value=" ".join(f"<@{m}>" for m in dist.skipped)[:1024],
                 inline=False
             )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            await interaction.response.send_message(embed=em, ephemeral=True)
+        await interaction.followup.send(embed=em)
+
+    @distributementees.error
+    async def distributementees_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            await interaction.response.send_message(embed=error.embed, ephemeral=True)
         else:
-            logging.exception("Ошибка в whoiscurator")
-            await interaction.response.send_message(
-                "❗ Произошла непредвиденная ошибка.", ephemeral=True
-            )
+            logging.exception("Ошибка в distributementees")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❗ Произошла непредвиденная ошибка.", ephemeral=True)
+            else:
+                await interaction.followup.send("❗ Произошла непредвиденная ошибка.", ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(CuratorCog(bot))
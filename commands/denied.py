@@ -10,25 +10,8 @@ from discord.ext import commands
 import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
 from sqlalchemy import delete
 from database import SessionLocal, ActivityReport, InterrogationReport, User
-from roles.constants import (
-    CHANNELS,
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    worker_office_id, master_office_id,
-)
-
-# Роли, которым разрешено отклонять отчёты
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    worker_office_id, master_office_id,
-]
+from roles.constants import CHANNELS
+from roles import permissions
 
 
 class DeniedCog(commands.Cog):
@@ -45,7 +28,7 @@ class DeniedCog(commands.Cog):
     @app_commands.describe(
         reason="Причина отказа"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("denied")
     async def denied(
         self,
         interaction: discord.Interaction,
@@ -132,19 +115,12 @@ class DeniedCog(commands.Cog):
         )
 
     async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
-        # обработка MissingAnyRole
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.add_field(name="Доступ имеют роли:", value=allowed or "—", inline=False)
+        # отказ в доступе — готовый эмбед из реестра прав
+        if isinstance(error, permissions.AccessDenied):
             if not interaction.response.is_done():
-                await interaction.response.send_message(embed=em, ephemeral=True)
+                await interaction.response.send_message(embed=error.embed, ephemeral=True)
             else:
-                await interaction.followup.send(embed=em, ephemeral=True)
+                await interaction.followup.send(embed=error.embed, ephemeral=True)
             return
         logging.exception("Необработанная ошибка в DeniedCog.denied")
 
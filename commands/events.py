@@ -2,42 +2,93 @@
 
 import logging
 import datetime
-import re
 
 import discord
 from discord.ext import commands
 from discord.utils import get
-from sqlalchemy import func
 
 import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
-from database import SessionLocal, User, ActivityReport, InterrogationReport
+import database
+import metrics
+from ingest import (
+    IngestResult,
+    ReportIngestQueue,
+    ReportJob,
+    extract_report_text,
+    parse_activity_report,
+    parse_interrogation_report,
+    report_hash,
+    ReportDelta,
+    ReportDeleteJob,
+    ThreadLinkJob,
+)
 from roles.constants import CHANNELS
+from rules import RULES, Norm
+from workers import BoundedWorkerPool
+
+# Поток «каждое сообщение» — отдельный логгер, чтобы его можно было прореживать
+trace_log = logging.getLogger("events.trace")
+
 
 class Events(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.call_sign_to_thread: dict[str, tuple[discord.Thread, datetime.date]] = {}
         self.thread_to_activity: dict[int, int] = {}
         self.thread_to_interrogation: dict[int, int] = {}
+        # report_id → (тред, сообщение статуса), пока привязка не дошла до БД
+        self.status_messages: dict[int, tuple[int, int]] = {}
         self.EMOJI_OK: discord.Emoji | None = None
         self.EMOJI_FAIL: discord.Emoji | None = None
+        # write-behind очередь: отчёты пишутся пачками фоновым воркером
+        self.ingest = ReportIngestQueue()
+        # обработка новых отчётов: не больше воркеров, чем соединений в пуле БД
+        self.reports = BoundedWorkerPool(
+            "reports",
+            self._process_report,
+            concurrency=database.DB_POOL_SIZE,
+            maxsize=config.REPORT_QUEUE_MAX,
+            put_timeout=config.REPORT_QUEUE_PUT_TIMEOUT
+        )
+
+    async def cog_load(self):
+        self.ingest.start()
+        self.reports.start()
+
+    async def cog_unload(self):
+        await self.reports.stop()
+        await self.ingest.stop()
 
     async def on_ready(self):
         # Загрузка эмодзи и участников
         if not self.bot.guilds:
-            print("Warning: бот не состоит ни в одной гильдии.")
+            logging.warning("Бот не состоит ни в одной гильдии.")
             return
         guild0 = self.bot.guilds[0]
         self.EMOJI_OK = get(guild0.emojis, name="Odobreno")
         self.EMOJI_FAIL = get(guild0.emojis, name="Otkazano")
-        print(f"Бот запущен как {self.bot.user}. OK={self.EMOJI_OK}, FAIL={self.EMOJI_FAIL}")
+        logging.info(f"Бот запущен как {self.bot.user}. OK={self.EMOJI_OK}, FAIL={self.EMOJI_FAIL}")
 
         for guild in self.bot.guilds:
             cnt = 0
             async for m in guild.fetch_members(limit=None):
                 cnt += 1
-            print(f"Загружено {cnt} участников из гильдии «{guild.name}»")
-        print("Участники загружены, теперь role.members будет непустым.")
+            logging.info(f"Загружено {cnt} участников из гильдии «{guild.name}»")
+        logging.info("Участники загружены, теперь role.members будет непустым.")
+
+    def _verdict_embeds(self, mention: str, duties: int, interviews: int, norm: Norm) -> list[discord.Embed]:
+        """Статус по недельной норме (правила rules.py) — его же правим при изменении отчётов."""
+        ok = norm.met(duties, interviews)
+        emoji = "✅" if ok else "❌"
+        # первый embed: упоминание пользователя + результат
+        em1 = self._make_embed(f"{mention} {emoji}")
+        # второй embed: детальная сводка с упоминанием
+        em2 = self._make_embed(
+            f"{emoji} Недельная норма для {mention} "
+            f"{'выполнена' if ok else 'не выполнена'}.\n"
+            f"• Дежурств – {duties} из {norm.duties}\n"
+            f"• Допросов – {interviews} из {norm.interviews}"
+        )
+        return [em1, em2]
 
     def _make_embed(self, description: str) -> discord.Embed:
         """Утилита: белый Embed с эмблемой."""
@@ -49,70 +100,6 @@ class Events(commands.Cog):
         em.set_thumbnail(url=config.EMBLEM_URL)
         return em
 
-    def parse_activity_report(self, text: str) -> tuple[str, int, datetime.date] | None:
-        parts = text.split('[Ваш позывной]')
-        if len(parts) < 2:
-            return None
-        call_sign = next(
-            (l.strip() for l in parts[1].splitlines()
-             if l.strip() and not l.strip().startswith('Идентификационный номер')),
-            None
-        )
-        if not call_sign:
-            return None
-
-        parts = text.split('[Количество Активных Дежурств в течении Недели]')
-        if len(parts) < 2:
-            return None
-        duties = next(
-            (int(l.strip()) for l in parts[1].splitlines() if l.strip().isdigit()),
-            None
-        )
-        if duties is None:
-            return None
-
-        date = None
-        parts = text.split('[Дата заполнения]')
-        if len(parts) > 1:
-            for l in parts[1].splitlines():
-                s = l.strip()
-                if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
-                    try:
-                        date = datetime.datetime.strptime(s, '%Y-%m-%d').date()
-                        break
-                    except Exception:
-                        pass
-        if date is None:
-            return None
-        return call_sign, duties, date
-
-    def parse_interrogation_report(self, text: str) -> tuple[str, datetime.date] | None:
-        parts = text.split('[Ваш позывной]')
-        if len(parts) < 2:
-            return None
-        call_sign = next(
-            (l.strip() for l in parts[1].splitlines()
-             if l.strip() and not l.strip().startswith('Идентификационный номер')),
-            None
-        )
-        if not call_sign:
-            return None
-
-        date = None
-        parts = text.split('[Дата]')
-        if len(parts) > 1:
-            for l in parts[1].splitlines():
-                s = l.strip()
-                if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
-                    try:
-                        date = datetime.datetime.strptime(s, '%Y-%m-%d').date()
-                        break
-                    except Exception:
-                        pass
-        if date is None:
-            return None
-        return call_sign, date
-
     async def resolve_member_by_callsign(
         self,
         guild: discord.Guild,
@@ -127,145 +114,266 @@ class Events(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        logging.info(f"[Events] on_message: {message.channel.id} from {message.author}")
+        # трассировка каждого сообщения — высокочастотная, прореживается через LOG_SAMPLE
+        trace_log.info(
+            "on_message %s from %s", message.channel.id, message.author,
+            extra={"channel_id": message.channel.id, "author_id": message.author.id, "message_id": message.id}
+        )
         if message.author.id == self.bot.user.id:
             return
+        kind = self._report_kind(message.channel.id)
+        metrics.EVENTS_MESSAGES.inc(channel=kind or "other")
+        if kind is None or message.guild is None:
+            return
+        if getattr(self.bot, "shutting_down", False):
+            # бот останавливается: отчёт подберёт /backfill после перезапуска
+            return logging.info(f"[Events] отчёт {message.id} пропущен: идёт остановка")
+
+        # разбор и запись — в ограниченном пуле воркеров, чтобы всплеск отчётов не душил пул БД
+        if not await self.reports.submit(message, kind):
+            logging.warning(f"[Events] отчёт {message.id} не обработан из-за перегрузки — его подберёт /backfill")
 
-        # собираем текст из embed'ов
-        raw = message.content or ""
-        if message.embeds:
-            e = message.embeds[0]
-            if e.description:
-                raw += "\n" + e.description
-            for f in e.fields:
-                raw += f"\n{f.name}\n{f.value}"
+    async def _process_report(self, message: discord.Message, kind: str):
+        raw = extract_report_text(message)
 
-        db = SessionLocal()
         guild = message.guild
-        try:
-            # — Активность —
-            if guild and message.channel.id == CHANNELS['activity']:
-                parsed = self.parse_activity_report(raw)
-                logging.info(f"[Events] parsed activity: {parsed}")
-                if parsed:
-                    call_sign, duties, date = parsed
-                    member = await self.resolve_member_by_callsign(guild, call_sign) or message.author
-
-                    # User в БД
-                    db_user = db.query(User).filter_by(discord_id=member.id).first()
-                    if not db_user:
-                        db_user = User(discord_id=member.id, call_sign=call_sign)
-                        db.add(db_user); db.commit()
-                    elif db_user.call_sign != call_sign:
-                        db_user.call_sign = call_sign; db.commit()
-
-                    week_start = date - datetime.timedelta(days=date.weekday())
-                    week_end = week_start + datetime.timedelta(days=6)
-                    interviews = (
-                        db.query(func.count(InterrogationReport.id))
-                          .filter(
-                              InterrogationReport.user_id == db_user.id,
-                              InterrogationReport.date.between(week_start, week_end)
-                          )
-                          .scalar() or 0
+        # — Активность —
+        if kind == "activity":
+            parsed = parse_activity_report(raw)
+            trace_log.info("parsed activity: %s", parsed, extra={"message_id": message.id})
+            if parsed:
+                call_sign, duties, date = parsed
+                member = await self.resolve_member_by_callsign(guild, call_sign) or message.author
+
+                try:
+                    res = await self.ingest.submit(ReportJob(
+                        kind="activity",
+                        discord_id=member.id,
+                        call_sign=call_sign,
+                        message_id=message.id,
+                        content_hash=report_hash(raw),
+                        date=date,
+                        duties=duties
+                    ))
+                except Exception:
+                    logging.exception("Не удалось сохранить отчёт активности")
+                    return
+                if not res.created:
+                    logging.info(f"[Events] отчёт {message.id} уже учтён (повтор или репост)")
+                    return
+                await self._report_created(message, kind, member, call_sign, duties, res)
+
+        # — Допрос —
+        elif kind == "interrogation":
+            parsed = parse_interrogation_report(raw)
+            trace_log.info("parsed interrogation: %s", parsed, extra={"message_id": message.id})
+            if parsed:
+                call_sign, d_date = parsed
+                member = await self.resolve_member_by_callsign(guild, call_sign) or message.author
+
+                try:
+                    res = await self.ingest.submit(ReportJob(
+                        kind="interrogation",
+                        discord_id=member.id,
+                        call_sign=call_sign,
+                        message_id=message.id,
+                        content_hash=report_hash(raw),
+                        date=d_date
+                    ))
+                except Exception:
+                    logging.exception("Не удалось сохранить отчёт допроса")
+                    return
+                if not res.created:
+                    logging.info(f"[Events] допрос {message.id} уже учтён (повтор или репост)")
+                    return
+                await self._report_created(message, kind, member, call_sign, 0, res)
+
+    async def _report_created(
+        self,
+        message: discord.Message,
+        kind: str,
+        member: discord.abc.User,
+        call_sign: str,
+        duties: int,
+        res: IngestResult
+    ):
+        """Тред и статус для только что сохранённого отчёта (новое сообщение или первая разборчивая правка)."""
+        if kind == "activity":
+            # создаём тред
+            try:
+                thread = await message.create_thread(
+                    name=f"Оценка {call_sign}", auto_archive_duration=1440
+                )
+                self.thread_to_activity[thread.id] = res.report_id
+
+                # оба embed'а (результат + сводка) одним сообщением — его же потом правим
+                status = await thread.send(
+                    embeds=self._verdict_embeds(
+                        member.mention, duties, res.interviews, RULES.norm_for_member(member)
                     )
+                )
+                await self._link_status(res.report_id, thread.id, status.id)
+
+            except Exception as e:
+                logging.exception(f"Error thread activity: {e}")
+            return
 
-                    ar = ActivityReport(
-                        user_id=db_user.id,
-                        duties=duties,
-                        interviews=interviews,
-                        date=date
+        # создаём тред допроса
+        try:
+            thr = await message.create_thread(
+                name=f"Допрос {call_sign}", auto_archive_duration=1440
+            )
+            self.thread_to_interrogation[thr.id] = res.report_id
+            await self.ingest.submit(ThreadLinkJob(
+                kind="interrogation",
+                report_id=res.report_id,
+                thread_id=thr.id
+            ))
+
+            # embed 1: учли допрос с упоминанием
+            em3 = self._make_embed(f"✅ Учёл отчёт допроса для {member.mention}")
+            await thr.send(embed=em3)
+        except Exception as e:
+            logging.exception(f"Error thread interrogation: {e}")
+
+        # тред активности не засоряем новыми сообщениями — правим статус на месте
+        await self._refresh_verdicts(message.guild, ReportDelta(verdicts=res.verdicts))
+
+    # ─────────────────── Правки и удаления отчётов ───────────────────
+    def _report_kind(self, channel_id: int) -> str | None:
+        if channel_id == CHANNELS['activity']:
+            return "activity"
+        if channel_id == CHANNELS['interrogation']:
+            return "interrogation"
+        return None
+
+    async def _link_status(self, report_id: int, thread_id: int, status_message_id: int):
+        """Привязывает тред и сообщение статуса к отчёту; возвращается после коммита."""
+        # до коммита _refresh_verdicts найдёт сообщение здесь
+        self.status_messages[report_id] = (thread_id, status_message_id)
+        try:
+            await self.ingest.submit(ThreadLinkJob(
+                kind="activity",
+                report_id=report_id,
+                thread_id=thread_id,
+                status_message_id=status_message_id
+            ))
+        except Exception:
+            logging.exception(f"Не удалось сохранить привязку статуса отчёта {report_id}")
+        else:
+            self.status_messages.pop(report_id, None)
+
+    def _activity_thread(self, report_id: int) -> int | None:
+        """Тред отчёта активности из памяти — для отчётов, чей тред ещё не записан в БД."""
+        for thread_id, rid in self.thread_to_activity.items():
+            if rid == report_id:
+                return thread_id
+        return None
+
+    async def _refresh_verdicts(self, guild: discord.Guild, delta: ReportDelta):
+        """
+        Перерисовывает статус в тредах затронутых отчётов. Если сообщения статуса
+        нет (старый отчёт или привязка ещё не записана) — отправляет новое и привязывает его.
+        """
+        updates = [(v, False) for v in delta.verdicts] + [(v, True) for v in delta.removed]
+        for v, removed in updates:
+            thread_id, status_id = v.thread_id, v.status_message_id
+            if not status_id and v.report_id in self.status_messages:
+                thread_id, status_id = self.status_messages[v.report_id]
+            thread_id = thread_id or self._activity_thread(v.report_id)
+            if not thread_id:
+                continue
+            try:
+                thread = guild.get_thread(thread_id) or await guild.fetch_channel(thread_id)
+                if removed:
+                    embeds = [self._make_embed(f"🗑️ Отчёт <@{v.discord_id}> удалён автором и не учитывается.")]
+                else:
+                    embeds = self._verdict_embeds(
+                        f"<@{v.discord_id}>", v.duties, v.interviews,
+                        RULES.norm_for_member(guild.get_member(v.discord_id))
                     )
-                    db.add(ar); db.commit()
-
-                    # создаём тред
-                    try:
-                        thread = await message.create_thread(
-                            name=f"Оценка {call_sign}", auto_archive_duration=1440
-                        )
-                        self.call_sign_to_thread[call_sign] = (thread, date)
-                        self.thread_to_activity[thread.id] = ar.id
-
-                        ok = (duties >= 3 and interviews >= 1)
-                        emoji = "✅" if ok else "❌"
-
-                        # первый embed: упоминание пользователя + результат
-                        em1 = self._make_embed(f"{member.mention} {emoji}")
-                        await thread.send(embed=em1)
-
-                        # второй embed: детальная сводка с упоминанием
-                        desc = (
-                            f"{emoji} Недельная норма для {member.mention} "
-                            f"{'выполнена' if ok else 'не выполнена'}.\n"
-                            f"• Дежурств – {duties}\n"
-                            f"• Допросов – {interviews}"
-                        )
-                        em2 = self._make_embed(desc)
-                        await thread.send(embed=em2)
-
-                    except Exception as e:
-                        logging.exception(f"Error thread activity: {e}")
-
-            # — Допрос —
-            elif guild and message.channel.id == CHANNELS['interrogation']:
-                parsed = self.parse_interrogation_report(raw)
-                logging.info(f"[Events] parsed interrogation: {parsed}")
-                if parsed:
-                    call_sign, d_date = parsed
-                    member = await self.resolve_member_by_callsign(guild, call_sign) or message.author
-
-                    db_user = db.query(User).filter_by(discord_id=member.id).first()
-                    if not db_user:
-                        db_user = User(discord_id=member.id, call_sign=call_sign)
-                        db.add(db_user); db.commit()
-                    elif db_user.call_sign != call_sign:
-                        db_user.call_sign = call_sign; db.commit()
-
-                    ir = InterrogationReport(user_id=db_user.id, date=d_date)
-                    db.add(ir); db.commit()
-
-                    # создаём тред допроса
-                    try:
-                        thr = await message.create_thread(
-                            name=f"Допрос {call_sign}", auto_archive_duration=1440
-                        )
-                        self.thread_to_interrogation[thr.id] = ir.id
-
-                        # embed 1: учли допрос с упоминанием
-                        em3 = self._make_embed(f"✅ Учёл отчёт допроса для {member.mention}")
-                        await thr.send(embed=em3)
-                    except Exception as e:
-                        logging.exception(f"Error thread interrogation: {e}")
-
-                    # если был тред по активности — обновляем его
-                    if call_sign in self.call_sign_to_thread:
-                        act_thr, _ = self.call_sign_to_thread[call_sign]
-                        ar_id = self.thread_to_activity.get(act_thr.id)
-                        if ar_id:
-                            ar = db.get(ActivityReport, ar_id)
-                            if ar:
-                                ar.interviews += 1
-                                db.commit()
-                                ok = (ar.duties >= 3 and ar.interviews >= 1)
-                                emoji = "✅" if ok else "❌"
-
-                                try:
-                                    # embed 2: отметка в исходном треде с упоминанием
-                                    em4 = self._make_embed(f"✅ Учёл отчёт допроса для {member.mention}")
-                                    await act_thr.send(embed=em4)
-                                    # embed 3: текущий статус с упоминанием
-                                    status_desc = (
-                                        f"{emoji} Текущий статус по норме для {member.mention}:\n"
-                                        f"• Дежурств – {ar.duties}\n"
-                                        f"• Допросов – {ar.interviews}"
-                                    )
-                                    em5 = self._make_embed(status_desc)
-                                    await act_thr.send(embed=em5)
-                                except Exception:
-                                    pass
-
-        finally:
-            db.close()
+                if status_id:
+                    await thread.get_partial_message(status_id).edit(embeds=embeds)
+                else:
+                    status = await thread.send(embeds=embeds)
+                    if not removed:
+                        await self._link_status(v.report_id, thread.id, status.id)
+            except discord.HTTPException:
+                logging.exception(f"Не удалось обновить статус в треде {thread_id}")
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        kind = self._report_kind(payload.channel_id)
+        if kind is None or payload.guild_id is None:
+            return
+        guild = self.bot.get_guild(payload.guild_id)
+        channel = guild.get_channel(payload.channel_id) if guild else None
+        if channel is None:
+            return
+        try:
+            message = await channel.fetch_message(payload.message_id)
+        except discord.NotFound:
+            return
+        if message.author.id == self.bot.user.id:
+            return
+
+        # перечитываем только изменённое сообщение
+        raw = extract_report_text(message)
+        if kind == "activity":
+            parsed = parse_activity_report(raw)
+            if not parsed:
+                return logging.info(f"[Events] правка {message.id} не разобрана, отчёт оставлен как был")
+            call_sign, duties, date = parsed
+        else:
+            parsed = parse_interrogation_report(raw)
+            if not parsed:
+                return logging.info(f"[Events] правка {message.id} не разобрана, отчёт оставлен как был")
+            call_sign, date = parsed
+            duties = 0
+        member = await self.resolve_member_by_callsign(guild, call_sign) or message.author
+
+        try:
+            delta = await self.ingest.submit(ReportJob(
+                kind=kind,
+                discord_id=member.id,
+                call_sign=call_sign,
+                message_id=message.id,
+                content_hash=report_hash(raw),
+                date=date,
+                duties=duties,
+                edit=True
+            ))
+        except Exception:
+            logging.exception(f"Не удалось применить правку отчёта {message.id}")
+            return
+        if isinstance(delta, IngestResult):
+            # исходное сообщение не было учтено (не разобралось или пришло, пока бот лежал)
+            if delta.created:
+                await self._report_created(message, kind, member, call_sign, duties, delta)
+            return
+        await self._refresh_verdicts(guild, delta)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        await self._delete_reports(payload.guild_id, payload.channel_id, [payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        await self._delete_reports(payload.guild_id, payload.channel_id, list(payload.message_ids))
+
+    async def _delete_reports(self, guild_id: int | None, channel_id: int, message_ids: list[int]):
+        kind = self._report_kind(channel_id)
+        guild = self.bot.get_guild(guild_id) if guild_id else None
+        if kind is None or guild is None:
+            return
+        for message_id in message_ids:
+            try:
+                delta = await self.ingest.submit(ReportDeleteJob(kind=kind, message_id=message_id))
+            except Exception:
+                logging.exception(f"Не удалось удалить отчёт {message_id}")
+                continue
+            await self._refresh_verdicts(guild, delta)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Events(bot))
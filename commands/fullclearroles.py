@@ -8,28 +8,7 @@ from discord import app_commands
 from discord.ext import commands
 
 import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
-from roles.constants import (
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-)
-
-# Роли, которым разрешено вызывать /fullclearroles и /returnroles
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-]
+from roles import permissions
 
 
 class FullClearRolesCog(commands.Cog):
@@ -53,7 +32,7 @@ class FullClearRolesCog(commands.Cog):
         member="Пользователь, у которого нужно снять роли",
         comment="Комментарий для протокола"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("fullclearroles")
     async def slash_fullclearroles(
         self,
         interaction: discord.Interaction,
@@ -107,20 +86,8 @@ class FullClearRolesCog(commands.Cog):
         interaction: discord.Interaction,
         error
     ):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Необработанная ошибка в slash_fullclearroles")
         if not interaction.response.is_done():
@@ -137,7 +104,7 @@ class FullClearRolesCog(commands.Cog):
     @app_commands.describe(
         member="Пользователь, у которого вернуть роли"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("returnroles")
     async def slash_returnroles(
         self,
         interaction: discord.Interaction,
@@ -209,20 +176,8 @@ class FullClearRolesCog(commands.Cog):
         interaction: discord.Interaction,
         error
     ):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Необработанная ошибка в slash_returnroles")
         if not interaction.response.is_done():
@@ -0,0 +1,137 @@
+# commands/inactive.py
+
+import asyncio
+import datetime
+import logging
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL, INACTIVE_CHANNEL_ID, INACTIVE_INTERVAL, INACTIVE_WEEKS
+import inactivity
+from pagination import Paginator, chunk
+from roles import permissions
+
+
+# Участников на странице
+PAGE_SIZE = 20
+
+# Самый длинный срок для /inactive (в неделях)
+MAX_WEEKS = 52
+
+
+class InactiveCog(commands.Cog):
+    """
+    Cog для слэш-команды /inactive:
+      участники отчётных званий и штатов без отчётов о деятельности за N недель
+      (отпускники не учитываются), сначала те, кто молчит дольше всех.
+    Раз в INACTIVE_INTERVAL проверка с INACTIVE_WEEKS запускается сама
+    и публикуется в INACTIVE_CHANNEL_ID.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        self._periodic = self.bot.supervisor.spawn("inactive", self._inactive_loop, restart=True)
+
+    async def cog_unload(self):
+        self._periodic.cancel()
+
+    async def _find(self, guild: discord.Guild, weeks: int) -> tuple[datetime.date, list[inactivity.InactiveMember]]:
+        since = datetime.date.today() - datetime.timedelta(weeks=weeks)
+        started = time.perf_counter()
+        ids = inactivity.report_members(guild)
+        rows = await asyncio.to_thread(inactivity.find_inactive, ids, since)
+        logging.info(
+            "Неактивные с %s: %d из %d (%.1f мс)",
+            since, len(rows), len(ids), (time.perf_counter() - started) * 1000
+        )
+        return since, rows
+
+    def _render(
+        self,
+        since: datetime.date,
+        rows: list[inactivity.InactiveMember],
+        page: int,
+        page_count: int,
+        total: int
+    ) -> discord.Embed:
+        today = datetime.date.today()
+        lines = []
+        for r in rows:
+            weeks = r.weeks_silent(today)
+            last = f"последний отчёт {r.last_report:%d.%m.%Y} ({weeks} нед. назад)" if r.last_report else "отчётов нет"
+            lines.append(f"• <@{r.discord_id}> — {last}")
+
+        em = discord.Embed(
+            title="💤 Нет отчётов о деятельности",
+            description=(
+                f"С {since:%d.%m.%Y} не сдавали отчёт: **{total}**\n\n" + "\n".join(lines)
+                if total else f"✅ С {since:%d.%m.%Y} отчёты сдали все."
+            ),
+            color=discord.Color.orange() if total else discord.Color.from_rgb(255, 255, 255)
+        )
+        em.set_thumbnail(url=config.EMBLEM_URL)
+        em.set_footer(text=f"Страница {page + 1}/{page_count} · отпускники не учитываются")
+        return em
+
+    async def _inactive_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(config.INACTIVE_INTERVAL)
+            guild = self.bot.get_guild(config.DEVELOPMENT_GUILD_ID)
+            if guild is None:
+                continue
+            since, rows = await self._find(guild, config.INACTIVE_WEEKS)
+            channel = self.bot.get_channel(config.INACTIVE_CHANNEL_ID) if config.INACTIVE_CHANNEL_ID else None
+            if channel is None or not rows:
+                continue
+            pages = chunk(rows, PAGE_SIZE)
+            for i, part in enumerate(pages):
+                await channel.send(embed=self._render(since, part, i, len(pages), len(rows)))
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="inactive",
+        description="Кто не сдавал отчёты о деятельности N недель"
+    )
+    @app_commands.describe(weeks="Сколько недель без отчётов (по умолчанию из настроек)")
+    @permissions.check("inactive")
+    async def slash_inactive(
+        self,
+        interaction: discord.Interaction,
+        weeks: app_commands.Range[int, 1, MAX_WEEKS] | None = None
+    ):
+        guild = interaction.guild
+        if guild is None:
+            return await interaction.response.send_message(
+                "❗ Команду можно использовать только на сервере.",
+                ephemeral=True
+            )
+
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        since, rows = await self._find(guild, weeks or config.INACTIVE_WEEKS)
+        pages = chunk(rows, PAGE_SIZE)
+        view = Paginator(
+            lambda i: self._render(since, pages[i], i, len(pages), len(rows)),
+            len(pages),
+            author_id=interaction.user.id
+        )
+        await view.send(interaction.followup, ephemeral=True)
+
+    @slash_inactive.error
+    async def slash_inactive_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
+
+        logging.exception("Необработанная ошибка в slash_inactive")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
+        else:
+            await interaction.followup.send("❗ Произошла ошибка.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(InactiveCog(bot))
@@ -11,7 +11,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 import config  # DEVELOPMENT_GUILD_ID и EMBLEM_URL прописаны в config.py
 from database import (
-    get_db,
+    db_session,
     User,
     RPEntry,
     ActivityReport,
@@ -19,30 +19,12 @@ from database import (
     Warning,
     Vacation,
 )
-from roles.constants import (
-    arc_id, lrc_gimel_id, lrc_id,
-    mjr_gimel_id, mjr_id, cpt_id,
-    slt_id, lt_id, jlt_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    curator_id, trainee_curator_id, worker_office_id, master_office_id,
-    POST_MAP, CORPS_MAP, lt_id,
-)
+from roles import index, permissions
+from rules import RULES, Verdict
 
 # ID вашей тестовой гильдии
 DEVELOPMENT_GUILD_ID = config.DEVELOPMENT_GUILD_ID
 
-# Список ролей, которым разрешён /info
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    mjr_gimel_id, mjr_id, cpt_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id, senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    curator_id, worker_office_id, master_office_id,
-]
 
 # Публичный URL вашей GIF-анимации
 GIF_URL = (
@@ -58,143 +40,121 @@ class InfoCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    @staticmethod
+    def _verdict_text(verdict: Verdict) -> str:
+        norm = verdict.norm
+        return f"{'✅' if verdict.passed else '❌'} {norm.duties} деж. / {norm.interviews} доп."
+
     async def _gather_info(self, member: discord.Member):
         today = datetime.date.today()
         week_start = today - datetime.timedelta(days=today.weekday())
         week_end = week_start + datetime.timedelta(days=6)
 
-        db = next(get_db())
         try:
-            db_user = db.query(User).filter_by(discord_id=member.id).first()
-
-            total_points = (
-                db.query(func.coalesce(func.sum(RPEntry.amount), 0))
-                  .filter(RPEntry.user_id == (db_user.id if db_user else None))
-                  .scalar()
-                or 0
-            )
+            async with db_session() as db:
+                db_user = db.query(User).filter_by(discord_id=member.id).first()
+
+                total_points = (
+                    db.query(func.coalesce(func.sum(RPEntry.amount), 0))
+                      .filter(RPEntry.user_id == (db_user.id if db_user else None))
+                      .scalar()
+                    or 0
+                )
 
-            vac_rec = None
-            if db_user:
-                vac_rec = (
-                    db.query(Vacation)
-                      .filter(Vacation.user_id == db_user.id, Vacation.active == True)
-                      .order_by(Vacation.end_at.desc())
-                      .first()
+                vac_rec = None
+                if db_user:
+                    vac_rec = (
+                        db.query(Vacation)
+                          .filter(Vacation.user_id == db_user.id, Vacation.active == True)
+                          .order_by(Vacation.end_at.desc())
+                          .first()
+                    )
+                vac_status = "В отпуске" if vac_rec else "Не в отпуске"
+
+                warn_rec = (
+                    db.query(func.coalesce(func.max(Warning.level), 0))
+                      .filter(Warning.user_id == (db_user.id if db_user else None))
+                      .scalar()
+                    or 0
                 )
-            vac_status = "В отпуске" if vac_rec else "Не в отпуске"
 
-            warn_rec = (
-                db.query(func.coalesce(func.max(Warning.level), 0))
-                  .filter(Warning.user_id == (db_user.id if db_user else None))
-                  .scalar()
-                or 0
-            )
+                black_status = "Да" if (db_user and db_user.black_mark) else "Нет"
+
+                profile = index.classify_member(member)
+
+                steamid = db_user.steam_id if (db_user and db_user.steam_id) else "Не привязан"
 
-            black_status = "Да" if (db_user and db_user.black_mark) else "Нет"
-
-            rank = "Нет"
-            for rid, title in [
-                (arc_id,       "Полковник"),
-                (lrc_gimel_id, "Подполковник GIMEL"),
-                (lrc_id,       "Подполковник"),
-                (mjr_gimel_id, "Майор GIMEL"),
-                (mjr_id,       "Майор"),
-                (cpt_id,       "Капитан"),
-                (slt_id,       "Старший лейтенант"),
-                (lt_id,        "Лейтенант"),
-                (jlt_id,       "Младший лейтенант"),
-            ]:
-                role_obj = member.guild.get_role(rid)
-                if role_obj and role_obj in member.roles:
-                    rank = title
-                    break
-
-            steamid = db_user.steam_id if (db_user and db_user.steam_id) else "Не привязан"
-
-            if db_user and db_user.curator_id:
-                curator_db = db.query(User).get(db_user.curator_id)
-                if curator_db:
-                    cm = member.guild.get_member(curator_db.discord_id)
-                    curator = cm.mention if cm else f"<@{curator_db.discord_id}>"
+                if db_user and db_user.curator_id:
+                    curator_db = db.query(User).get(db_user.curator_id)
+                    if curator_db:
+                        cm = member.guild.get_member(curator_db.discord_id)
+                        curator = cm.mention if cm else f"<@{curator_db.discord_id}>"
+                    else:
+                        curator = "Не назначен"
                 else:
                     curator = "Не назначен"
-            else:
-                curator = "Не назначен"
-
-            total_duties = (
-                db.query(func.coalesce(func.sum(ActivityReport.duties), 0))
-                  .filter(ActivityReport.user_id == (db_user.id if db_user else None))
-                  .scalar()
-                or 0
-            )
-            total_interviews = (
-                db.query(func.count(InterrogationReport.id))
-                  .filter(InterrogationReport.user_id == (db_user.id if db_user else None))
-                  .scalar()
-                or 0
-            )
 
-            weekly_duties = (
-                db.query(func.coalesce(func.sum(ActivityReport.duties), 0))
-                  .filter(
-                      ActivityReport.user_id == (db_user.id if db_user else None),
-                      ActivityReport.date.between(week_start, week_end)
-                  )
-                  .scalar()
-                or 0
-            )
-            weekly_interviews = (
-                db.query(func.count(InterrogationReport.id))
-                  .filter(
-                      InterrogationReport.user_id == (db_user.id if db_user else None),
-                      InterrogationReport.date.between(week_start, week_end)
-                  )
-                  .scalar()
-                or 0
-            )
+                total_duties = (
+                    db.query(func.coalesce(func.sum(ActivityReport.duties), 0))
+                      .filter(ActivityReport.user_id == (db_user.id if db_user else None))
+                      .scalar()
+                    or 0
+                )
+                total_interviews = (
+                    db.query(func.count(InterrogationReport.id))
+                      .filter(InterrogationReport.user_id == (db_user.id if db_user else None))
+                      .scalar()
+                    or 0
+                )
 
-            positions = [
-                member.guild.get_role(rid).name
-                for _, rid in POST_MAP.items()
-                if (r := member.guild.get_role(rid)) and r in member.roles
-            ]
-            corps = [
-                member.guild.get_role(rid).name
-                for _, rid in CORPS_MAP.items()
-                if (r := member.guild.get_role(rid)) and r in member.roles
-            ]
-
-            return {
-                "member": member,
-                "total_points": total_points,
-                "vac_status": vac_status,
-                "warn_rec": warn_rec,
-                "black_status": black_status,
-                "rank": rank,
-                "position": ", ".join(positions) or "Нет",
-                "corps": ", ".join(corps) or "Не назначен",
-                "id": member.id,
-                "steamid": steamid,
-                "curator": curator,
-                "total_duties": total_duties,
-                "total_interviews": total_interviews,
-                "weekly_duties": weekly_duties,
-                "weekly_interviews": weekly_interviews,
-                "week_start": week_start,
-                "week_end": week_end,
-            }
+                weekly_duties = (
+                    db.query(func.coalesce(func.sum(ActivityReport.duties), 0))
+                      .filter(
+                          ActivityReport.user_id == (db_user.id if db_user else None),
+                          ActivityReport.date.between(week_start, week_end)
+                      )
+                      .scalar()
+                    or 0
+                )
+                weekly_interviews = (
+                    db.query(func.count(InterrogationReport.id))
+                      .filter(
+                          InterrogationReport.user_id == (db_user.id if db_user else None),
+                          InterrogationReport.date.between(week_start, week_end)
+                      )
+                      .scalar()
+                    or 0
+                )
+
+                return {
+                    "member": member,
+                    "total_points": total_points,
+                    "vac_status": vac_status,
+                    "warn_rec": warn_rec,
+                    "black_status": black_status,
+                    "rank": profile.rank_title,
+                    "position": ", ".join(r.name(member.guild) for r in profile.posts) or "Нет",
+                    "corps": ", ".join(r.name(member.guild) for r in profile.corps) or "Не назначен",
+                    "id": member.id,
+                    "steamid": steamid,
+                    "curator": curator,
+                    "total_duties": total_duties,
+                    "total_interviews": total_interviews,
+                    "weekly_duties": weekly_duties,
+                    "weekly_interviews": weekly_interviews,
+                    "weekly_verdict": RULES.verdict(RULES.norm_for_member(member), weekly_duties, weekly_interviews),
+                    "week_start": week_start,
+                    "week_end": week_end,
+                }
 
         except SQLAlchemyError:
             logging.exception("Ошибка в _gather_info")
             return None
-        finally:
-            db.close()
 
     @app_commands.guilds(discord.Object(id=DEVELOPMENT_GUILD_ID))
     @app_commands.command(name="info", description="Показать информацию о пользователе")
     @app_commands.describe(member="Пользователь")
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("info")
     async def slash_info(self, interaction: discord.Interaction, member: discord.Member):
         data = await self._gather_info(member)
         if data is None:
@@ -233,6 +193,7 @@ class InfoCog(commands.Cog):
         )
         em.add_field(name="• Дежурств",   value=str(data["weekly_duties"]),   inline=True)
         em.add_field(name="• Допросов",   value=str(data["weekly_interviews"]),inline=True)
+        em.add_field(name="• Норма",      value=self._verdict_text(data["weekly_verdict"]), inline=True)
 
         # GIF внизу
         em.set_image(url=GIF_URL)
@@ -241,19 +202,8 @@ class InfoCog(commands.Cog):
 
     @slash_info.error
     async def slash_info_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            err = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            err.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=err, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Ошибка в slash_info")
         if not interaction.response.is_done():
@@ -298,6 +248,7 @@ class InfoCog(commands.Cog):
         )
         em.add_field(name="• Дежурств",   value=str(data["weekly_duties"]),   inline=True)
         em.add_field(name="• Допросов",   value=str(data["weekly_interviews"]),inline=True)
+        em.add_field(name="• Норма",      value=self._verdict_text(data["weekly_verdict"]), inline=True)
 
         # GIF внизу
         em.set_image(url=GIF_URL)
@@ -0,0 +1,106 @@
+# commands/reconcile.py
+
+import asyncio
+import datetime
+import logging
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL, LOG_ROLES_CHANNEL_ID, RECONCILE_INTERVAL, ROLE_EDIT_INTERVAL
+import reconcile
+from roles import permissions
+
+
+# Сколько участников перечислять в одном разделе отчёта
+MAX_LINES = 15
+
+
+class ReconcileCog(commands.Cog):
+    """
+    Cog для слэш-команды /reconcile:
+      сверяет WARN-роли, чёрную метку и отпуск с БД; с repair — исправляет расхождения.
+    Раз в RECONCILE_INTERVAL сверка запускается сама (только отчёт в канал логов ролей).
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._lock = asyncio.Lock()
+
+    async def cog_load(self):
+        self._periodic = self.bot.supervisor.spawn("reconcile", self._reconcile_loop, restart=True)
+
+    async def cog_unload(self):
+        self._periodic.cancel()
+
+    def _build_embed(self, d: reconcile.Discrepancies, result: reconcile.RepairResult | None) -> discord.Embed:
+        em = discord.Embed(
+            title="Сверка ролей с базой",
+            color=discord.Color.from_rgb(255, 255, 255) if not d.total else discord.Color.orange(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        em.set_thumbnail(url=config.EMBLEM_URL)
+        em.description = f"Расхождений: **{d.total}**" if d.total else "✅ Расхождений нет."
+        for title, lines in d.sections():
+            shown = lines[:MAX_LINES]
+            if len(lines) > MAX_LINES:
+                shown.append(f"… и ещё {len(lines) - MAX_LINES}")
+            em.add_field(name=f"{title} ({len(lines)})", value="\n".join(shown)[:1024], inline=False)
+        if result is not None:
+            em.add_field(
+                name="🛠️ Исправлено",
+                value=(
+                    f"• Строк в БД — {result.db_rows}\n"
+                    f"• Ролей снято — {result.roles.changed}\n"
+                    f"• Ошибок — {result.roles.failed}"
+                ),
+                inline=False
+            )
+        return em
+
+    async def _reconcile_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(config.RECONCILE_INTERVAL)
+            guild = self.bot.get_guild(config.DEVELOPMENT_GUILD_ID)
+            if guild is None:
+                continue
+            async with self._lock:
+                d, _ = await reconcile.run(guild, repair=False)
+            if d.total:
+                channel = self.bot.get_channel(config.LOG_ROLES_CHANNEL_ID)
+                if channel is not None:
+                    await channel.send(embed=self._build_embed(d, None))
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="reconcile",
+        description="Сверить WARN, чёрную метку и отпуск с базой данных"
+    )
+    @app_commands.describe(repair="Исправить найденные расхождения")
+    @permissions.check("reconcile")
+    async def slash_reconcile(self, interaction: discord.Interaction, repair: bool = False):
+        if self._lock.locked():
+            return await interaction.response.send_message("❗ Сверка уже выполняется.", ephemeral=True)
+
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        async with self._lock:
+            d, result = await reconcile.run(
+                interaction.guild, repair=repair, interval=config.ROLE_EDIT_INTERVAL
+            )
+        await interaction.followup.send(embed=self._build_embed(d, result), ephemeral=True)
+
+    @slash_reconcile.error
+    async def slash_reconcile_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
+
+        logging.exception("Необработанная ошибка в slash_reconcile")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
+        else:
+            await interaction.followup.send("❗ Произошла ошибка.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ReconcileCog(bot))
@@ -15,19 +15,8 @@ from roles.constants import (
     CORPS_MAP,
     VACATION_MAP,
     POST_MAP,
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
 )
+from roles import permissions
 
 # Собираем все роли для снятия
 ROLE_MAP = {}
@@ -37,22 +26,6 @@ ROLE_MAP.update(VACATION_MAP)
 ROLE_MAP.update(POST_MAP)
 ALLOWED_ROLE_IDS = set(ROLE_MAP.values())
 
-# Те же роли, что и в addrole
-ALLOWED_ISSUER_ROLES = [
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-]
-
 
 class RemoveRoleCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -82,7 +55,7 @@ class RemoveRoleCog(commands.Cog):
         role="Роль для снятия",
         member="Пользователь, у которого снимаем роль (по умолчанию — вы)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("removerole")
     async def slash_removerole(
         self,
         interaction: discord.Interaction,
@@ -147,7 +120,7 @@ class RemoveRoleCog(commands.Cog):
                     )
                     if vac:
                         vac.active = False
-                        vac.end_at = datetime.datetime.utcnow()
+                        vac.end_at = datetime.datetime.now(datetime.timezone.utc)
                         db.commit()
                         note = "\nℹ️ Запись отпуска закрыта в базе."
             except Exception:
@@ -165,19 +138,8 @@ class RemoveRoleCog(commands.Cog):
 
     @slash_removerole.error
     async def slash_removerole_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = self._make_embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Ошибка в slash_removerole")
         em = self._make_embed(
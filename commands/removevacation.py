@@ -9,25 +9,9 @@ from discord import app_commands
 from discord.ext import commands
 
 from database import get_db, User, Vacation
-from roles.constants import  (
-    vacation_id,
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    master_office_id, worker_office_id,
-)
+from roles.constants import vacation_id
+from roles import permissions
 
-# Роли, которым разрешено вызывать /removevacation
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    master_office_id, worker_office_id,
-]
 
 # Баннер внизу эмбедов
 REMOVE_VACATION_BANNER = (
@@ -63,7 +47,7 @@ class RemoveVacationCog(commands.Cog):
     @app_commands.describe(
         member="Пользователь, у которого снимаем отпуск"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("removevacation")
     async def slash_removevacation(
         self,
         interaction: discord.Interaction,
@@ -125,7 +109,7 @@ class RemoveVacationCog(commands.Cog):
                 )
                 if vac:
                     vac.active = False
-                    vac.end_at = datetime.datetime.utcnow()
+                    vac.end_at = datetime.datetime.now(datetime.timezone.utc)
                     db.commit()
                     note = "\nℹ️ Запись отпуска закрыта в базе."
         except Exception:
@@ -133,6 +117,9 @@ class RemoveVacationCog(commands.Cog):
         finally:
             db.close()
 
+        # автоматическое снятие по сроку больше не нужно
+        self.bot.scheduler.cancel(f"vacation:{guild.id}:{member.id}")
+
         # 5) Финальный ответ
         await self._send_embed(
             interaction.followup.send,
@@ -143,20 +130,8 @@ class RemoveVacationCog(commands.Cog):
 
     @slash_removevacation.error
     async def slash_removevacation_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            em.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Ошибка в slash_removevacation")
         if not interaction.response.is_done():
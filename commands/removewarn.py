@@ -8,25 +8,10 @@ from discord import app_commands
 from discord.ext import commands
 
 import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
-from roles.constants import (
-    WARN_ROLE_IDS,
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    black_mark_id  # ID роли «чёрная метка»
-)
-from database import get_db, User, Warning
-
-# Роли, которым разрешено вызывать /removewarn
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-]
+from roles.constants import WARN_ROLE_IDS, black_mark_id
+from roles import permissions
+from database import db_session, User, Warning
+
 
 class RemoveWarnCog(commands.Cog):
     """
@@ -98,34 +83,30 @@ class RemoveWarnCog(commands.Cog):
                     await member.remove_roles(role_black, reason=f"Снята чёрная метка командой {interaction.user}")
                     removed_black = True
                     # При необходимости, обновить в БД флаг чёрной метки
-                    db_tmp = next(get_db())
-                    usr_tmp = db_tmp.query(User).filter_by(discord_id=member.id).first()
-                    if usr_tmp:
-                        usr_tmp.has_black_mark = False  # предположим, что в модели User есть поле has_black_mark
-                        db_tmp.commit()
-                    db_tmp.close()
+                    async with db_session() as db_tmp:
+                        usr_tmp = db_tmp.query(User).filter_by(discord_id=member.id).first()
+                        if usr_tmp:
+                            usr_tmp.black_mark = False
+                            db_tmp.commit()
                 except Exception:
                     logging.exception("Не удалось снять чёрную метку")
 
         # 5) Удаляем запись WARN из БД
-        db = next(get_db())
         try:
-            usr = db.query(User).filter_by(discord_id=member.id).first()
-            if usr:
-                last = (
-                    db.query(Warning)
-                      .filter_by(user_id=usr.id, level=count)
-                      .order_by(Warning.issued_at.desc())
-                      .first()
-                )
-                if last:
-                    db.delete(last)
-                    db.commit()
+            async with db_session() as db:
+                usr = db.query(User).filter_by(discord_id=member.id).first()
+                if usr:
+                    last = (
+                        db.query(Warning)
+                          .filter_by(user_id=usr.id, level=count)
+                          .order_by(Warning.issued_at.desc())
+                          .first()
+                    )
+                    if last:
+                        db.delete(last)
+                        db.commit()
         except Exception:
             logging.exception("Ошибка при удалении записи WARN из БД")
-            db.rollback()
-        finally:
-            db.close()
 
         # 6) Формируем итоговый эмбед
         em = self._make_embed(f"✅ Снят WARN {count}/3")
@@ -149,7 +130,7 @@ class RemoveWarnCog(commands.Cog):
         reason="Причина снятия WARN",
         remove_black="Снять чёрную метку? (True/False)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("removewarn")
     async def slash_removewarn(
         self,
         interaction: discord.Interaction,
@@ -165,16 +146,8 @@ class RemoveWarnCog(commands.Cog):
 
     @slash_removewarn.error
     async def slash_removewarn_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            em.add_field(name="Доступ имеют:", value=allowed or "—", inline=False)
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Необработанная ошибка в slash_removewarn")
         if not interaction.response.is_done():
@@ -1,36 +1,20 @@
 # commands/results.py
 
+import asyncio
 import datetime
 import logging
 
-import config  # DEVELOPMENT_GUILD_ID и EMBLEM_URL должны быть в config.py
+import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL, RESULTS_CHANNEL_ID, RESULTS_ROLLOVER
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import get
-from sqlalchemy import func
-
-from database import SessionLocal, User, ActivityReport, InterrogationReport
-from roles.constants import (
-    REPORT_ROLE_IDS,
-    vacation_id,
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    master_office_id, worker_office_id,
-)
 
-# Роли, которым разрешено вызывать /results
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    master_office_id, worker_office_id,
-]
+import metrics
+import weekly
+from pagination import Paginator, chunk
+from roles import index, permissions
+
 
 # Нижнее изображение
 BOTTOM_IMAGE_URL = (
@@ -38,19 +22,268 @@ BOTTOM_IMAGE_URL = (
     "1384127668391510070/1385682813801730259/image.png"
 )
 
+# Тип задачи планировщика для еженедельной публикации итогов
+PUBLISH_JOB = "results.publish"
+
+# Сколько недель держать в кэше
+CACHE_WEEKS = 8
+
+# Самый длинный диапазон /results from … to (в неделях)
+MAX_RANGE_WEEKS = 53
+
+# Участников на странице
+PAGE_SIZE = 20
+TRENDS_PAGE_SIZE = 15
+
+# Раздел отпускников в списке страниц (вместо role_id)
+VACATION_SECTION = 0
+
+# Ограничения Discord на одно сообщение
+MESSAGE_EMBEDS = 10
+MESSAGE_CHARS = 6000
+
+
+def _parse_day(text: str) -> datetime.date:
+    """'dd.mm.yyyy' или 'yyyy-mm-dd' → дата; ValueError при другом формате."""
+    text = text.strip()
+    try:
+        return datetime.datetime.strptime(text, "%d.%m.%Y").date()
+    except ValueError:
+        return datetime.date.fromisoformat(text)
+
+
 class ResultsCog(commands.Cog):
     """
     Cog для слэш-команды /results:
       выводит сводку по выполнению недельной нормы и список отпускников.
+    Итоги листаются постранично: по разделам (звание/штат, отпуск) и по
+    PAGE_SIZE участников; страница строится при нажатии кнопки.
+    В момент смены недели (RESULTS_ROLLOVER) итоги считаются один раз,
+    сохраняются в weekly_snapshots, публикуются в RESULTS_CHANNEL_ID и кэшируются —
+    повторные /results за эту неделю отдаются из кэша без пересчёта. Текущая неделя
+    тоже кэшируется при первом запросе и пересчитывается, только если изменились
+    её отчёты или роли участников.
+    Прошлые недели (week) и диапазоны (from/to) читаются из weekly_snapshots.
     """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._cache: dict[datetime.date, weekly.WeeklySnapshot] = {}
+        self._cache_stats = metrics.cache("results")
+
+    async def cog_load(self):
+        self.bot.scheduler.register(PUBLISH_JOB, self._publish_job)
+        if not self.bot.scheduler.pending(PUBLISH_JOB):
+            self._schedule_publish()
 
-    async def _do_results(self, interaction: discord.Interaction):
-        today = datetime.date.today()
-        week_start = today - datetime.timedelta(days=today.weekday())
-        week_end   = week_start + datetime.timedelta(days=6)
+    # ─────────────────── Снимок и кэш ───────────────────
+    def _schedule_publish(self):
+        moment = weekly.next_rollover(config.RESULTS_ROLLOVER)
+        # неделя — та, что заканчивается в момент смены
+        week_start, _ = weekly.week_bounds((moment - datetime.timedelta(seconds=1)).date())
+        self.bot.scheduler.schedule(
+            PUBLISH_JOB,
+            moment.timestamp(),
+            {"guild_id": config.DEVELOPMENT_GUILD_ID, "week_start": week_start.isoformat()},
+            key=f"results:{week_start.isoformat()}"
+        )
+
+    def _forget_live(self):
+        """Сбрасывает незамороженные снимки: они собраны по ролям, которые только что изменились."""
+        for week_start in [w for w, snap in self._cache.items() if not snap.frozen]:
+            del self._cache[week_start]
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        # звание, штат или отпуск — меняют раскладку по группам; отпечаток отчётов этого не видит
+        changed = set(before._roles).symmetric_difference(after._roles)
+        if not changed.isdisjoint(index.ROLE_INDEX):
+            self._forget_live()
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if not index.ROLE_INDEX.keys().isdisjoint(member._roles):
+            self._forget_live()
+
+    def _remember(self, snap: weekly.WeeklySnapshot):
+        # LRU: последняя использованная неделя — в конце, вытесняются самые давние
+        self._cache.pop(snap.week_start, None)
+        self._cache[snap.week_start] = snap
+        while len(self._cache) > CACHE_WEEKS:
+            del self._cache[next(iter(self._cache))]
+
+    async def _snapshot(self, guild: discord.Guild, week_start: datetime.date) -> weekly.WeeklySnapshot:
+        """
+        Снимок из кэша, если он заморожен или отчёты недели не менялись;
+        иначе пересчёт, который сразу кэшируется.
+        """
+        week_start, week_end = weekly.week_bounds(week_start)
+        cached = self._cache.get(week_start)
+        if cached is not None:
+            if cached.frozen:
+                self._cache_stats.hit()
+                self._remember(cached)
+                return cached
+            fingerprint = await asyncio.to_thread(weekly.load_fingerprint, week_start, week_end)
+            if fingerprint == cached.fingerprint:
+                self._cache_stats.hit()
+                self._remember(cached)
+                return cached
+        # промах или отчёты недели изменились — пересчитанный снимок заменит устаревший
+        self._cache_stats.miss()
+        snap = await weekly.compute(guild, week_start, week_end)
+        self._remember(snap)
+        return snap
+
+    async def _past_snapshot(self, guild: discord.Guild, week_start: datetime.date) -> weekly.WeeklySnapshot:
+        """Прошедшая неделя: замороженный снимок из кэша или БД, а если его нет — пересчёт по текущим ролям."""
+        cached = self._cache.get(week_start)
+        if cached is not None:
+            # незамороженный в кэше — значит, в БД этой недели нет: проверка по отпечатку
+            return await self._snapshot(guild, week_start)
+        snap = await asyncio.to_thread(weekly.load_snapshot, week_start)
+        if snap is None:
+            return await self._snapshot(guild, week_start)
+        self._cache_stats.miss()
+        self._remember(snap)
+        return snap
+
+    async def _publish_job(self, payload: dict):
+        """Задача планировщика: итоги недели один раз — в канал и в кэш; затем следующая неделя."""
+        try:
+            guild = self.bot.get_guild(payload["guild_id"])
+            if guild is None:
+                return
+            week_start = datetime.date.fromisoformat(payload["week_start"])
+            snap = await weekly.compute(guild, *weekly.week_bounds(week_start))
+            saved = await asyncio.to_thread(weekly.save_snapshot, snap)
+            # сохранённый снимок — тот же, что отдаст load_snapshot: больше не пересчитываем
+            snap.frozen = True
+            self._remember(snap)
+            logging.info("Снимок недели %s сохранён: %d участников", week_start, saved)
+            channel = self.bot.get_channel(config.RESULTS_CHANNEL_ID) if config.RESULTS_CHANNEL_ID else None
+            if channel is not None:
+                pages = self._pages(snap)
+                embeds = [self._render_page(guild, snap, pages, i) for i in range(len(pages))]
+                for batch in self._batches(embeds):
+                    await channel.send(embeds=batch)
+            logging.info(
+                "Итоги недели %s опубликованы (%s)", week_start,
+                f"канал {config.RESULTS_CHANNEL_ID}" if channel else "только кэш"
+            )
+        finally:
+            self._schedule_publish()
 
+    # ─────────────────── Страницы ───────────────────
+    @staticmethod
+    def _pages(snap: weekly.WeeklySnapshot) -> list[tuple[int, int, int]]:
+        """
+        Раскладка снимка по страницам: (раздел, смещение, номер страницы в разделе).
+        Раздел — role_id отчётной группы или VACATION_SECTION. Строки не строятся.
+        """
+        sections = [(rid, len(members)) for rid, members in snap.groups if members]
+        if snap.vacation:
+            sections.append((VACATION_SECTION, len(snap.vacation)))
+        pages = [
+            (section, offset, offset // PAGE_SIZE)
+            for section, size in sections
+            for offset in range(0, size, PAGE_SIZE)
+        ]
+        return pages or [(VACATION_SECTION, 0, 0)]
+
+    def _render_page(
+        self,
+        guild: discord.Guild,
+        snap: weekly.WeeklySnapshot,
+        pages: list[tuple[int, int, int]],
+        page: int
+    ) -> discord.Embed:
+        """Одна страница итогов — только её участники, из уже посчитанного снимка."""
+        section, offset, part = pages[page]
+        parts = sum(1 for s, _, _ in pages if s == section)
+        suffix = f" ({part + 1}/{parts})" if parts > 1 else ""
+
+        lines: list[str] = [f"**Результаты за {snap.week_start:%d.%m.%Y}–{snap.week_end:%d.%m.%Y}:**"]
+        if section == VACATION_SECTION:
+            if snap.vacation:
+                lines.append(f"\n**В отпуске:**{suffix}")
+                lines.extend(f"<@{m}>" for m in snap.vacation[offset:offset + PAGE_SIZE])
+            else:
+                lines.append("\nОтчётных участников нет.")
+        else:
+            emoji_ok   = get(guild.emojis, name="Odobreno") or "✅"
+            emoji_fail = get(guild.emojis, name="Otkazano") or "❌"
+            members = dict(snap.groups)[section]
+            lines.append(f"\n__{index.ROLE_INDEX[section].name(guild)}__{suffix}")
+            for r in members[offset:offset + PAGE_SIZE]:
+                emoji = emoji_ok if r.ok else emoji_fail
+                lines.append(f"<@{r.discord_id}>: дежурств {r.duties}, допросов {r.interviews} {emoji}")
+
+        # Формируем эмбед
+        em = discord.Embed(
+            title="Judgement Investigation — Итоги недели",
+            description="\n".join(lines),
+            color=discord.Color.from_rgb(255, 255, 255),
+            timestamp=datetime.datetime.utcfromtimestamp(snap.computed_at)
+        )
+        # миниатюра — ваш логотип
+        em.set_thumbnail(url=config.EMBLEM_URL)
+        # картинка внизу — только на последней странице
+        if page == len(pages) - 1:
+            em.set_image(url=BOTTOM_IMAGE_URL)
+        footer = f"Страница {page + 1}/{len(pages)}"
+        if not snap.frozen and snap.week_end < datetime.date.today():
+            footer += " · снимок недели не сохранён — пересчитано по текущим ролям"
+        em.set_footer(text=footer)
+        return em
+
+    @staticmethod
+    def _batches(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+        """Группирует эмбеды в сообщения в пределах лимитов Discord (10 эмбедов, 6000 символов)."""
+        batches: list[list[discord.Embed]] = []
+        size = 0
+        for em in embeds:
+            if not batches or len(batches[-1]) >= MESSAGE_EMBEDS or size + len(em) > MESSAGE_CHARS:
+                batches.append([])
+                size = 0
+            batches[-1].append(em)
+            size += len(em)
+        return batches
+
+    def _trends_embed(
+        self,
+        first_week: datetime.date,
+        last_week: datetime.date,
+        trends: list[weekly.MemberTrend],
+        page: int,
+        page_count: int
+    ) -> discord.Embed:
+        last_day = last_week + datetime.timedelta(days=6)
+        lines = [f"**Итоги за {first_week:%d.%m.%Y}–{last_day:%d.%m.%Y}:**"]
+        for t in trends:
+            lines.append(
+                f"<@{t.discord_id}>: норма {t.passed}/{t.weeks}, "
+                f"дежурств {t.duties}, допросов {t.interviews}, "
+                f"без нормы подряд {t.fail_streak} (макс. {t.max_fail_streak})"
+            )
+        if not trends:
+            lines.append("Сохранённых снимков за этот период нет.")
+
+        em = discord.Embed(
+            title="Judgement Investigation — Итоги за период",
+            description="\n".join(lines),
+            color=discord.Color.from_rgb(255, 255, 255)
+        )
+        em.set_thumbnail(url=config.EMBLEM_URL)
+        em.set_footer(text=f"Страница {page + 1}/{page_count} · отпускные недели не учитываются")
+        return em
+
+    async def _do_results(
+        self,
+        interaction: discord.Interaction,
+        week: str | None = None,
+        from_: str | None = None,
+        to: str | None = None
+    ):
         guild = interaction.guild
         if guild is None:
             return await interaction.followup.send(
@@ -58,105 +291,91 @@ class ResultsCog(commands.Cog):
                 ephemeral=True
             )
 
-        session = SessionLocal()
         try:
-            # Собираем строки в description
-            lines: list[str] = [f"**Результаты за {week_start:%d.%m.%Y}–{week_end:%d.%m.%Y}:**"]
+            today = datetime.date.today()
+            current_week, _ = weekly.week_bounds(today)
+            try:
+                if from_ or to:
+                    first_week, _ = weekly.week_bounds(_parse_day(from_) if from_ else today)
+                    last_week, _ = weekly.week_bounds(_parse_day(to) if to else today)
+                else:
+                    first_week = last_week = weekly.week_bounds(_parse_day(week) if week else today)[0]
+            except ValueError:
+                return await interaction.followup.send(
+                    "❗ Неверная дата. Формат: дд.мм.гггг или гггг-мм-дд.",
+                    ephemeral=True
+                )
+            if first_week > last_week:
+                first_week, last_week = last_week, first_week
+            if (last_week - first_week).days // 7 + 1 > MAX_RANGE_WEEKS:
+                return await interaction.followup.send(
+                    f"❗ Период не длиннее {MAX_RANGE_WEEKS} недель.",
+                    ephemeral=True
+                )
 
-            emoji_ok   = get(guild.emojis, name="Odobreno") or "✅"
-            emoji_fail = get(guild.emojis, name="Otkazano") or "❌"
+            if first_week != last_week:
+                trends = await asyncio.to_thread(weekly.load_trends, first_week, last_week)
+                # сначала те, кто дольше всех подряд без нормы
+                trends.sort(key=lambda t: (-t.fail_streak, -t.max_fail_streak, t.passed - t.weeks))
+                chunks = chunk(trends, TRENDS_PAGE_SIZE)
+                view = Paginator(
+                    lambda i: self._trends_embed(first_week, last_week, chunks[i], i, len(chunks)),
+                    len(chunks),
+                    author_id=interaction.user.id
+                )
+                return await view.send(interaction.followup)
 
-            for role_id in REPORT_ROLE_IDS:
-                role = guild.get_role(role_id)
-                if not role:
-                    continue
-                lines.append(f"\n__{role.name}__")
-                for member in role.members:
-                    db_user = session.query(User).filter_by(discord_id=member.id).first()
-                    if db_user:
-                        duties = (
-                            session.query(func.coalesce(func.sum(ActivityReport.duties), 0))
-                                   .filter(
-                                       ActivityReport.user_id == db_user.id,
-                                       ActivityReport.date.between(week_start, week_end)
-                                   )
-                                   .scalar()
-                        ) or 0
-                        interviews = (
-                            session.query(func.count(InterrogationReport.id))
-                                   .filter(
-                                       InterrogationReport.user_id == db_user.id,
-                                       InterrogationReport.date.between(week_start, week_end)
-                                   )
-                                   .scalar()
-                        ) or 0
-                    else:
-                        duties = interviews = 0
-
-                    ok = (duties >= 3 and interviews >= 1)
-                    emoji = emoji_ok if ok else emoji_fail
-                    lines.append(f"{member.mention}: дежурств {duties}, допросов {interviews} {emoji}")
-
-            # Отпускники
-            vac_role = guild.get_role(vacation_id)
-            if vac_role and vac_role.members:
-                lines.append("\n**В отпуске:**")
-                for m in vac_role.members:
-                    lines.append(f"{m.mention}")
-
-            description = "\n".join(lines)
-
-            # Формируем эмбед
-            em = discord.Embed(
-                title="Judgement Investigation — Итоги недели",
-                description=description,
-                color=discord.Color.from_rgb(255, 255, 255),
-                timestamp=datetime.datetime.utcnow()
+            if first_week > current_week:
+                return await interaction.followup.send("❗ Эта неделя ещё не началась.", ephemeral=True)
+            if first_week == current_week:
+                snap = await self._snapshot(guild, first_week)
+            else:
+                snap = await self._past_snapshot(guild, first_week)
+            # страницы строятся по нажатию кнопки из этого же снимка, без новых запросов
+            pages = self._pages(snap)
+            view = Paginator(
+                lambda i: self._render_page(guild, snap, pages, i),
+                len(pages),
+                author_id=interaction.user.id
             )
-            # миниатюра — ваш логотип
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            # картинка внизу
-            em.set_image(url=BOTTOM_IMAGE_URL)
-
-            await interaction.followup.send(embed=em)
-
+            await view.send(interaction.followup)
         except Exception:
             logging.exception("Ошибка в обработке /results")
             await interaction.followup.send(
                 "❗ Произошла ошибка при формировании результатов.",
                 ephemeral=True
             )
-        finally:
-            session.close()
 
     @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
     @app_commands.command(
         name="results",
         description="Сводка по недельной норме и отпускникам"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
-    async def slash_results(self, interaction: discord.Interaction):
+    @app_commands.rename(from_="from")
+    @app_commands.describe(
+        week="Любой день нужной недели (дд.мм.гггг); по умолчанию — текущая",
+        from_="Начало периода (дд.мм.гггг) — сводка по сохранённым неделям",
+        to="Конец периода (дд.мм.гггг); по умолчанию — текущая неделя"
+    )
+    @permissions.check("results")
+    async def slash_results(
+        self,
+        interaction: discord.Interaction,
+        week: str | None = None,
+        from_: str | None = None,
+        to: str | None = None
+    ):
         """
-        Слэш-команда /results — выводит сводку по нормам и отпускникам.
+        Слэш-команда /results — выводит сводку по нормам и отпускникам
+        за неделю или за период.
         """
         await interaction.response.defer(thinking=True)
-        await self._do_results(interaction)
+        await self._do_results(interaction, week, from_, to)
 
     @slash_results.error
     async def slash_results_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            err = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            err.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=err, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Необработанная ошибка в slash_results")
         if not interaction.response.is_done():
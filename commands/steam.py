@@ -10,22 +10,8 @@ from discord.ext import commands
 from sqlalchemy.exc import SQLAlchemyError
 
 from database import get_db, User
-from roles.constants import (
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-)
-
-# Роли, которым разрешено пользоваться steam-командами
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-]
+from roles import permissions
+
 
 class SteamCog(commands.Cog):
     """
@@ -111,7 +97,7 @@ class SteamCog(commands.Cog):
         steamid="SteamID формата STEAM_X:Y:Z",
         member="Пользователь (по умолчанию — вы)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("bindsteam")
     async def bindsteam(
         self,
         interaction: discord.Interaction,
@@ -125,19 +111,8 @@ class SteamCog(commands.Cog):
 
     @bindsteam.error
     async def bindsteam_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            embed = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            embed.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
         logging.exception("Необработанная ошибка в bindsteam")
         if not interaction.response.is_done():
             await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
@@ -149,7 +124,7 @@ class SteamCog(commands.Cog):
     @app_commands.describe(
         member="Пользователь (по умолчанию — вы)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("steamid")
     async def steamid(
         self,
         interaction: discord.Interaction,
@@ -162,19 +137,8 @@ class SteamCog(commands.Cog):
 
     @steamid.error
     async def steamid_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            embed = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            embed.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
         logging.exception("Необработанная ошибка в steamid")
         if not interaction.response.is_done():
             await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
@@ -186,7 +150,7 @@ class SteamCog(commands.Cog):
     @app_commands.describe(
         member="Пользователь (по умолчанию — вы)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("unbindsteam")
     async def unbindsteam(
         self,
         interaction: discord.Interaction,
@@ -199,19 +163,8 @@ class SteamCog(commands.Cog):
 
     @unbindsteam.error
     async def unbindsteam_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            embed = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            embed.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
         logging.exception("Необработанная ошибка в unbindsteam")
         if not interaction.response.is_done():
             await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
@@ -0,0 +1,110 @@
+# commands/tasks.py
+
+import datetime
+import logging
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
+from roles import permissions
+
+
+# Сколько задач и последних ошибок показывать в эмбеде
+TOP_N = 15
+
+STATE_ICONS = {
+    "running": "🟢",
+    "restarting": "🟡",
+    "finished": "⚪",
+    "failed": "🔴",
+    "cancelled": "⚫",
+}
+
+
+def _ago(ts: float | None) -> str:
+    if ts is None:
+        return "—"
+    return f"<t:{int(ts)}:R>"
+
+
+class TasksCog(commands.Cog):
+    """
+    Cog для слэш-команды /tasks:
+      фоновые задачи под надзором, их перезапуски и последние ошибки.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    def _build_embed(self) -> discord.Embed:
+        sup = self.bot.supervisor
+        st = sup.stats()
+        em = discord.Embed(
+            title="Judgement Investigation — Фоновые задачи",
+            color=discord.Color.from_rgb(255, 255, 255),
+            timestamp=datetime.datetime.utcnow()
+        )
+        em.set_thumbnail(url=config.EMBLEM_URL)
+        em.description = (
+            f"Работает: **{st['running']}** из {st['max_tasks']}\n"
+            f"Запущено всего: **{st['spawned']}**, отклонено по лимиту: **{st['rejected']}**\n"
+            f"Падений: **{st['failed']}**, перезапусков: **{st['restarts']}**"
+        )
+
+        sched = getattr(self.bot, "scheduler", None)
+        if sched is not None:
+            ss = sched.stats()
+            em.add_field(
+                name="Планировщик",
+                value=(
+                    f"• В расписании — {ss['pending']}\n"
+                    f"• Просрочено — {ss['overdue']}\n"
+                    f"• Выполнено/ошибок — {ss['completed']}/{ss['failed']}"
+                ),
+                inline=False
+            )
+
+        now = time.time()
+        for t in sup.tasks[:TOP_N]:
+            value = (
+                f"• Состояние — {t.state}\n"
+                f"• Работает — {int(now - t.started_at)} c\n"
+                f"• Перезапусков — {t.restarts}"
+            )
+            if t.last_error:
+                value += f"\n• Ошибка {_ago(t.last_error_at)} — `{t.last_error[:80]}`"
+            em.add_field(name=f"{STATE_ICONS.get(t.state, '')} {t.name}", value=value, inline=True)
+
+        if sup.recent_failures:
+            lines = [
+                f"{_ago(t.last_error_at)} **{t.name}** — `{t.last_error[:80]}`"
+                for t in reversed(sup.recent_failures)
+            ][:TOP_N]
+            em.add_field(name="Последние ошибки разовых задач", value="\n".join(lines)[:1024], inline=False)
+        return em
+
+    @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
+    @app_commands.command(
+        name="tasks",
+        description="Состояние фоновых задач бота"
+    )
+    @permissions.check("tasks")
+    async def slash_tasks(self, interaction: discord.Interaction):
+        await interaction.response.send_message(embed=self._build_embed(), ephemeral=True)
+
+    @slash_tasks.error
+    async def slash_tasks_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
+
+        logging.exception("Необработанная ошибка в slash_tasks")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❗ Произошла ошибка.", ephemeral=True)
+        else:
+            await interaction.followup.send("❗ Произошла ошибка.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(TasksCog(bot))
@@ -1,7 +1,7 @@
 # commands/temprole.py
 
 import re
-import asyncio
+import time
 import datetime
 import logging
 
@@ -11,25 +11,14 @@ from discord import app_commands
 from discord.ext import commands
 from typing import Optional
 
-from database import get_db, User, Vacation
+from database import db_session, User, Vacation
 from roles.constants import (
     RANKS_MAP,
     CORPS_MAP,
     VACATION_MAP,
     POST_MAP,
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
 )
+from roles import permissions
 
 # Словарь всех ключ→ID ролей
 ROLE_MAP: dict[str, int] = {}
@@ -41,21 +30,8 @@ ROLE_MAP.update(POST_MAP)
 # Разрешённые ID ролей для выдачи
 ALLOWED_ROLE_IDS = set(ROLE_MAP.values())
 
-# Роли, которым можно вызывать /tempaddrole
-ALLOWED_ISSUER_ROLES = [
-    arc_id,
-    lrc_gimel_id,
-    lrc_id,
-    head_ji_id,
-    adjutant_ji_id,
-    leader_office_id,
-    leader_penal_battalion_id,
-    senate_id,
-    head_curator_id,
-    director_office_id,
-    leader_main_corps_id,
-    leader_gimel_id,
-]
+# Тип задачи планировщика для снятия роли
+EXPIRE_JOB = "temprole.remove"
 
 
 class TempRoleCog(commands.Cog):
@@ -66,12 +42,16 @@ class TempRoleCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.bot.scheduler.register(EXPIRE_JOB, self._expire_role)
+
     async def _apply_role(
         self,
         role: discord.Role,
         duration: str,
         member: discord.Member,
-        send: callable
+        send: callable,
+        channel_id: int | None = None
     ):
         # 1) проверяем, что роль поддерживается
         if role.id not in ALLOWED_ROLE_IDS:
@@ -111,38 +91,62 @@ class TempRoleCog(commands.Cog):
 
         # 4) если отпуск — сохраняем в БД
         if role.id in VACATION_MAP.values():
-            db = next(get_db())
             try:
-                user = db.query(User).filter_by(discord_id=member.id).first()
-                if not user:
-                    user = User(discord_id=member.id, call_sign=None)
-                    db.add(user); db.flush()
-                now = datetime.datetime.utcnow()
-                vac = Vacation(
-                    user_id=user.id,
-                    start_at=now,
-                    end_at=now + datetime.timedelta(seconds=total_seconds),
-                    active=True
-                )
-                db.add(vac)
-                db.commit()
+                async with db_session() as db:
+                    user = db.query(User).filter_by(discord_id=member.id).first()
+                    if not user:
+                        user = User(discord_id=member.id, call_sign=None)
+                        db.add(user); db.flush()
+                    now = datetime.datetime.now(datetime.timezone.utc)
+                    vac = Vacation(
+                        user_id=user.id,
+                        start_at=now,
+                        end_at=now + datetime.timedelta(seconds=total_seconds),
+                        active=True
+                    )
+                    db.add(vac)
+                    db.commit()
             except Exception:
                 logging.exception("Ошибка при сохранении отпуска в БД")
-            finally:
-                db.close()
 
-        # 5) планируем снятие
-        async def _remove():
-            await asyncio.sleep(total_seconds)
-            try:
-                await member.remove_roles(role, reason=f"Истёк срок {duration}")
+        # 5) планируем снятие — через планировщик, чтобы пережить перезапуск бота
+        self.bot.scheduler.schedule(
+            EXPIRE_JOB,
+            time.time() + total_seconds,
+            {
+                "guild_id": member.guild.id,
+                "member_id": member.id,
+                "role_id": role.id,
+                "duration": duration,
+                "channel_id": channel_id,
+            },
+            key=f"temprole:{member.guild.id}:{member.id}:{role.id}"
+        )
+
+    async def _expire_role(self, payload: dict):
+        """Снятие временной роли по истечении срока (задача планировщика)."""
+        guild = self.bot.get_guild(payload["guild_id"])
+        if guild is None:
+            return
+        role = guild.get_role(payload["role_id"])
+        try:
+            member = guild.get_member(payload["member_id"]) or await guild.fetch_member(payload["member_id"])
+        except discord.NotFound:
+            member = None
+        if role is None or member is None:
+            return
+
+        try:
+            await member.remove_roles(role, reason=f"Истёк срок {payload['duration']}")
+            channel = self.bot.get_channel(payload["channel_id"]) if payload.get("channel_id") else None
+            if channel is not None:
                 try:
-                    await send(f"⌛ Время вышло: роль **{role.name}** снята с {member.mention}.")
+                    await channel.send(f"⌛ Время вышло: роль **{role.name}** снята с {member.mention}.")
                 except:
                     pass
-                if role.id in VACATION_MAP.values():
-                    db2 = next(get_db())
-                    try:
+            if role.id in VACATION_MAP.values():
+                try:
+                    async with db_session() as db2:
                         u2 = db2.query(User).filter_by(discord_id=member.id).first()
                         if u2:
                             last = (
@@ -153,16 +157,12 @@ class TempRoleCog(commands.Cog):
                             )
                             if last:
                                 last.active = False
-                                last.end_at = datetime.datetime.utcnow()
+                                last.end_at = datetime.datetime.now(datetime.timezone.utc)
                                 db2.commit()
-                    except Exception:
-                        logging.exception("Ошибка при закрытии отпуска в БД")
-                    finally:
-                        db2.close()
-            except Exception:
-                logging.exception("Ошибка при снятии временной роли")
-
-        self.bot.loop.create_task(_remove())
+                except Exception:
+                    logging.exception("Ошибка при закрытии отпуска в БД")
+        except Exception:
+            logging.exception("Ошибка при снятии временной роли")
 
     @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
     @app_commands.command(
@@ -175,7 +175,7 @@ class TempRoleCog(commands.Cog):
         member="Пользователь, которому выдаётся роль"
     )
     @app_commands.checks.has_permissions(manage_roles=True)
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("tempaddrole")
     async def tempaddrole(
         self,
         interaction: discord.Interaction,
@@ -192,24 +192,13 @@ class TempRoleCog(commands.Cog):
             )
 
         await interaction.response.defer(thinking=True)
-        await self._apply_role(role, duration, member, interaction.followup.send)
+        await self._apply_role(role, duration, member, interaction.followup.send, interaction.channel_id)
 
     @tempaddrole.error
     async def tempaddrole_error(self, interaction: discord.Interaction, error):
         # нет ни одной из спец-ролей
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            embed = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступ к этой команде.",
-                color=discord.Color.red()
-            )
-            embed.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         # нет права Manage Roles у юзера
         if isinstance(error, app_commands.MissingPermissions):
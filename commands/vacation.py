@@ -1,8 +1,9 @@
 # commands/vacation.py
 
 import re
-import datetime
+import time
 import asyncio
+import datetime
 import logging
 
 import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
@@ -10,26 +11,44 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from roles.constants import (
-    vacation_id,
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    master_office_id, worker_office_id,
-)
-from database import get_db, User, Vacation
-
-# Роли, которым разрешено вызывать /vacation
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-    master_office_id, worker_office_id,
-]
+from roles.constants import vacation_id
+from roles import permissions
+from sqlalchemy import text
+
+import role_edits
+from database import db_session, session_scope, User, Vacation
+
+
+# Тип задачи планировщика для окончания отпуска
+EXPIRE_JOB = "vacation.end"
+
+# Закрываем все истёкшие отпуска одним запросом (частичный индекс ix_vacations_active_end_at).
+# Возвращаем только тех, у кого не осталось другого действующего отпуска — с них снимаем роль.
+# Подзапрос видит снимок до UPDATE, поэтому закрываемые строки отсекает условие end_at >= now().
+_SWEEP_EXPIRED = text("""
+    WITH closed AS (
+        UPDATE vacations
+           SET active = false
+         WHERE active AND end_at < now()
+     RETURNING user_id
+    )
+    SELECT DISTINCT u.discord_id
+      FROM closed
+      JOIN users AS u ON u.id = closed.user_id
+     WHERE NOT EXISTS (
+           SELECT 1 FROM vacations AS v
+            WHERE v.user_id = closed.user_id AND v.active AND v.end_at >= now()
+     )
+""")
+
+
+def sweep_expired_vacations() -> list[int]:
+    """Закрывает истёкшие отпуска; возвращает discord id, с которых нужно снять роль."""
+    with session_scope() as db:
+        ids = list(db.scalars(_SWEEP_EXPIRED))
+        db.commit()
+    return ids
+
 
 # Картинка-баннер, выводимая внизу эмбедов
 VACATION_BANNER_URL = (
@@ -46,7 +65,33 @@ class VacationCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    async def _send_embed(self, send: callable, *, title: str, description: str, ephemeral: bool):
+    async def cog_load(self):
+        self.bot.scheduler.register(EXPIRE_JOB, self._expire_vacation)
+        self._sweeper = self.bot.supervisor.spawn("vacation-sweeper", self._sweep_loop, restart=True)
+
+    async def cog_unload(self):
+        self._sweeper.cancel()
+
+    async def _sweep_loop(self):
+        """Страховка для задач планировщика: закрывает всё, что истекло, и снимает роль."""
+        await self.bot.wait_until_ready()
+        while True:
+            member_ids = await asyncio.to_thread(sweep_expired_vacations)
+            if member_ids:
+                guild = self.bot.get_guild(config.DEVELOPMENT_GUILD_ID)
+                if guild is not None:
+                    res = await role_edits.remove_role_from(
+                        guild, member_ids, vacation_id,
+                        reason="Истёк срок отпуска",
+                        interval=config.ROLE_EDIT_INTERVAL
+                    )
+                    logging.info(
+                        f"Закрыто отпусков: {len(member_ids)}; роль снята у {res.changed}, "
+                        f"пропущено {res.skipped}, ошибок {res.failed}"
+                    )
+            await asyncio.sleep(config.VACATION_SWEEP_INTERVAL)
+
+    def _make_embed(self, *, title: str, description: str) -> discord.Embed:
         em = discord.Embed(
             title=title,
             description=description,
@@ -55,9 +100,18 @@ class VacationCog(commands.Cog):
         )
         em.set_thumbnail(url=config.EMBLEM_URL)
         em.set_image(url=VACATION_BANNER_URL)
-        await send(embed=em, ephemeral=ephemeral)
+        return em
+
+    async def _send_embed(self, send: callable, *, title: str, description: str, ephemeral: bool):
+        await send(embed=self._make_embed(title=title, description=description), ephemeral=ephemeral)
 
-    async def _do_vacation(self, member: discord.Member, duration: str, send: callable):
+    async def _do_vacation(
+        self,
+        member: discord.Member,
+        duration: str,
+        send: callable,
+        channel_id: int | None = None
+    ):
         # 1) Парсим русские суффиксы: XдYчZм
         m = re.fullmatch(
             r'(?:(?P<days>\d+)д)?(?:(?P<hours>\d+)ч)?(?:(?P<minutes>\d+)м)?',
@@ -112,26 +166,24 @@ class VacationCog(commands.Cog):
             )
 
         # 4) Сохраняем запись в БД
-        db = next(get_db())
         try:
-            user = db.query(User).filter_by(discord_id=member.id).first()
-            if not user:
-                user = User(discord_id=member.id)
-                db.add(user)
-                db.flush()
-            now = datetime.datetime.utcnow()
-            vac = Vacation(
-                user_id=user.id,
-                start_at=now,
-                end_at=now + datetime.timedelta(seconds=total_seconds),
-                active=True
-            )
-            db.add(vac)
-            db.commit()
+            async with db_session() as db:
+                user = db.query(User).filter_by(discord_id=member.id).first()
+                if not user:
+                    user = User(discord_id=member.id)
+                    db.add(user)
+                    db.flush()
+                now = datetime.datetime.now(datetime.timezone.utc)
+                vac = Vacation(
+                    user_id=user.id,
+                    start_at=now,
+                    end_at=now + datetime.timedelta(seconds=total_seconds),
+                    active=True
+                )
+                db.add(vac)
+                db.commit()
         except Exception:
             logging.exception("Ошибка при сохранении записи отпуска в БД")
-        finally:
-            db.close()
 
         # 5) Подтверждение автору
         await self._send_embed(
@@ -144,22 +196,43 @@ class VacationCog(commands.Cog):
             ephemeral=False
         )
 
-        # 6) Запускаем фоновую задачу для автоматического снятия
-        async def _remove():
-            await asyncio.sleep(total_seconds)
-            try:
+        # 6) Планируем автоматическое снятие (переживает перезапуск бота)
+        self.bot.scheduler.schedule(
+            EXPIRE_JOB,
+            time.time() + total_seconds,
+            {
+                "guild_id": member.guild.id,
+                "member_id": member.id,
+                "channel_id": channel_id,
+            },
+            key=f"vacation:{member.guild.id}:{member.id}"
+        )
+
+    async def _expire_vacation(self, payload: dict):
+        """Снятие роли отпуска и закрытие записи в БД (задача планировщика)."""
+        guild = self.bot.get_guild(payload["guild_id"])
+        if guild is None:
+            return
+        role = guild.get_role(vacation_id)
+        try:
+            member = guild.get_member(payload["member_id"]) or await guild.fetch_member(payload["member_id"])
+        except discord.NotFound:
+            member = None
+
+        try:
+            if member is not None and role is not None:
                 await member.remove_roles(role, reason="Истёк срок отпуска")
                 # уведомление о снятии роли
-                await self._send_embed(
-                    send,
-                    title="⌛ Отпуск завершён",
-                    description=f"Роль **{role.name}** снята с {member.mention}. Приятной работы!",
-                    ephemeral=False
-                )
-                # закрываем запись в БД
-                db2 = next(get_db())
-                try:
-                    u2 = db2.query(User).filter_by(discord_id=member.id).first()
+                channel = self.bot.get_channel(payload["channel_id"]) if payload.get("channel_id") else None
+                if channel is not None:
+                    await channel.send(embed=self._make_embed(
+                        title="⌛ Отпуск завершён",
+                        description=f"Роль **{role.name}** снята с {member.mention}. Приятной работы!"
+                    ))
+            # закрываем запись в БД
+            try:
+                async with db_session() as db2:
+                    u2 = db2.query(User).filter_by(discord_id=payload["member_id"]).first()
                     if u2:
                         last = (
                             db2.query(Vacation)
@@ -169,16 +242,12 @@ class VacationCog(commands.Cog):
                         )
                         if last:
                             last.active = False
-                            last.end_at = datetime.datetime.utcnow()
+                            last.end_at = datetime.datetime.now(datetime.timezone.utc)
                             db2.commit()
-                except Exception:
-                    logging.exception("Ошибка при закрытии записи отпуска в БД")
-                finally:
-                    db2.close()
             except Exception:
-                logging.exception("Ошибка при снятии роли отпуска после истечения срока")
-
-        self.bot.loop.create_task(_remove())
+                logging.exception("Ошибка при закрытии записи отпуска в БД")
+        except Exception:
+            logging.exception("Ошибка при снятии роли отпуска после истечения срока")
 
     @app_commands.guilds(discord.Object(id=config.DEVELOPMENT_GUILD_ID))
     @app_commands.command(
@@ -189,7 +258,7 @@ class VacationCog(commands.Cog):
         member="Пользователь, которому выдаётся отпуск",
         duration="Длительность: XдYчZм, например 2д5ч или 45м"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("vacation")
     async def vacation(
         self,
         interaction: discord.Interaction,
@@ -208,23 +277,12 @@ class VacationCog(commands.Cog):
             )
 
         await interaction.response.defer(thinking=True)
-        await self._do_vacation(member, duration, interaction.followup.send)
+        await self._do_vacation(member, duration, interaction.followup.send, interaction.channel_id)
 
     @vacation.error
     async def vacation_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            embed = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="Вы не имеете доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            embed.add_field(
-                name="Доступ имеют следующие роли:",
-                value=allowed or "—",
-                inline=False
-            )
-            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Необработанная ошибка в vacation")
         if not interaction.response.is_done():
@@ -10,22 +10,10 @@ import config  # DEVELOPMENT_GUILD_ID, EMBLEM_URL
 from roles.constants import (
     WARN_ROLE_IDS,
     black_mark_id,
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
 )
+from roles import permissions
 from database import get_db, User, Warning
 
-# Роли, которым разрешено выдавать WARN
-ALLOWED_ISSUER_ROLES = [
-    arc_id, lrc_gimel_id, lrc_id,
-    head_ji_id, adjutant_ji_id,
-    leader_office_id, leader_penal_battalion_id,
-    senate_id,
-    director_office_id, leader_main_corps_id, leader_gimel_id,
-]
 
 # Баннер для эмбеда
 WARN_BANNER_URL = (
@@ -168,7 +156,7 @@ class WarnCog(commands.Cog):
         reason="Причина выдачи WARN",
         give_black_mark="Выдать чёрную метку? (y/n)"
     )
-    @app_commands.checks.has_any_role(*ALLOWED_ISSUER_ROLES)
+    @permissions.check("warn")
     async def warn(
         self,
         interaction: discord.Interaction,
@@ -182,16 +170,8 @@ class WarnCog(commands.Cog):
 
     @warn.error
     async def warn_error(self, interaction: discord.Interaction, error):
-        if isinstance(error, app_commands.MissingAnyRole):
-            allowed = " ".join(f"<@&{rid}>" for rid in ALLOWED_ISSUER_ROLES)
-            em = discord.Embed(
-                title="❌ Доступ запрещён",
-                description="У вас нет доступа к этой команде.",
-                color=discord.Color.red()
-            )
-            em.set_thumbnail(url=config.EMBLEM_URL)
-            em.add_field(name="Доступ имеют:", value=allowed or "—", inline=False)
-            return await interaction.response.send_message(embed=em, ephemeral=True)
+        if isinstance(error, permissions.AccessDenied):
+            return await interaction.response.send_message(embed=error.embed, ephemeral=True)
 
         logging.exception("Необработанная ошибка в warn")
         if not interaction.response.is_done():
@@ -1,4 +1,11 @@
 # config.py
+import os
+
+from dotenv import load_dotenv
+
+# Настройки окружения (токен, порты) — из token.env
+load_dotenv(dotenv_path="token.env")
+
 # ID вашей тестовой (development) гильдии
 DEVELOPMENT_GUILD_ID = 1097939558693347328  # замените на ваш реальный ID
 DENIED_CHANNEL_ID = 1385302922174402590
@@ -6,4 +13,61 @@ EMBLEM_URL = "https://media.discordapp.net/attachments/1100142390888632422/13828
 LOG_MESSAGE_CHANNEL_ID = 1359222955636166687 # логи сообщений
 LOG_ROLES_CHANNEL_ID = 1359222520972054598 # логи ролей
 LOG_NICK_CHANNEL_ID = 1359222559760978002 # логи ников
-LOG_PEOPLE_CHANNEL_ID = 1359222583416983633 # логи людей
\ No newline at end of file
+LOG_PEOPLE_CHANNEL_ID = 1359222583416983633 # логи людей
+
+# Статистика команд (/botstats): JSON-выгрузка и интервал записи в секундах
+BOTSTATS_DUMP_PATH = "botstats.json"
+BOTSTATS_DUMP_INTERVAL = 60
+
+# Эндпоинт метрик Prometheus (GET /metrics); METRICS_PORT=0 — не запускать
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Журнал медленных запросов: порог в мс, файл (с ротацией), снимать ли EXPLAIN
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "slow_queries.log")
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") != "0"
+
+# Сторож цикла событий: порог затыка в мс; с WATCHDOG_PROFILE_PATH — сэмплирование стека
+WATCHDOG_THRESHOLD_MS = float(os.getenv("WATCHDOG_THRESHOLD_MS", "250"))
+WATCHDOG_PROFILE_PATH = os.getenv("WATCHDOG_PROFILE_PATH") or None
+WATCHDOG_SAMPLE_HZ = float(os.getenv("WATCHDOG_SAMPLE_HZ", "50"))
+
+# Очередь новых отчётов в Events: ёмкость и сколько ждать места, прежде чем сбросить
+REPORT_QUEUE_MAX = int(os.getenv("REPORT_QUEUE_MAX", "200"))
+REPORT_QUEUE_PUT_TIMEOUT = float(os.getenv("REPORT_QUEUE_PUT_TIMEOUT", "5"))
+
+# Отложенные задачи планировщика и остановка бота
+SCHEDULER_STATE_PATH = os.getenv("SCHEDULER_STATE_PATH", "scheduler_state.json")
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+
+# Предел одновременно работающих фоновых задач под надзором (/tasks)
+MAX_BACKGROUND_TASKS = int(os.getenv("MAX_BACKGROUND_TASKS", "200"))
+
+# Логирование (см. logconfig.py): уровни, прореживание, JSON-файл с ротацией
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "discord.gateway=WARNING")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "events.trace=0.01")
+LOG_PATH = os.getenv("LOG_PATH", "bot.log") or None
+LOG_CONSOLE_FORMAT = os.getenv("LOG_CONSOLE_FORMAT", "text")
+
+# Сборщик истёкших отпусков: период в секундах; пауза между изменениями ролей
+VACATION_SWEEP_INTERVAL = float(os.getenv("VACATION_SWEEP_INTERVAL", "300"))
+ROLE_EDIT_INTERVAL = float(os.getenv("ROLE_EDIT_INTERVAL", "0.5"))
+
+# Плановая сверка ролей с БД (только отчёт в LOG_ROLES_CHANNEL_ID), период в секундах
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "21600"))
+
+# Еженедельная публикация итогов: момент смены недели ("день час:мин", 0 = пн … 6 = вс,
+# локальное время) и канал (0 — только кэш, без публикации)
+RESULTS_ROLLOVER = os.getenv("RESULTS_ROLLOVER", "6 23:00")
+RESULTS_CHANNEL_ID = int(os.getenv("RESULTS_CHANNEL_ID", "0"))
+
+# Правила недельной нормы по званиям, штатам и должностям (см. rules.py); нет файла — 3 дежурства и 1 допрос
+NORM_RULES_PATH = os.getenv("NORM_RULES_PATH", "norm_rules.json")
+
+# Поиск неактивных (нет отчётов о деятельности INACTIVE_WEEKS недель): период проверки
+# в секундах и канал для отчёта (0 — только лог)
+INACTIVE_WEEKS = int(os.getenv("INACTIVE_WEEKS", "2"))
+INACTIVE_INTERVAL = float(os.getenv("INACTIVE_INTERVAL", "86400"))
+INACTIVE_CHANNEL_ID = int(os.getenv("INACTIVE_CHANNEL_ID", "0"))
@@ -0,0 +1,331 @@
+# curators.py
+#
+# Иерархия кураторов (users.curator_id → users.id) одним запросом:
+# рекурсивный CTE обходит поддерево, к нему слева присоединяются недельные
+# агрегаты отчётов и действующие отпуска. Никаких ленивых User.mentees —
+# одна выборка на весь список подопечных или на весь отчёт о нагрузке.
+#
+# Путь от корня (массив users.id) защищает от циклов в назначениях
+# и задаёт порядок вывода «родитель, затем его подопечные».
+#
+# Массовые назначения (reassign_all, distribute) — одна транзакция:
+# нагрузка кураторов одним GROUP BY, запись одним UPDATE/executemany.
+#
+# Выполнение нормы считается в том же запросе по правилам rules.py:
+# нестандартные нормы участников приходят производной таблицей norms.
+
+import datetime
+import heapq
+from dataclasses import dataclass
+from typing import Mapping
+
+from sqlalchemy import Integer, and_, case, cast, func, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, array, insert as pg_insert
+
+from database import session_scope, User, ActivityReport, InterrogationReport, Vacation
+from rules import RULES, Norm
+
+
+def current_week(today: datetime.date | None = None) -> tuple[datetime.date, datetime.date]:
+    today = today or datetime.date.today()
+    week_start = today - datetime.timedelta(days=today.weekday())
+    return week_start, week_start + datetime.timedelta(days=6)
+
+
+@dataclass
+class MenteeRow:
+    discord_id: int
+    call_sign: str
+    depth: int                  # 1 — прямой подопечный
+    curator_discord_id: int
+    duties: int
+    interviews: int
+    on_vacation: bool
+    ok: bool                    # норма выполнена (по правилам rules.py)
+
+
+@dataclass
+class CuratorLoad:
+    discord_id: int
+    call_sign: str
+    direct: int                 # прямые подопечные
+    subtree: int                # всё поддерево
+    compliant: int              # выполнили норму (без отпускников)
+    on_vacation: int
+
+
+def _weekly_aggregates(week_start: datetime.date, week_end: datetime.date):
+    """Подзапросы: дежурства, допросы и действующий отпуск по user_id."""
+    duties = (
+        select(ActivityReport.user_id, func.sum(ActivityReport.duties).label("duties"))
+        .where(ActivityReport.date.between(week_start, week_end))
+        .group_by(ActivityReport.user_id)
+        .subquery("wd")
+    )
+    interviews = (
+        select(InterrogationReport.user_id, func.count().label("interviews"))
+        .where(InterrogationReport.date.between(week_start, week_end))
+        .group_by(InterrogationReport.user_id)
+        .subquery("wi")
+    )
+    vacation = (
+        select(Vacation.user_id)
+        .where(Vacation.active.is_(True), Vacation.end_at >= func.now())
+        .group_by(Vacation.user_id)
+        .subquery("wv")
+    )
+    return duties, interviews, vacation
+
+
+def _tree_cte(root_filter, max_depth: int | None):
+    """
+    Рекурсивный CTE (root_id, id, curator_id, depth, path).
+    Якорь — прямые подопечные кураторов, подходящих под root_filter.
+    """
+    anchor = (
+        select(
+            User.curator_id.label("root_id"),
+            User.id.label("id"),
+            User.curator_id.label("curator_id"),
+            literal(1, Integer).label("depth"),
+            cast(array([User.curator_id, User.id]), ARRAY(Integer)).label("path"),
+        )
+        .where(User.curator_id.is_not(None), root_filter)
+        .cte("tree", recursive=True)
+    )
+    child = User.__table__.alias("child")
+    step = (
+        select(
+            anchor.c.root_id,
+            child.c.id,
+            child.c.curator_id,
+            anchor.c.depth + 1,
+            func.array_append(anchor.c.path, child.c.id),
+        )
+        .join(anchor, child.c.curator_id == anchor.c.id)
+        .where(child.c.id != func.all(anchor.c.path))
+    )
+    if max_depth is not None:
+        step = step.where(anchor.c.depth < max_depth)
+    return anchor.union_all(step)
+
+
+def load_mentees(
+    curator_discord_id: int,
+    week_start: datetime.date,
+    week_end: datetime.date,
+    *,
+    recursive: bool = True,
+    norms: Mapping[int, Norm] | None = None
+) -> list[MenteeRow]:
+    """
+    Подопечные куратора (всё поддерево или только прямые) с недельными итогами.
+    norms — нестандартные нормы по discord id (RULES.guild_norms), остальным — норма по умолчанию.
+    """
+    root = select(User.id).where(User.discord_id == curator_discord_id).scalar_subquery()
+    tree = _tree_cte(User.curator_id == root, None if recursive else 1)
+    duties, interviews, vacation = _weekly_aggregates(week_start, week_end)
+    norm = RULES.sql_table(norms or {})
+    member = User.__table__.alias("member")
+    parent = User.__table__.alias("parent")
+    d = func.coalesce(duties.c.duties, 0)
+    i = func.coalesce(interviews.c.interviews, 0)
+
+    stmt = (
+        select(
+            member.c.discord_id,
+            member.c.call_sign,
+            tree.c.depth,
+            parent.c.discord_id,
+            d,
+            i,
+            vacation.c.user_id.is_not(None),
+            RULES.sql_passed(norm, d, i),
+        )
+        .select_from(tree)
+        .join(member, member.c.id == tree.c.id)
+        .join(parent, parent.c.id == tree.c.curator_id)
+        .outerjoin(duties, duties.c.user_id == tree.c.id)
+        .outerjoin(interviews, interviews.c.user_id == tree.c.id)
+        .outerjoin(vacation, vacation.c.user_id == tree.c.id)
+        .outerjoin(norm, norm.c.discord_id == member.c.discord_id)
+        .order_by(tree.c.path)
+    )
+    with session_scope() as db:
+        return [MenteeRow(*row) for row in db.execute(stmt).all()]
+
+
+def load_workload(
+    week_start: datetime.date,
+    week_end: datetime.date,
+    norms: Mapping[int, Norm] | None = None
+) -> list[CuratorLoad]:
+    """Нагрузка всех кураторов: размер поддерева и выполнение нормы в нём, одним запросом."""
+    tree = _tree_cte(literal(True), None)
+    duties, interviews, vacation = _weekly_aggregates(week_start, week_end)
+    norm = RULES.sql_table(norms or {})
+    member = User.__table__.alias("member")
+    on_vac = vacation.c.user_id.is_not(None)
+    ok = and_(
+        ~on_vac,
+        RULES.sql_passed(norm, func.coalesce(duties.c.duties, 0), func.coalesce(interviews.c.interviews, 0)),
+    )
+    agg = (
+        select(
+            tree.c.root_id,
+            func.count().filter(tree.c.depth == 1).label("direct"),
+            func.count().label("subtree"),
+            func.sum(case((ok, 1), else_=0)).label("compliant"),
+            func.sum(case((on_vac, 1), else_=0)).label("on_vacation"),
+        )
+        .select_from(tree)
+        .outerjoin(duties, duties.c.user_id == tree.c.id)
+        .outerjoin(interviews, interviews.c.user_id == tree.c.id)
+        .outerjoin(vacation, vacation.c.user_id == tree.c.id)
+        .join(member, member.c.id == tree.c.id)
+        .outerjoin(norm, norm.c.discord_id == member.c.discord_id)
+        .group_by(tree.c.root_id)
+        .subquery("workload")
+    )
+    stmt = (
+        select(User.discord_id, User.call_sign, agg.c.direct, agg.c.subtree, agg.c.compliant, agg.c.on_vacation)
+        .join(agg, agg.c.root_id == User.id)
+        .order_by(agg.c.subtree.desc(), User.call_sign)
+    )
+    with session_scope() as db:
+        return [CuratorLoad(*row) for row in db.execute(stmt).all()]
+
+
+# ─────────────────── Массовое назначение ───────────────────
+class CallSignTaken(ValueError):
+    """Позывной нового пользователя уже занят другим участником (uq_users_call_sign)."""
+
+    def __init__(self, discord_ids: list[int]):
+        super().__init__(discord_ids)
+        self.discord_ids = discord_ids
+
+
+def _ensure_users(db, names: dict[int, str]) -> dict[int, int]:
+    """
+    Создаёт недостающих пользователей одним INSERT; возвращает discord_id → users.id.
+    Если позывной нового пользователя занят другим — CallSignTaken (без частичной записи).
+    """
+    if not names:
+        return {}
+    existing = set(db.scalars(select(User.discord_id).where(User.discord_id.in_(list(names)))))
+    missing = {d: n for d, n in names.items() if d not in existing}
+    if missing:
+        taken = set(db.scalars(select(User.call_sign).where(User.call_sign.in_(list(missing.values())))))
+        clashes = [d for d, n in missing.items() if n in taken]
+        if clashes:
+            raise CallSignTaken(clashes)
+        db.execute(
+            pg_insert(User)
+            .values([{"discord_id": d, "call_sign": n, "black_mark": False} for d, n in missing.items()])
+            # конфликт только по discord_id (параллельная вставка); по позывному — ошибка
+            .on_conflict_do_nothing(index_elements=[User.discord_id])
+        )
+    return dict(db.execute(
+        select(User.discord_id, User.id).where(User.discord_id.in_(list(names)))
+    ).all())
+
+
+def _descendants(db, root_ids) -> set[tuple[int, int]]:
+    """Пары (предок, потомок) по users.id для поддеревьев root_ids — одним рекурсивным запросом."""
+    if not root_ids:
+        return set()
+    tree = _tree_cte(User.curator_id.in_(list(root_ids)), None)
+    return set(db.execute(select(tree.c.root_id, tree.c.id)).all())
+
+
+def current_loads(db, curator_ids) -> dict[int, int]:
+    """Число прямых подопечных по users.id кураторов — один GROUP BY."""
+    loads = dict.fromkeys(curator_ids, 0)
+    loads.update(db.execute(
+        select(User.curator_id, func.count())
+        .where(User.curator_id.in_(list(curator_ids)))
+        .group_by(User.curator_id)
+    ).all())
+    return loads
+
+
+class CuratorCycle(ValueError):
+    """Назначение замкнуло бы цепочку кураторов в цикл; discord_ids — кураторы, из-за которых."""
+
+    def __init__(self, discord_ids: list[int] | None = None):
+        super().__init__(discord_ids or [])
+        self.discord_ids = discord_ids or []
+
+
+def reassign_all(from_discord_id: int, to_discord_id: int, to_name: str) -> int:
+    """
+    Все прямые подопечные куратора from → куратору to, одним UPDATE в одной транзакции.
+    Возвращает число переназначенных.
+    """
+    with session_scope() as db:
+        ids = _ensure_users(db, {to_discord_id: to_name})
+        src = db.scalar(select(User.id).where(User.discord_id == from_discord_id))
+        dst = ids.get(to_discord_id)
+        if src is None or dst is None:
+            return 0
+        if (src, dst) in _descendants(db, [src]):
+            # to — сам в поддереве from: его подопечные стали бы его же кураторами
+            raise CuratorCycle
+        moved = db.execute(
+            update(User)
+            .where(User.curator_id == src, User.id != dst)
+            .values(curator_id=dst)
+        ).rowcount
+        db.commit()
+        return moved
+
+
+@dataclass
+class Distribution:
+    assigned: dict[int, list[int]]      # discord id куратора → discord id назначенных
+    skipped: list[int]                  # нельзя назначить (нет в БД)
+
+
+def distribute(member_names: dict[int, str], curator_names: dict[int, str]) -> Distribution:
+    """
+    Раздаёт участников кураторам по текущей нагрузке: каждый следующий — наименее
+    загруженному. Нагрузка — один GROUP BY, запись — один executemany, всё в одной транзакции.
+
+    Если кто-то из кураторов сейчас в поддереве кого-то из раздаваемых участников,
+    весь список отклоняется (CuratorCycle): проверка по дереву до записи не видит
+    циклов, которые появляются только после нескольких назначений из пачки.
+    Без таких кураторов цепочка предков любого куратора не содержит раздаваемых
+    участников и после записи, поэтому цикл невозможен.
+    """
+    result = Distribution(assigned={c: [] for c in curator_names}, skipped=[])
+    with session_scope() as db:
+        ids = _ensure_users(db, {**member_names, **curator_names})
+        by_user_id = {uid: did for did, uid in ids.items()}
+        curator_ids = [ids[c] for c in curator_names if c in ids]
+        members = [ids[m] for m in member_names if m in ids and m not in curator_names]
+        result.skipped = [m for m in member_names if m not in ids]
+
+        curator_set = set(curator_ids)
+        nested = sorted({c for _, c in _descendants(db, members) if c in curator_set})
+        if nested:
+            raise CuratorCycle([by_user_id[c] for c in nested])
+
+        loads = current_loads(db, curator_ids)
+        # переназначаемые уходят от прежних кураторов из этого же списка
+        for (prev,) in db.execute(select(User.curator_id).where(User.id.in_(members))).all():
+            if prev in loads:
+                loads[prev] -= 1
+
+        heap = [(load, cid) for cid, load in loads.items()]
+        heapq.heapify(heap)
+        updates = []
+        for member_id in members:
+            load, cid = heapq.heappop(heap)
+            updates.append({"id": member_id, "curator_id": cid})
+            result.assigned[by_user_id[cid]].append(by_user_id[member_id])
+            heapq.heappush(heap, (load + 1, cid))
+
+        if updates:
+            db.execute(update(User), updates)
+        db.commit()
+    return result
@@ -1,10 +1,17 @@
 import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Boolean, Date, Text,
     ForeignKey, TIMESTAMP, SmallInteger, func, Index
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from dotenv import load_dotenv
 from sqlalchemy import BigInteger
 
@@ -24,12 +31,70 @@ DATABASE_URL = (
     f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Пул соединений (всё можно переопределить в token.env)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+# Соединение, удерживаемое дольше этого, считаем утёкшим
+DB_LEAK_SECONDS = float(os.getenv("DB_LEAK_SECONDS", "60"))
+
+log = logging.getLogger("database")
+
 # Инициализация SQLAlchemy
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
-# Хелпер для получения сессии
+
+# ─────────────────── Сессии ───────────────────
+@contextmanager
+def session_scope():
+    """
+    Сессия с гарантированным закрытием; при исключении — rollback.
+    Коммит остаётся за вызывающим кодом:
+
+        with session_scope() as db:
+            ...
+            db.commit()
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def db_session():
+    """
+    То же для корутин: async with db_session() as db: ...
+    Закрытие (возврат соединения в пул с ROLLBACK) выполняется в потоке.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except BaseException:
+        await asyncio.to_thread(db.rollback)
+        raise
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+# Хелпер для получения сессии (старый API; в новом коде — session_scope/db_session)
 def get_db():
     """
     Генератор, возвращающий сессию SQLAlchemy.
@@ -41,6 +106,90 @@ def get_db():
     finally:
         db.close()
 
+
+def warm_pool(n: int | None = None) -> int:
+    """Открывает n соединений заранее, чтобы первые команды не ждали подключения."""
+    n = min(n or DB_POOL_SIZE, DB_POOL_SIZE)
+    conns = []
+    try:
+        for _ in range(n):
+            conns.append(engine.connect())
+    finally:
+        for c in conns:
+            c.close()
+    return len(conns)
+
+
+# ─────────────────── Насыщение пула и утечки ───────────────────
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SKIP = (os.path.abspath(__file__), os.sep + "venv" + os.sep, os.sep + "site-packages" + os.sep)
+
+# id(connection_record) → (время выдачи, место вызова)
+_checked_out: dict[int, tuple[float, str]] = {}
+_checked_out_lock = threading.Lock()
+POOL_STATS = {"checkouts": 0, "saturated": 0, "leaks_reported": 0}
+_last_saturation_log = 0.0
+
+
+def _caller() -> str:
+    # ближайший кадр в коде бота; обход кадров дешевле traceback.extract_stack
+    f = sys._getframe(2)
+    for _ in range(60):
+        if f is None:
+            break
+        fn = f.f_code.co_filename
+        if fn.startswith(_ROOT) and not any(x in fn for x in _SKIP):
+            return f"{os.path.relpath(fn, _ROOT)}:{f.f_lineno} {f.f_code.co_name}"
+        f = f.f_back
+    return "?"
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_conn, record, proxy):
+    global _last_saturation_log
+    where = _caller()
+    pool = engine.pool
+    saturated = pool.checkedout() >= DB_POOL_SIZE + DB_MAX_OVERFLOW
+    now = time.monotonic()
+    # checkout приходит из разных потоков (asyncio.to_thread) — счётчики под тем же замком
+    with _checked_out_lock:
+        _checked_out[id(record)] = (now, where)
+        POOL_STATS["checkouts"] += 1
+        report = False
+        if saturated:
+            POOL_STATS["saturated"] += 1
+            if now - _last_saturation_log > 10:
+                _last_saturation_log = now
+                report = True
+    if report:
+        log.warning(
+            "Пул БД исчерпан: %d/%d соединений выдано, новые запросы ждут до %.0f c",
+            pool.checkedout(), DB_POOL_SIZE + DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+        )
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_conn, record):
+    with _checked_out_lock:
+        _checked_out.pop(id(record), None)
+
+
+def find_leaks(max_age: float = DB_LEAK_SECONDS) -> list[tuple[float, str]]:
+    """Соединения, которые держат дольше max_age секунд: [(возраст, место выдачи), ...]."""
+    now = time.monotonic()
+    with _checked_out_lock:
+        held = list(_checked_out.values())
+    return sorted(((now - t, where) for t, where in held if now - t > max_age), reverse=True)
+
+
+async def monitor_pool(interval: float = 30):
+    """Периодически сообщает об утёкших сессиях (соединение не вернули в пул)."""
+    while True:
+        await asyncio.sleep(interval)
+        for age, where in find_leaks():
+            POOL_STATS["leaks_reported"] += 1
+            log.warning("Соединение с БД удерживается %.0f c — возможна утечка сессии: %s", age, where)
+
 # ─────────────────── Модели ───────────────────
 class User(Base):
     __tablename__ = 'users'
@@ -124,6 +273,12 @@ class RPEntry(Base):
 
 class ActivityReport(Base):
     __tablename__ = 'activity_reports'
+    __table_args__ = (
+        Index('uq_activity_reports_source_message_id', 'source_message_id', unique=True),
+        Index('ix_activity_reports_user_hash', 'user_id', 'content_hash'),
+        # «есть ли отчёт не раньше даты» и «последний отчёт» — по индексу, без чтения таблицы
+        Index('ix_activity_reports_user_date', 'user_id', 'date'),
+    )
     id         = Column(Integer, primary_key=True, index=True)
     user_id    = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     document_number           = Column(String(64), nullable=True)
@@ -134,6 +289,9 @@ class ActivityReport(Base):
     specialization_assessment = Column(Text, nullable=True)
     date                      = Column(Date, nullable=False, index=True)
     thread_id                 = Column(BigInteger, nullable=True)
+    status_message_id         = Column(BigInteger, nullable=True)
+    source_message_id         = Column(BigInteger, nullable=True)
+    content_hash              = Column(String(64), nullable=True)
 
     # связь
     user = relationship('User', back_populates='activity_reports')
@@ -141,6 +299,11 @@ class ActivityReport(Base):
 
 class InterrogationReport(Base):
     __tablename__ = 'interrogation_reports'
+    __table_args__ = (
+        Index('uq_interrogation_reports_source_message_id', 'source_message_id', unique=True),
+        Index('ix_interrogation_reports_user_hash', 'user_id', 'content_hash'),
+        Index('ix_interrogation_reports_user_date', 'user_id', 'date'),
+    )
     id           = Column(Integer, primary_key=True, index=True)
     user_id      = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     document_number = Column(String(64), nullable=True)
@@ -153,6 +316,8 @@ class InterrogationReport(Base):
     content3     = Column(Text, nullable=True)
     verdict      = Column(Text, nullable=True)
     thread_id    = Column(BigInteger, nullable=True)
+    source_message_id = Column(BigInteger, nullable=True)
+    content_hash = Column(String(64), nullable=True)
 
     # связь
     user = relationship('User', back_populates='interrogation_reports')
@@ -181,6 +346,10 @@ class Warning(Base):
 
 class Vacation(Base):
     __tablename__ = 'vacations'
+    __table_args__ = (
+        # частичный индекс: сборщик истёкших отпусков смотрит только на активные строки
+        Index('ix_vacations_active_end_at', 'end_at', postgresql_where=text('active')),
+    )
     id       = Column(Integer, primary_key=True, index=True)
     user_id  = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     start_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
@@ -191,10 +360,67 @@ class Vacation(Base):
     user = relationship('User', back_populates='vacations')
 
 
+class WeekSnapshot(Base):
+    """Итоги недели по участнику, замороженные в момент смены недели (см. weekly.py)."""
+    __tablename__ = 'weekly_snapshots'
+    __table_args__ = (
+        Index('uq_weekly_snapshots_week_member', 'week_start', 'discord_id', unique=True),
+        Index('ix_weekly_snapshots_member_week', 'discord_id', 'week_start'),
+    )
+    id          = Column(Integer, primary_key=True)
+    week_start  = Column(Date, nullable=False)
+    discord_id  = Column(BigInteger, nullable=False)
+    user_id     = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    duties      = Column(Integer, nullable=False, default=0)
+    interviews  = Column(Integer, nullable=False, default=0)
+    passed      = Column(Boolean, nullable=False)            # норма выполнена
+    on_vacation = Column(Boolean, nullable=False, default=False)
+    role_ids    = Column(ARRAY(BigInteger), nullable=False)  # звание, должности, штаты на момент снимка
+    created_at  = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Изменения схемы для уже существующих таблиц (create_all их не добавляет)
+SCHEMA_UPGRADES = [
+    "ALTER TABLE activity_reports ADD COLUMN IF NOT EXISTS source_message_id BIGINT",
+    "ALTER TABLE interrogation_reports ADD COLUMN IF NOT EXISTS source_message_id BIGINT",
+    "ALTER TABLE activity_reports ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE interrogation_reports ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    # перед уникальным индексом убираем дубли, оставляя самую раннюю запись
+    "DELETE FROM activity_reports a USING activity_reports b "
+    "WHERE a.source_message_id = b.source_message_id AND a.id > b.id",
+    "DELETE FROM interrogation_reports a USING interrogation_reports b "
+    "WHERE a.source_message_id = b.source_message_id AND a.id > b.id",
+    "DROP INDEX IF EXISTS ix_activity_reports_source_message_id",
+    "DROP INDEX IF EXISTS ix_interrogation_reports_source_message_id",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_activity_reports_source_message_id "
+    "ON activity_reports (source_message_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_interrogation_reports_source_message_id "
+    "ON interrogation_reports (source_message_id)",
+    "CREATE INDEX IF NOT EXISTS ix_activity_reports_user_hash "
+    "ON activity_reports (user_id, content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_interrogation_reports_user_hash "
+    "ON interrogation_reports (user_id, content_hash)",
+    "ALTER TABLE activity_reports ADD COLUMN IF NOT EXISTS status_message_id BIGINT",
+    "CREATE INDEX IF NOT EXISTS ix_vacations_active_end_at ON vacations (end_at) WHERE active",
+    "CREATE INDEX IF NOT EXISTS ix_activity_reports_user_date "
+    "ON activity_reports (user_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_interrogation_reports_user_date "
+    "ON interrogation_reports (user_id, date)",
+]
+
+
+def upgrade_db():
+    with engine.begin() as conn:
+        for stmt in SCHEMA_UPGRADES:
+            conn.exec_driver_sql(stmt)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade_db()
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     init_db()
-    print('📦 Таблицы созданы')
+    log.info('📦 Таблицы созданы')
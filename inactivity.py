@@ -0,0 +1,75 @@
+# inactivity.py
+#
+# Кто из отчётных званий и штатов давно не сдавал отчёт о деятельности.
+# Состав берётся из индекса ролей (одним проходом по участникам сервера),
+# дальше — один запрос: unnest(id) с анти-соединением NOT EXISTS по
+# activity_reports (user_id, date) и по действующим отпускам. Таблица
+# отчётов не сканируется: оба подзапроса — поиск по индексу на участника.
+
+import datetime
+from dataclasses import dataclass
+
+import discord
+from sqlalchemy import BigInteger, and_, bindparam, exists, func, nulls_first, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from database import session_scope, User, ActivityReport, Vacation
+from roles import index
+from roles.constants import REPORT_ROLE_IDS
+
+
+@dataclass
+class InactiveMember:
+    discord_id: int
+    call_sign: str | None          # None — участника нет в БД
+    last_report: datetime.date | None
+
+    def weeks_silent(self, today: datetime.date) -> int | None:
+        return None if self.last_report is None else (today - self.last_report).days // 7
+
+
+def report_members(guild: discord.Guild) -> list[int]:
+    """discord id участников с отчётным званием или штатом, кроме тех, у кого роль отпуска."""
+    out = []
+    for member in guild.members:
+        profile = index.classify_member(member)
+        if profile.vacation:
+            continue
+        if any(info is not None and info.role_id in REPORT_ROLE_IDS for info in (profile.rank, *profile.corps)):
+            out.append(member.id)
+    return out
+
+
+def find_inactive(discord_ids, since: datetime.date) -> list[InactiveMember]:
+    """
+    Участники из discord_ids без единого отчёта о деятельности начиная с since
+    и без действующего отпуска. Сначала те, кто не сдавал дольше всех.
+    """
+    if not discord_ids:
+        return []
+    roster = (
+        func.unnest(bindparam("ids", list(discord_ids), type_=ARRAY(BigInteger)))
+        .table_valued("discord_id")
+        .render_derived(name="roster")
+    )
+    reported = exists().where(ActivityReport.user_id == User.id, ActivityReport.date >= since)
+    on_vacation = exists().where(
+        Vacation.user_id == User.id,
+        Vacation.active.is_(True),
+        Vacation.end_at >= func.now()
+    )
+    last_report = (
+        select(func.max(ActivityReport.date))
+        .where(ActivityReport.user_id == User.id)
+        .scalar_subquery()
+        .label("last_report")
+    )
+    stmt = (
+        select(roster.c.discord_id, User.call_sign, last_report)
+        .select_from(roster)
+        .outerjoin(User, User.discord_id == roster.c.discord_id)
+        .where(and_(~reported, ~on_vacation))
+        .order_by(nulls_first(last_report.asc()), roster.c.discord_id)
+    )
+    with session_scope() as db:
+        return [InactiveMember(*row) for row in db.execute(stmt).all()]
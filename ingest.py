@@ -0,0 +1,537 @@
+# ingest.py
+#
+# Write-behind очередь для приёма отчётов активности и допросов.
+# Events только разбирает сообщение и ставит задачу в очередь, а фоновый
+# воркер пачкой пишет накопленные отчёты в БД — одна транзакция на интервал.
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal, User, ActivityReport, InterrogationReport
+
+log = logging.getLogger("ingest")
+
+
+# ─────────────────── Разбор отчётов ───────────────────
+def extract_report_text(message) -> str:
+    """Собирает текст отчёта из content и первого embed'а сообщения."""
+    raw = message.content or ""
+    if message.embeds:
+        e = message.embeds[0]
+        if e.description:
+            raw += "\n" + e.description
+        for f in e.fields:
+            raw += f"\n{f.name}\n{f.value}"
+    return raw
+
+
+def report_hash(raw: str) -> str:
+    """Хэш текста отчёта без учёта регистра и пробелов — одинаков у репостов."""
+    norm = " ".join(raw.split()).casefold()
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+
+def upsert_report(model, values: dict, *, update: tuple[str, ...], returning=()):
+    """
+    INSERT … ON CONFLICT (source_message_id) DO UPDATE для таблиц отчётов.
+    Повторная обработка того же сообщения обновляет строку, а не плодит новую;
+    колонка inserted в RETURNING отличает вставку от обновления.
+    """
+    stmt = pg_insert(model).values(**values)
+    if values.get("source_message_id") is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.source_message_id],
+            set_={col: stmt.excluded[col] for col in update}
+        )
+    return stmt.returning(
+        model.id, *returning, literal_column("(xmax = 0)").label("inserted")
+    )
+
+
+def parse_activity_report(text: str) -> tuple[str, int, datetime.date] | None:
+    parts = text.split('[Ваш позывной]')
+    if len(parts) < 2:
+        return None
+    call_sign = next(
+        (l.strip() for l in parts[1].splitlines()
+         if l.strip() and not l.strip().startswith('Идентификационный номер')),
+        None
+    )
+    if not call_sign:
+        return None
+
+    parts = text.split('[Количество Активных Дежурств в течении Недели]')
+    if len(parts) < 2:
+        return None
+    duties = next(
+        (int(l.strip()) for l in parts[1].splitlines() if l.strip().isdigit()),
+        None
+    )
+    if duties is None:
+        return None
+
+    date = None
+    parts = text.split('[Дата заполнения]')
+    if len(parts) > 1:
+        for l in parts[1].splitlines():
+            s = l.strip()
+            if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
+                try:
+                    date = datetime.datetime.strptime(s, '%Y-%m-%d').date()
+                    break
+                except Exception:
+                    pass
+    if date is None:
+        return None
+    return call_sign, duties, date
+
+
+def parse_interrogation_report(text: str) -> tuple[str, datetime.date] | None:
+    parts = text.split('[Ваш позывной]')
+    if len(parts) < 2:
+        return None
+    call_sign = next(
+        (l.strip() for l in parts[1].splitlines()
+         if l.strip() and not l.strip().startswith('Идентификационный номер')),
+        None
+    )
+    if not call_sign:
+        return None
+
+    date = None
+    parts = text.split('[Дата]')
+    if len(parts) > 1:
+        for l in parts[1].splitlines():
+            s = l.strip()
+            if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
+                try:
+                    date = datetime.datetime.strptime(s, '%Y-%m-%d').date()
+                    break
+                except Exception:
+                    pass
+    if date is None:
+        return None
+    return call_sign, date
+
+
+@dataclass
+class ReportJob:
+    """Задача на запись одного отчёта."""
+    kind: str                              # 'activity' или 'interrogation'
+    discord_id: int
+    call_sign: str
+    date: datetime.date
+    duties: int = 0
+    # id исходного сообщения в канале отчётов
+    message_id: int | None = None
+    # хэш нормализованного текста — для отсева репостов
+    content_hash: str | None = None
+    # True — это правка сообщения (если оно ещё не учтено — пишется как новый отчёт)
+    edit: bool = False
+
+
+@dataclass
+class ReportDeleteJob:
+    """Удаление отчёта вместе с исходным сообщением."""
+    kind: str
+    message_id: int
+
+
+@dataclass
+class ThreadLinkJob:
+    """Привязка треда (и сообщения со статусом) к сохранённому отчёту."""
+    kind: str
+    report_id: int
+    thread_id: int
+    status_message_id: int | None = None
+
+
+@dataclass
+class IngestResult:
+    """Итог записи: id созданного отчёта и актуальные счётчики."""
+    report_id: int
+    duties: int = 0
+    interviews: int = 0
+    # для допроса: отчёты активности той же недели, у которых вырос interviews
+    verdicts: list["VerdictUpdate"] = field(default_factory=list)
+    # False — отчёт уже был (повторная доставка, правка или репост)
+    created: bool = True
+
+
+@dataclass
+class VerdictUpdate:
+    """Актуальное состояние отчёта активности для правки статуса в треде."""
+    report_id: int
+    thread_id: int | None
+    status_message_id: int | None
+    duties: int
+    interviews: int
+    discord_id: int
+
+
+@dataclass
+class ReportDelta:
+    """Итог правки/удаления: отчёты, чей вердикт нужно перерисовать."""
+    verdicts: list[VerdictUpdate] = field(default_factory=list)
+    removed: list[VerdictUpdate] = field(default_factory=list)
+
+
+class ReportIngestQueue:
+    """
+    Очередь с одним воркером.
+    Порядок записи совпадает с порядком постановки, поэтому отчёты одного
+    пользователя применяются строго последовательно. submit() возвращает
+    управление только после коммита — тред создаётся уже по сохранённому отчёту.
+    """
+
+    def __init__(self, flush_interval: float = 0.2, max_batch: int = 100):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+        # метрики
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ─────────────────── Жизненный цикл ───────────────────
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="report-ingest")
+
+    async def stop(self):
+        """Дописывает всё, что уже в очереди, и останавливает воркер."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    # ─────────────────── API ───────────────────
+    async def submit(self, job):
+        """Ставит задачу в очередь и ждёт коммита."""
+        return await self.submit_nowait(job)
+
+    def submit_nowait(self, job) -> asyncio.Future:
+        """Ставит задачу в очередь, не дожидаясь записи."""
+        if self._task is None or self._task.done():
+            raise RuntimeError("Очередь приёма отчётов не запущена")
+        fut = asyncio.get_running_loop().create_future()
+        self.submitted += 1
+        self._queue.put_nowait((job, fut))
+        return fut
+
+    def enqueue(self, job):
+        """Ставит задачу без ожидания результата; ошибки записи только логируются."""
+        fut = self.submit_nowait(job)
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "committed": self.committed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+        }
+
+    # ─────────────────── Воркер ───────────────────
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            await self._flush(batch)
+
+        # дописываем то, что успели поставить до остановки
+        rest = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                rest.append(item)
+        if rest:
+            await self._flush(rest)
+
+    async def _flush(self, batch: list):
+        jobs = [job for job, _ in batch]
+        started = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(self._write_batch, jobs)
+        except Exception as e:
+            log.exception("Ошибка записи пачки отчётов")
+            results = [e] * len(jobs)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._total_flush_ms += elapsed
+
+        for (_, fut), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, Exception):
+                self.failed += 1
+                fut.set_exception(res)
+            else:
+                self.committed += 1
+                fut.set_result(res)
+
+    # ─────────────────── Запись в БД (в отдельном потоке) ───────────────────
+    def _write_batch(self, jobs: list) -> list:
+        db = SessionLocal()
+        try:
+            users: dict[int, User] = {}
+            results = []
+            for job in jobs:
+                results.append(self._apply(db, job, users))
+                db.flush()
+            db.commit()
+            return results
+        except Exception:
+            db.rollback()
+            log.exception("Пачка из %d отчётов откатилась, пишу по одному", len(jobs))
+        finally:
+            db.close()
+
+        # изолируем сбойную задачу: остальные отчёты всё равно сохраняем
+        results = []
+        for job in jobs:
+            db = SessionLocal()
+            try:
+                res = self._apply(db, job, {})
+                db.commit()
+                results.append(res)
+            except Exception as e:
+                db.rollback()
+                log.exception("Не удалось сохранить отчёт %s", job)
+                results.append(e)
+            finally:
+                db.close()
+        return results
+
+    def _apply(self, db, job, users: dict[int, User]):
+        if isinstance(job, ThreadLinkJob):
+            return self._apply_thread_link(db, job)
+        if isinstance(job, ReportDeleteJob):
+            return self._apply_delete(db, job)
+        if job.edit:
+            return self._apply_edit(db, job, users)
+        return self._apply_report(db, job, users)
+
+    def _get_user(self, db, job: ReportJob, users: dict[int, User]) -> User:
+        # User в БД
+        db_user = users.get(job.discord_id)
+        if db_user is None:
+            db_user = db.query(User).filter_by(discord_id=job.discord_id).first()
+            if not db_user:
+                db_user = User(discord_id=job.discord_id, call_sign=job.call_sign)
+                db.add(db_user); db.flush()
+            users[job.discord_id] = db_user
+        if db_user.call_sign != job.call_sign:
+            db_user.call_sign = job.call_sign
+        return db_user
+
+    def _apply_report(self, db, job: ReportJob, users: dict[int, User]) -> IngestResult:
+        db_user = self._get_user(db, job, users)
+        model = ActivityReport if job.kind == "activity" else InterrogationReport
+
+        # репост: тот же текст от того же пользователя под другим сообщением
+        if job.content_hash:
+            dup = db.execute(
+                select(model)
+                .where(
+                    model.user_id == db_user.id,
+                    model.content_hash == job.content_hash,
+                    model.source_message_id.is_distinct_from(job.message_id)
+                )
+                .limit(1)
+            ).scalar()
+            if dup:
+                return IngestResult(
+                    report_id=dup.id,
+                    duties=getattr(dup, "duties", 0),
+                    interviews=getattr(dup, "interviews", 0),
+                    created=False
+                )
+
+        if job.kind == "activity":
+            interviews = _count_interviews(db, db_user.id, job.date)
+            row = db.execute(upsert_report(
+                ActivityReport,
+                {
+                    "user_id": db_user.id,
+                    "duties": job.duties,
+                    "interviews": interviews,
+                    "date": job.date,
+                    "source_message_id": job.message_id,
+                    "content_hash": job.content_hash,
+                },
+                update=("user_id", "duties", "date", "content_hash"),
+                returning=(ActivityReport.duties, ActivityReport.interviews)
+            )).one()
+            return IngestResult(
+                report_id=row.id,
+                duties=row.duties,
+                interviews=row.interviews,
+                created=row.inserted
+            )
+
+        row = db.execute(upsert_report(
+            InterrogationReport,
+            {
+                "user_id": db_user.id,
+                "date": job.date,
+                "source_message_id": job.message_id,
+                "content_hash": job.content_hash,
+            },
+            update=("user_id", "date", "content_hash")
+        )).one()
+
+        # повторная доставка того же сообщения не должна снова увеличивать счётчик
+        verdicts = []
+        if row.inserted:
+            changed = _shift_interviews(db, db_user.id, _week_start(job.date), +1)
+            verdicts = _verdicts(db, changed)
+        return IngestResult(report_id=row.id, verdicts=verdicts, created=row.inserted)
+
+    def _apply_thread_link(self, db, job: ThreadLinkJob) -> None:
+        model = ActivityReport if job.kind == "activity" else InterrogationReport
+        values = {"thread_id": job.thread_id}
+        if job.status_message_id is not None:
+            values["status_message_id"] = job.status_message_id
+        db.execute(update(model).where(model.id == job.report_id).values(**values))
+
+    def _apply_edit(self, db, job: ReportJob, users: dict[int, User]) -> ReportDelta | IngestResult:
+        """
+        Правка сообщения: обновляем строку и сдвигаем зависимые счётчики.
+        Строки нет (исходник не разобрался или пришёл, пока бот лежал) —
+        записываем как новый отчёт и возвращаем IngestResult.
+        """
+        model = ActivityReport if job.kind == "activity" else InterrogationReport
+        row = db.execute(
+            select(model).where(model.source_message_id == job.message_id)
+        ).scalar()
+        if row is None:
+            return self._apply_report(db, job, users)
+        if row.content_hash == job.content_hash:
+            return ReportDelta()
+
+        db_user = self._get_user(db, job, users)
+        old_key = (row.user_id, _week_start(row.date))
+        new_key = (db_user.id, _week_start(job.date))
+        row.user_id = db_user.id
+        row.date = job.date
+        row.content_hash = job.content_hash
+
+        if job.kind == "activity":
+            row.duties = job.duties
+            if old_key != new_key:
+                row.interviews = _count_interviews(db, db_user.id, job.date)
+            db.flush()
+            return ReportDelta(verdicts=_verdicts(db, [row.id]))
+
+        db.flush()
+        if old_key == new_key:
+            return ReportDelta()
+        changed = _shift_interviews(db, *old_key, -1) + _shift_interviews(db, *new_key, +1)
+        return ReportDelta(verdicts=_verdicts(db, changed))
+
+    def _apply_delete(self, db, job: ReportDeleteJob) -> ReportDelta:
+        model = ActivityReport if job.kind == "activity" else InterrogationReport
+        row = db.execute(
+            select(model).where(model.source_message_id == job.message_id)
+        ).scalar()
+        if row is None:
+            return ReportDelta()
+
+        if job.kind == "activity":
+            removed = _verdicts(db, [row.id])
+            db.delete(row)
+            return ReportDelta(removed=removed)
+
+        key = (row.user_id, _week_start(row.date))
+        db.delete(row)
+        db.flush()
+        return ReportDelta(verdicts=_verdicts(db, _shift_interviews(db, *key, -1)))
+
+
+# ─────────────────── Недельные счётчики ───────────────────
+def _week_start(date: datetime.date) -> datetime.date:
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def _count_interviews(db, user_id: int, date: datetime.date) -> int:
+    week_start = _week_start(date)
+    week_end = week_start + datetime.timedelta(days=6)
+    return (
+        db.query(func.count(InterrogationReport.id))
+          .filter(
+              InterrogationReport.user_id == user_id,
+              InterrogationReport.date.between(week_start, week_end)
+          )
+          .scalar() or 0
+    )
+
+
+def _shift_interviews(db, user_id: int, week_start: datetime.date, delta: int) -> list[int]:
+    """Сдвигает interviews у отчётов активности пользователя за неделю; возвращает их id."""
+    week_end = week_start + datetime.timedelta(days=6)
+    return list(db.scalars(
+        update(ActivityReport)
+        .where(
+            ActivityReport.user_id == user_id,
+            ActivityReport.date.between(week_start, week_end)
+        )
+        .values(interviews=func.greatest(ActivityReport.interviews + delta, 0))
+        .returning(ActivityReport.id)
+    ))
+
+
+def _verdicts(db, report_ids: list[int]) -> list[VerdictUpdate]:
+    if not report_ids:
+        return []
+    rows = db.execute(
+        select(
+            ActivityReport.id, ActivityReport.thread_id, ActivityReport.status_message_id,
+            ActivityReport.duties, ActivityReport.interviews, User.discord_id
+        )
+        .join(User, User.id == ActivityReport.user_id)
+        .where(ActivityReport.id.in_(report_ids))
+    ).all()
+    return [VerdictUpdate(*r) for r in rows]
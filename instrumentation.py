@@ -0,0 +1,248 @@
+# instrumentation.py
+#
+# Замеры слэш-команд: время выполнения, время до первого ответа (defer),
+# число и время SQL-запросов, число REST-вызовов Discord.
+# Ставится один раз через install(bot); дерево команд — InstrumentedTree.
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+
+import discord
+from discord import app_commands
+from discord.webhook.async_ import AsyncWebhookAdapter
+from sqlalchemy import event
+
+import database
+
+log = logging.getLogger("instrumentation")
+
+# Границы корзин гистограмм
+MS_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (совместима с форматом Prometheus)."""
+
+    def __init__(self, buckets=MS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя корзина — +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 2),
+            "max": round(self.max, 2),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class CommandStats:
+    """Накопленная статистика одной команды."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wall_ms = Histogram()
+        self.defer_ms = Histogram()
+        self.db_ms = Histogram()
+        self.db_queries = Histogram(COUNT_BUCKETS)
+        self.rest_calls = Histogram(COUNT_BUCKETS)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wall_ms": self.wall_ms.to_dict(),
+            "defer_ms": self.defer_ms.to_dict(),
+            "db_ms": self.db_ms.to_dict(),
+            "db_queries": self.db_queries.to_dict(),
+            "rest_calls": self.rest_calls.to_dict(),
+        }
+
+
+class Invocation:
+    """Счётчики текущего вызова команды; живёт в contextvar задачи."""
+    __slots__ = ("command", "started", "first_response", "db_queries", "db_ms", "rest_calls")
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.perf_counter()
+        self.first_response: float | None = None
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.rest_calls = 0
+
+
+COMMANDS: dict[str, CommandStats] = {}
+# все запросы/REST-вызовы процесса, включая фоновые
+TOTALS = {"db_queries": 0, "db_ms": 0.0, "rest_calls": 0}
+
+_current: contextvars.ContextVar[Invocation | None] = contextvars.ContextVar("instr_invocation", default=None)
+
+
+def current() -> Invocation | None:
+    return _current.get()
+
+
+def _finish(interaction: discord.Interaction, failed: bool):
+    inv: Invocation | None = interaction.extras.pop("_instr", None)
+    if inv is None:
+        return
+    stats = COMMANDS.setdefault(inv.command, CommandStats())
+    stats.calls += 1
+    if failed:
+        stats.errors += 1
+    stats.wall_ms.observe((time.perf_counter() - inv.started) * 1000)
+    if inv.first_response is not None:
+        stats.defer_ms.observe((inv.first_response - inv.started) * 1000)
+    stats.db_ms.observe(inv.db_ms)
+    stats.db_queries.observe(inv.db_queries)
+    stats.rest_calls.observe(inv.rest_calls)
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    """CommandTree, заводящий Invocation на каждый вызов слэш-команды."""
+
+    async def interaction_check(self, interaction: discord.Interaction, /) -> bool:
+        # во время остановки бота новые команды не принимаем
+        if getattr(self.client, "shutting_down", False):
+            if interaction.type is discord.InteractionType.application_command:
+                try:
+                    await interaction.response.send_message(
+                        "⏳ Бот перезапускается, повторите команду через минуту.", ephemeral=True
+                    )
+                except discord.HTTPException:
+                    pass
+            return False
+        if interaction.type is discord.InteractionType.application_command and interaction.command:
+            inv = Invocation(interaction.command.qualified_name)
+            interaction.extras["_instr"] = inv
+            _current.set(inv)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError, /):
+        _finish(interaction, failed=True)
+        await super().on_error(interaction, error)
+
+
+# ─────────────────── Хуки ───────────────────
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("instr_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("instr_started")
+    if not stack:
+        return
+    elapsed = (time.perf_counter() - stack.pop()) * 1000
+    TOTALS["db_queries"] += 1
+    TOTALS["db_ms"] += elapsed
+    inv = _current.get()
+    if inv is not None:
+        inv.db_queries += 1
+        inv.db_ms += elapsed
+
+
+def _count_rest(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        TOTALS["rest_calls"] += 1
+        inv = _current.get()
+        if inv is not None:
+            inv.rest_calls += 1
+        return await func(*args, **kwargs)
+    return wrapper
+
+
+def _mark_response(func):
+    # первый ответ на interaction (defer/send_message/send_modal) — это и есть time-to-defer
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        inv = self._parent.extras.get("_instr")
+        if inv is not None and inv.first_response is None:
+            inv.first_response = time.perf_counter()
+        return await func(self, *args, **kwargs)
+    return wrapper
+
+
+_installed = False
+
+
+def install(bot):
+    """Подключает замеры к боту, движку БД и REST-клиентам. Повторный вызов — no-op."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    event.listen(database.engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(database.engine, "after_cursor_execute", _after_cursor_execute)
+
+    bot.http.request = _count_rest(bot.http.request)
+    # ответы на interaction и followup'ы идут через webhook-адаптер, а не через bot.http
+    AsyncWebhookAdapter.request = _count_rest(AsyncWebhookAdapter.request)
+    for name in ("defer", "send_message", "send_modal"):
+        setattr(discord.InteractionResponse, name, _mark_response(getattr(discord.InteractionResponse, name)))
+
+    async def on_app_command_completion(interaction, command):
+        _finish(interaction, failed=False)
+
+    bot.add_listener(on_app_command_completion)
+
+
+# ─────────────────── Выгрузка ───────────────────
+def snapshot() -> dict:
+    return {
+        "generated_at": time.time(),
+        "totals": {k: round(v, 2) for k, v in TOTALS.items()},
+        "commands": {name: st.to_dict() for name, st in sorted(COMMANDS.items())},
+    }
+
+
+def dump(path: str, data: dict | None = None):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data if data is not None else snapshot(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+async def dump_periodically(path: str, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # снимок собираем в цикле событий, а пишем файл в потоке
+            await asyncio.to_thread(dump, path, snapshot())
+        except OSError:
+            log.exception("Не удалось записать %s", path)
@@ -0,0 +1,182 @@
+# logconfig.py
+#
+# Логирование бота без блокировки цикла событий: все логгеры пишут в QueueHandler,
+# а консоль и файл обслуживает QueueListener в отдельном потоке.
+# Файл LOG_PATH — JSON по строке на запись, с ротацией.
+#
+# Настройки (token.env):
+#     LOG_LEVEL=INFO
+#     LOG_LEVELS=discord=WARNING,sqlalchemy.engine=WARNING      уровни по модулям
+#     LOG_SAMPLE=events.trace=0.01                                пишем каждую 100-ю запись
+#     LOG_CONSOLE_FORMAT=text|json
+
+import json
+import logging
+import logging.handlers
+import queue
+import traceback
+from datetime import datetime, timezone
+
+# Атрибуты LogRecord, которые не считаем пользовательскими полями (extra=...)
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — один JSON-объект; поля из extra=... попадают в него как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-8s %(name)s: %(message)s")
+
+
+class SampleFilter(logging.Filter):
+    """Пропускает одну запись из every; предупреждения и ошибки — всегда."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        self.seen += 1
+        if self.seen % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение и traceback вычисляем здесь, в потоке автора записи,
+        # но не склеиваем их в msg — форматирование целиком за обработчиками слушателя
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+
+def _parse_pairs(spec: str) -> dict[str, str]:
+    pairs = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = value.strip()
+    return pairs
+
+
+_listener: logging.handlers.QueueListener | None = None
+_queue: queue.SimpleQueue | None = None
+# Логгеры со своими обработчиками (route): их записи не идут в консоль и LOG_PATH
+_routed: dict[str, logging.Handler] = {}
+
+
+def _not_routed(record: logging.LogRecord) -> bool:
+    return record.name not in _routed
+
+
+def setup_logging(
+    level: str = "INFO",
+    levels: str = "",
+    sample: str = "",
+    path: str | None = "bot.log",
+    console_format: str = "text",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5
+):
+    """Ставит QueueHandler на корневой логгер и запускает слушателя. Повторный вызов — no-op."""
+    global _listener, _queue
+    if _listener is not None:
+        return
+
+    handlers: list[logging.Handler] = []
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if console_format == "json" else TextFormatter())
+    handlers.append(console)
+    if path:
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    for h in handlers:
+        h.addFilter(_not_routed)
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_QueueHandler(q))
+    root.setLevel(level.upper())
+
+    for name, lvl in _parse_pairs(levels).items():
+        logging.getLogger(name).setLevel(lvl.upper())
+    for name, rate in _parse_pairs(sample).items():
+        # фильтр на самом логгере — отброшенная запись даже не попадает в очередь
+        logging.getLogger(name).addFilter(SampleFilter(round(1 / float(rate)) if float(rate) > 0 else 10**9))
+
+    _queue = q
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def route(name: str, handler: logging.Handler) -> logging.Logger:
+    """
+    Отдаёт логгер name только обработчику handler — через ту же очередь
+    и того же слушателя, так что запись в handler идёт не в потоке автора.
+    До setup_logging (скрипты) handler ставится на логгер напрямую.
+    """
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+    if _listener is None:
+        logger.addHandler(handler)
+        return logger
+    handler.addFilter(lambda record: record.name == name)
+    _routed[name] = handler
+    _listener.handlers = (*_listener.handlers, handler)
+    logger.addHandler(_QueueHandler(_queue))
+    return logger
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток слушателя."""
+    global _listener, _queue
+    if _listener is not None:
+        _listener.stop()
+        # поздние записи (после остановки) пишем напрямую, чтобы не копились в очереди
+        root = logging.getLogger()
+        for h in list(root.handlers):
+            if isinstance(h, _QueueHandler):
+                root.removeHandler(h)
+        root.addHandler(_listener.handlers[0])
+        for name, handler in _routed.items():
+            logger = logging.getLogger(name)
+            for h in list(logger.handlers):
+                logger.removeHandler(h)
+            logger.addHandler(handler)
+        _listener = None
+        _queue = None
@@ -0,0 +1,235 @@
+# metrics.py
+#
+# Метрики бота в текстовом формате Prometheus: GET http://METRICS_HOST:METRICS_PORT/metrics
+# Значения собираются только в момент запроса, так что в обычной работе
+# бот платит лишь за инкремент счётчиков и раз в полсекунды — за замер лага цикла.
+#
+#     curl -s localhost:9108/metrics
+
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+import database
+import instrumentation
+import watchdog
+import workers
+
+log = logging.getLogger("metrics")
+
+
+class Counter:
+    """Монотонный счётчик с метками."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class CacheStats:
+    """Попадания/промахи кэша — для доли попаданий."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+    @property
+    def ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+COUNTERS: dict[str, Counter] = {}
+CACHES: dict[str, CacheStats] = {}
+# функции, отдающие дополнительные метрики: () -> [(name, type, help, [(labels, value), ...]), ...]
+_collectors: list = []
+
+# лаг цикла событий: последний замер и гистограмма
+LOOP_LAG_MS = instrumentation.Histogram()
+_last_lag_ms = 0.0
+
+
+def counter(name: str, help: str) -> Counter:
+    if name not in COUNTERS:
+        COUNTERS[name] = Counter(name, help)
+    return COUNTERS[name]
+
+
+def cache(name: str) -> CacheStats:
+    return CACHES.setdefault(name, CacheStats())
+
+
+def register_collector(fn):
+    _collectors.append(fn)
+    return fn
+
+
+# ─────────────────── Встроенные метрики ───────────────────
+EVENTS_MESSAGES = counter(
+    "jibot_events_messages_total",
+    "Сообщения, обработанные Events.on_message, по типу канала"
+)
+
+
+def _collect_builtin(bot):
+    pool = database.engine.pool
+    samples = [
+        ("jibot_loop_lag_last_ms", "gauge", "Последний замер лага цикла событий", [({}, _last_lag_ms)]),
+        ("jibot_gateway_latency_ms", "gauge", "Задержка heartbeat gateway",
+         [({}, bot.latency * 1000 if bot.latency == bot.latency else 0)]),
+        ("jibot_asyncio_tasks", "gauge", "Незавершённые asyncio-задачи", [({}, len(asyncio.all_tasks()))]),
+        ("jibot_db_pool_checked_out", "gauge", "Выданные соединения пула БД", [({}, pool.checkedout())]),
+        ("jibot_db_pool_overflow", "gauge", "Соединения сверх pool_size", [({}, max(pool.overflow(), 0))]),
+        ("jibot_db_pool_size", "gauge", "Размер пула БД", [({}, pool.size())]),
+        ("jibot_db_pool_saturated_total", "counter", "Выдачи соединения при исчерпанном пуле",
+         [({}, database.POOL_STATS["saturated"])]),
+        ("jibot_db_pool_leaked", "gauge", "Соединения, удерживаемые дольше DB_LEAK_SECONDS",
+         [({}, len(database.find_leaks()))]),
+        ("jibot_db_queries_total", "counter", "Все SQL-запросы процесса",
+         [({}, instrumentation.TOTALS["db_queries"])]),
+        ("jibot_rest_calls_total", "counter", "Все REST-вызовы Discord",
+         [({}, instrumentation.TOTALS["rest_calls"])]),
+    ]
+
+    wd = watchdog._instance
+    if wd is not None:
+        samples += [
+            ("jibot_loop_stalls_total", "counter", "Затыки цикла дольше порога сторожа", [({}, wd.stalls)]),
+            ("jibot_loop_max_stall_ms", "gauge", "Самый долгий затык цикла", [({}, wd.max_stall_ms)]),
+        ]
+
+    sup = getattr(bot, "supervisor", None)
+    if sup is not None:
+        st = sup.stats()
+        samples += [
+            ("jibot_background_tasks", "gauge", "Работающие фоновые задачи под надзором", [({}, st["running"])]),
+            ("jibot_background_task_failures_total", "counter", "Падения фоновых задач", [({}, st["failed"])]),
+            ("jibot_background_task_restarts_total", "counter", "Перезапуски фоновых циклов", [({}, st["restarts"])]),
+            ("jibot_background_tasks_rejected_total", "counter", "Задачи, не запущенные из-за лимита",
+             [({}, st["rejected"])]),
+        ]
+
+    sched = getattr(bot, "scheduler", None)
+    if sched is not None:
+        st = sched.stats()
+        samples += [
+            ("jibot_scheduler_pending", "gauge", "Отложенные задачи в расписании", [({}, st["pending"])]),
+            ("jibot_scheduler_overdue", "gauge", "Просроченные, ещё не запущенные задачи", [({}, st["overdue"])]),
+            ("jibot_scheduler_failed_total", "counter", "Отложенные задачи с ошибкой", [({}, st["failed"])]),
+        ]
+
+    events = bot.get_cog("Events")
+    if events is not None:
+        st = events.ingest.stats()
+        samples += [
+            ("jibot_ingest_queue_depth", "gauge", "Глубина очереди записи отчётов", [({}, st["depth"])]),
+            ("jibot_ingest_last_flush_ms", "gauge", "Длительность последней записи пачки",
+             [({}, st["last_flush_ms"])]),
+            ("jibot_ingest_committed_total", "counter", "Записанные отчёты", [({}, st["committed"])]),
+            ("jibot_ingest_failed_total", "counter", "Отчёты с ошибкой записи", [({}, st["failed"])]),
+        ]
+
+    pools = {name: p.stats() for name, p in workers.POOLS.items()}
+    for key, kind, help in (
+        ("depth", "gauge", "Глубина очереди пула воркеров"),
+        ("in_flight", "gauge", "События в обработке"),
+        ("processed", "counter", "Обработанные события"),
+        ("failed", "counter", "События с ошибкой"),
+        ("delayed", "counter", "События, ждавшие места в очереди"),
+        ("shed", "counter", "Сброшенные при перегрузке события"),
+    ):
+        name = f"jibot_worker_{key}_total" if kind == "counter" else f"jibot_worker_{key}"
+        if pools:
+            samples.append((name, kind, help, [({"pool": n}, st[key]) for n, st in pools.items()]))
+
+    if CACHES:
+        samples.append((
+            "jibot_cache_hit_ratio", "gauge", "Доля попаданий в кэш",
+            [({"cache": name}, c.ratio) for name, c in CACHES.items()]
+        ))
+    return samples
+
+
+# ─────────────────── Рендер ───────────────────
+def _fmt_labels(labels) -> str:
+    items = labels.items() if isinstance(labels, dict) else labels
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+def _render_histogram(lines: list[str], name: str, help: str, series: dict):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, h in series.items():
+        cumulative = 0
+        for le, c in zip([*map(str, h.buckets), "+Inf"], h.counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_fmt_labels({**dict(labels), 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {h.sum}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+
+
+def render(bot) -> str:
+    lines: list[str] = []
+    for name, kind, help, samples in _collect_builtin(bot) + [s for fn in _collectors for s in fn()]:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_fmt_labels(labels)} {value}")
+
+    for c in COUNTERS.values():
+        lines.append(f"# HELP {c.name} {c.help}")
+        lines.append(f"# TYPE {c.name} counter")
+        for key, value in c.values.items():
+            lines.append(f"{c.name}{_fmt_labels(key)} {value}")
+
+    _render_histogram(lines, "jibot_loop_lag_ms", "Лаг цикла событий", {(): LOOP_LAG_MS})
+    _render_histogram(lines, "jibot_worker_wait_ms", "Ожидание события в очереди пула воркеров",
+                      {(("pool", n),): p.wait_ms for n, p in workers.POOLS.items()})
+    cmds = instrumentation.COMMANDS
+    _render_histogram(lines, "jibot_command_duration_ms", "Время выполнения слэш-команды",
+                      {(("command", n),): st.wall_ms for n, st in cmds.items()})
+    _render_histogram(lines, "jibot_command_defer_ms", "Время до первого ответа на команду",
+                      {(("command", n),): st.defer_ms for n, st in cmds.items()})
+    _render_histogram(lines, "jibot_command_db_ms", "Время SQL за вызов команды",
+                      {(("command", n),): st.db_ms for n, st in cmds.items()})
+    return "\n".join(lines) + "\n"
+
+
+# ─────────────────── Фоновые задачи ───────────────────
+async def monitor_loop_lag(interval: float = 0.5):
+    """Насколько позже запланированного просыпается sleep — это и есть лаг цикла."""
+    global _last_lag_ms
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        _last_lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+        LOOP_LAG_MS.observe(_last_lag_ms)
+
+
+async def start_metrics_server(bot, host: str, port: int) -> web.AppRunner:
+    async def handle(request):
+        return web.Response(text=render(bot), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Метрики доступны на http://%s:%d/metrics", host, port)
+    return runner
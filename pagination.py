@@ -0,0 +1,82 @@
+# pagination.py
+#
+# Постраничный вывод эмбедов кнопками ◀ ▶. Страница строится только
+# при переходе на неё (render(page) → Embed), листать может лишь автор
+# команды; по таймауту кнопки отключаются.
+#
+#     view = Paginator(render, page_count, author_id=interaction.user.id)
+#     await view.send(interaction.followup)
+
+from typing import Callable, Sequence
+
+import discord
+
+
+def chunk(items: Sequence, size: int) -> list[Sequence]:
+    """Делит список на страницы по size элементов (минимум одна страница)."""
+    return [items[i:i + size] for i in range(0, len(items), size)] or [items[:0]]
+
+
+class Paginator(discord.ui.View):
+    def __init__(
+        self,
+        render: Callable[[int], discord.Embed],
+        page_count: int,
+        *,
+        author_id: int,
+        timeout: float = 300
+    ):
+        super().__init__(timeout=timeout)
+        self.render = render
+        self.page_count = max(1, page_count)
+        self.author_id = author_id
+        self.page = 0
+        self.message: discord.Message | None = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.prev_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+        self.counter.label = f"{self.page + 1}/{self.page_count}"
+
+    async def send(self, target: discord.Webhook, *, ephemeral: bool = False):
+        """Отправляет первую страницу; без кнопок, если страница одна."""
+        embed = self.render(0)
+        if self.page_count == 1:
+            self.stop()
+            return await target.send(embed=embed, ephemeral=ephemeral)
+        self.message = await target.send(embed=embed, view=self, ephemeral=ephemeral, wait=True)
+        return self.message
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message("❗ Листать может только автор команды.", ephemeral=True)
+        return False
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = min(max(page, 0), self.page_count - 1)
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.render(self.page), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def counter(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException:
+            pass
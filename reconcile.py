@@ -0,0 +1,232 @@
+# reconcile.py
+#
+# Сверка ролей Discord с базой: WARN-роли ↔ warnings, чёрная метка ↔ users.black_mark,
+# роль отпуска ↔ vacations.active. Обе стороны читаются целиком (роль → множество
+# участников, БД — тремя агрегирующими запросами), расхождения считаются операциями
+# над множествами. Кто прав в каждом случае:
+#
+#   • WARN и чёрная метка — роль: ручные правки в Discord переносятся в БД;
+#     лишние младшие WARN-роли (несколько уровней сразу) снимаются;
+#   • отпуск — срок знает только БД: роль без действующего отпуска снимается,
+#     действующий отпуск без роли (роль сняли вручную) закрывается в БД.
+#
+# Исправления — одна транзакция в БД и пачка изменений ролей с ограничением темпа.
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+import discord
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import role_edits
+from database import session_scope, User, Warning, Vacation
+from roles.constants import WARN_ROLE_IDS, black_mark_id, vacation_id
+
+log = logging.getLogger("reconcile")
+
+
+@dataclass
+class RoleState:
+    members: set[int]               # все участники сервера
+    warn_levels: dict[int, list]    # discord id → уровни WARN-ролей по возрастанию
+    black_mark: set[int]
+    vacation: set[int]
+
+
+@dataclass
+class DbState:
+    warn_levels: dict[int, int]     # discord id → max(level) по warnings
+    black_mark: set[int]
+    vacation: set[int]              # есть действующий отпуск
+
+
+@dataclass
+class Discrepancies:
+    # WARN: уровень по роли ≠ уровень по БД  (discord id → (роль, БД))
+    warn_mismatch: dict[int, tuple[int, int]] = field(default_factory=dict)
+    # несколько WARN-ролей одновременно: discord id → младшие уровни, которые снимаем
+    warn_extra_roles: dict[int, list[int]] = field(default_factory=dict)
+    black_role_only: set[int] = field(default_factory=set)     # роль есть, в БД флага нет
+    black_db_only: set[int] = field(default_factory=set)       # флаг в БД, роли нет
+    vacation_role_only: set[int] = field(default_factory=set)  # роль без действующего отпуска
+    vacation_db_only: set[int] = field(default_factory=set)    # отпуск без роли
+
+    @property
+    def total(self) -> int:
+        return (
+            len(self.warn_mismatch) + len(self.warn_extra_roles)
+            + len(self.black_role_only) + len(self.black_db_only)
+            + len(self.vacation_role_only) + len(self.vacation_db_only)
+        )
+
+    def sections(self) -> list[tuple[str, list[str]]]:
+        """(заголовок, строки) для отчёта; пустые разделы опускаются."""
+        out = [
+            ("WARN: уровень роли ≠ БД", [
+                f"<@{d}> — роль {r or 'нет'}, БД {b or 'нет'}" for d, (r, b) in self.warn_mismatch.items()
+            ]),
+            ("Несколько WARN-ролей сразу", [
+                f"<@{d}> — лишние {', '.join(map(str, lv))}" for d, lv in self.warn_extra_roles.items()
+            ]),
+            ("Чёрная метка: роль без отметки в БД", [f"<@{d}>" for d in self.black_role_only]),
+            ("Чёрная метка: отметка в БД без роли", [f"<@{d}>" for d in self.black_db_only]),
+            ("Роль отпуска без действующего отпуска", [f"<@{d}>" for d in self.vacation_role_only]),
+            ("Действующий отпуск без роли", [f"<@{d}>" for d in self.vacation_db_only]),
+        ]
+        return [(title, lines) for title, lines in out if lines]
+
+
+@dataclass
+class RepairResult:
+    db_rows: int = 0
+    roles: role_edits.RoleEditResult = field(default_factory=role_edits.RoleEditResult)
+
+
+# ─────────────────── Чтение состояния ───────────────────
+def role_state(guild: discord.Guild) -> RoleState:
+    levels: dict[int, list] = {}
+    for level, rid in sorted(WARN_ROLE_IDS.items()):
+        role = guild.get_role(rid)
+        for m in (role.members if role else []):
+            levels.setdefault(m.id, []).append(level)
+
+    def holders(rid: int) -> set[int]:
+        role = guild.get_role(rid)
+        return {m.id for m in role.members} if role else set()
+
+    return RoleState(
+        members={m.id for m in guild.members},
+        warn_levels=levels,
+        black_mark=holders(black_mark_id),
+        vacation=holders(vacation_id),
+    )
+
+
+def load_db_state() -> DbState:
+    with session_scope() as db:
+        warn_levels = dict(db.execute(
+            select(User.discord_id, func.max(Warning.level))
+            .join(Warning, Warning.user_id == User.id)
+            .group_by(User.discord_id)
+        ).all())
+        black = set(db.scalars(select(User.discord_id).where(User.black_mark.is_(True))))
+        vacation = set(db.scalars(
+            select(User.discord_id).distinct()
+            .join(Vacation, Vacation.user_id == User.id)
+            .where(Vacation.active.is_(True), Vacation.end_at >= func.now())
+        ))
+    return DbState(warn_levels=warn_levels, black_mark=black, vacation=vacation)
+
+
+def diff(roles: RoleState, db: DbState) -> Discrepancies:
+    """Чистая функция: только операции над множествами, без обращений к Discord и БД."""
+    members = roles.members
+    d = Discrepancies()
+
+    db_warn = {k: v for k, v in db.warn_levels.items() if k in members}
+    for member_id in roles.warn_levels.keys() | db_warn.keys():
+        held = roles.warn_levels.get(member_id, [])
+        role_level = held[-1] if held else 0
+        if len(held) > 1:
+            d.warn_extra_roles[member_id] = held[:-1]
+        if role_level != db_warn.get(member_id, 0):
+            d.warn_mismatch[member_id] = (role_level, db_warn.get(member_id, 0))
+
+    d.black_role_only = roles.black_mark - db.black_mark
+    d.black_db_only = (db.black_mark & members) - roles.black_mark
+    d.vacation_role_only = roles.vacation - db.vacation
+    d.vacation_db_only = (db.vacation & members) - roles.vacation
+    return d
+
+
+# ─────────────────── Исправление ───────────────────
+def repair_db(d: Discrepancies, names: dict[int, str]) -> int:
+    """Переносит расхождения «роль → БД» одной транзакцией. Возвращает число затронутых строк."""
+    wanted = set(d.black_role_only) | {m for m, (r, _) in d.warn_mismatch.items() if r}
+    rows = 0
+    with session_scope() as db:
+        if wanted:
+            # недостающих пользователей создаём; занятый позывной — пропускаем строку
+            db.execute(
+                pg_insert(User)
+                .values([{"discord_id": m, "call_sign": names.get(m, str(m)), "black_mark": False} for m in wanted])
+                .on_conflict_do_nothing()
+            )
+        ids = dict(db.execute(
+            select(User.discord_id, User.id).where(User.discord_id.in_(list(
+                wanted | d.black_db_only | d.vacation_db_only | set(d.warn_mismatch)
+            )))
+        ).all())
+
+        if d.black_role_only:
+            rows += db.execute(
+                update(User).where(User.discord_id.in_(list(d.black_role_only))).values(black_mark=True)
+            ).rowcount
+        if d.black_db_only:
+            rows += db.execute(
+                update(User).where(User.discord_id.in_(list(d.black_db_only))).values(black_mark=False)
+            ).rowcount
+
+        # WARN: лишние записи выше уровня роли удаляем, недостающий уровень добавляем
+        for member_id, (role_level, db_level) in d.warn_mismatch.items():
+            uid = ids.get(member_id)
+            if uid is None:
+                continue
+            if db_level > role_level:
+                rows += db.execute(
+                    delete(Warning).where(Warning.user_id == uid, Warning.level > role_level)
+                ).rowcount
+            if role_level > db_level:
+                db.add(Warning(user_id=uid, level=role_level, issued_by=None))
+                rows += 1
+
+        if d.vacation_db_only:
+            rows += db.execute(
+                update(Vacation)
+                .where(
+                    Vacation.user_id.in_([ids[m] for m in d.vacation_db_only if m in ids]),
+                    Vacation.active.is_(True)
+                )
+                .values(active=False, end_at=func.now())
+            ).rowcount
+        db.commit()
+    return rows
+
+
+async def repair_roles(guild: discord.Guild, d: Discrepancies, interval: float) -> role_edits.RoleEditResult:
+    total = role_edits.RoleEditResult()
+    batches = [(sorted(d.vacation_role_only), vacation_id)]
+    for level, rid in WARN_ROLE_IDS.items():
+        batches.append((sorted(m for m, lv in d.warn_extra_roles.items() if level in lv), rid))
+    for member_ids, rid in batches:
+        if not member_ids:
+            continue
+        res = await role_edits.remove_role_from(
+            guild, member_ids, rid, reason="Сверка ролей с БД", interval=interval
+        )
+        total.changed += res.changed
+        total.skipped += res.skipped
+        total.failed += res.failed
+    return total
+
+
+async def run(guild: discord.Guild, *, repair: bool = False, interval: float = role_edits.DEFAULT_INTERVAL):
+    """Сверка целиком. Возвращает (расхождения до исправления, RepairResult или None)."""
+    roles = role_state(guild)
+    db = await asyncio.to_thread(load_db_state)
+    d = diff(roles, db)
+    log.info("Сверка ролей: расхождений %d", d.total)
+    if not repair or not d.total:
+        return d, None
+
+    result = RepairResult()
+    names = {m.id: m.display_name for m in guild.members}
+    result.db_rows = await asyncio.to_thread(repair_db, d, names)
+    result.roles = await repair_roles(guild, d, interval)
+    log.info(
+        "Сверка ролей: исправлено строк БД %d, ролей снято %d (ошибок %d)",
+        result.db_rows, result.roles.changed, result.roles.failed
+    )
+    return d, result
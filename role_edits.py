@@ -0,0 +1,75 @@
+# role_edits.py
+#
+# Массовые изменения ролей с ограничением темпа. Каждое снятие/выдача роли —
+# отдельный REST-запрос, и пачка из десятков запросов подряд упирается в
+# лимиты Discord; здесь запросы идут не чаще одного в interval секунд,
+# а участники, у которых уже нужное состояние, не стоят ни одного запроса.
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import discord
+
+log = logging.getLogger("role_edits")
+
+# Пауза между запросами на изменение ролей по умолчанию
+DEFAULT_INTERVAL = 0.5
+
+
+@dataclass
+class RoleEditResult:
+    changed: int = 0
+    skipped: int = 0   # роль уже в нужном состоянии или участника нет на сервере
+    failed: int = 0
+
+
+async def remove_role_from(
+    guild: discord.Guild,
+    member_ids,
+    role_id: int,
+    *,
+    reason: str,
+    interval: float = DEFAULT_INTERVAL
+) -> RoleEditResult:
+    return await _edit_role(guild, member_ids, role_id, add=False, reason=reason, interval=interval)
+
+
+async def add_role_to(
+    guild: discord.Guild,
+    member_ids,
+    role_id: int,
+    *,
+    reason: str,
+    interval: float = DEFAULT_INTERVAL
+) -> RoleEditResult:
+    return await _edit_role(guild, member_ids, role_id, add=True, reason=reason, interval=interval)
+
+
+async def _edit_role(guild, member_ids, role_id, *, add, reason, interval) -> RoleEditResult:
+    res = RoleEditResult()
+    role = guild.get_role(role_id)
+    if role is None:
+        log.warning("Роль %s не найдена на сервере %s", role_id, guild.id)
+        res.skipped = len(list(member_ids))
+        return res
+
+    first = True
+    for member_id in member_ids:
+        member = guild.get_member(member_id)
+        if member is None or (role in member.roles) == add:
+            res.skipped += 1
+            continue
+        if not first:
+            await asyncio.sleep(interval)
+        first = False
+        try:
+            if add:
+                await member.add_roles(role, reason=reason)
+            else:
+                await member.remove_roles(role, reason=reason)
+            res.changed += 1
+        except discord.HTTPException:
+            res.failed += 1
+            log.exception("Не удалось %s роль %s у %s", "выдать" if add else "снять", role_id, member_id)
+    return res
@@ -0,0 +1,140 @@
+# roles/index.py
+#
+# Классификация ролей, собранная один раз из roles/constants.py:
+# role_id → (категория, название, старшинство). Звание, должности и штат
+# участника определяются одним проходом по id его ролей — без get_role()
+# и без поиска Role в списке member.roles.
+#
+#     profile = index.classify_member(member)
+#     profile.rank_title, profile.posts, profile.corps
+
+from dataclasses import dataclass, field
+
+import discord
+
+from roles.constants import (
+    RANKS_MAP, CORPS_MAP, POST_MAP, WARN_ROLE_IDS,
+    vacation_id, black_mark_id,
+)
+
+# Категории
+RANK = "rank"
+POST = "post"
+CORPS = "corps"
+VACATION = "vacation"
+WARN = "warn"
+BLACK_MARK = "black_mark"
+
+RANK_TITLES = {
+    "arc":       "Полковник",
+    "lrc_gimel": "Подполковник GIMEL",
+    "lrc":       "Подполковник",
+    "mjr_gimel": "Майор GIMEL",
+    "mjr":       "Майор",
+    "cpt":       "Капитан",
+    "slt":       "Старший лейтенант",
+    "lt":        "Лейтенант",
+    "jlt":       "Младший лейтенант",
+}
+
+POST_TITLES = {
+    "head_ji":                "Глава JI",
+    "adjutant_ji":            "Адъютант JI",
+    "leader_office":          "Главный по бюрократической работе",
+    "leader_penal_battalion": "Главный по воспитательной работе",
+    "senate":                 "Сенат GIMEL",
+    "head_curator":           "Главный куратор",
+    "director_office":        "Директор канцелярии",
+    "leader_main_corps":      "Лидер основного корпуса",
+    "leader_gimel":           "Лидер GIMEL",
+    "cmd_elite":              "CMD.ELITE",
+    "head_ovd":               "Глава ОВД",
+    "master_office":          "Ведущий сотрудник канцелярии",
+    "worker_office":          "Сотрудник канцелярии",
+    "curator":                "Куратор",
+    "trainee_curator":        "Куратор-стажер",
+}
+
+CORPS_TITLES = {
+    "main_corps": "Основной штат",
+    "gimel":      "GIMEL",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class RoleInfo:
+    role_id: int
+    category: str
+    key: str
+    title: str
+    priority: int   # меньше — старше (порядок в словарях constants.py)
+
+    def name(self, guild: discord.Guild | None = None) -> str:
+        """Текущее имя роли на сервере, если она там есть, иначе название из индекса."""
+        role = guild.get_role(self.role_id) if guild else None
+        return role.name if role else self.title
+
+
+def _build() -> dict[int, RoleInfo]:
+    out: dict[int, RoleInfo] = {}
+    for category, mapping, titles in (
+        (RANK, RANKS_MAP, RANK_TITLES),
+        (POST, POST_MAP, POST_TITLES),
+        (CORPS, CORPS_MAP, CORPS_TITLES),
+    ):
+        for priority, (key, rid) in enumerate(mapping.items()):
+            out[rid] = RoleInfo(rid, category, key, titles.get(key, key), priority)
+    for level, rid in WARN_ROLE_IDS.items():
+        # старший уровень — меньший priority, как у званий
+        out[rid] = RoleInfo(rid, WARN, f"warn_{level}", f"WARN {level}/3", len(WARN_ROLE_IDS) - level)
+    out[vacation_id] = RoleInfo(vacation_id, VACATION, "vacation", "Отпуск", 0)
+    out[black_mark_id] = RoleInfo(black_mark_id, BLACK_MARK, "black_mark", "Чёрная метка", 0)
+    return out
+
+
+ROLE_INDEX: dict[int, RoleInfo] = _build()
+WARN_LEVELS: dict[int, int] = {rid: level for level, rid in WARN_ROLE_IDS.items()}
+
+
+@dataclass
+class Profile:
+    rank: RoleInfo | None = None
+    posts: list[RoleInfo] = field(default_factory=list)
+    corps: list[RoleInfo] = field(default_factory=list)
+    warn_level: int = 0
+    vacation: bool = False
+    black_mark: bool = False
+
+    @property
+    def rank_title(self) -> str:
+        return self.rank.title if self.rank else "Нет"
+
+
+def classify(role_ids) -> Profile:
+    """Один проход по id ролей: старшее звание, должности и штаты по старшинству, WARN, отпуск, метка."""
+    p = Profile()
+    for rid in role_ids:
+        info = ROLE_INDEX.get(rid)
+        if info is None:
+            continue
+        if info.category == RANK:
+            if p.rank is None or info.priority < p.rank.priority:
+                p.rank = info
+        elif info.category == POST:
+            p.posts.append(info)
+        elif info.category == CORPS:
+            p.corps.append(info)
+        elif info.category == WARN:
+            p.warn_level = max(p.warn_level, WARN_LEVELS[rid])
+        elif info.category == VACATION:
+            p.vacation = True
+        elif info.category == BLACK_MARK:
+            p.black_mark = True
+    p.posts.sort(key=lambda i: i.priority)
+    p.corps.sort(key=lambda i: i.priority)
+    return p
+
+
+def classify_member(member: discord.Member) -> Profile:
+    # Member._roles — id ролей участника, без построения объектов Role
+    return classify(member._roles)
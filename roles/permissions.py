@@ -0,0 +1,154 @@
+# roles/permissions.py
+#
+# Кому какие слэш-команды доступны — в одном месте. Права собираются один раз
+# при импорте: команда → frozenset id ролей, и для каждой команды сразу строится
+# эмбед «Доступ запрещён». Проверка — пересечение множеств id ролей участника
+# с множеством команды, без построения объектов Role.
+#
+# Использование в коге:
+#     @permissions.check("warn")
+#     async def warn(...): ...
+#
+#     @warn.error
+#     async def warn_error(self, interaction, error):
+#         if isinstance(error, permissions.AccessDenied):
+#             return await interaction.response.send_message(embed=error.embed, ephemeral=True)
+
+import discord
+from discord import app_commands
+
+import config  # EMBLEM_URL
+from roles.constants import (
+    arc_id, lrc_gimel_id, lrc_id,
+    mjr_gimel_id, mjr_id, cpt_id,
+    head_ji_id, adjutant_ji_id,
+    leader_office_id, leader_penal_battalion_id,
+    senate_id, head_curator_id,
+    director_office_id, leader_main_corps_id, leader_gimel_id,
+    curator_id, worker_office_id, master_office_id,
+)
+
+# ─────────────────── Группы ролей ───────────────────
+# Руководство: полковники, подполковники и руководящие должности
+LEADERSHIP = (
+    arc_id, lrc_gimel_id, lrc_id,
+    head_ji_id, adjutant_ji_id,
+    leader_office_id, leader_penal_battalion_id,
+    senate_id,
+    director_office_id, leader_main_corps_id, leader_gimel_id,
+)
+OFFICE = (master_office_id, worker_office_id)
+CURATORS = (head_curator_id, curator_id)
+
+# ─────────────────── Команда → роли ───────────────────
+# Порядок ролей — порядок упоминаний в эмбеде отказа
+_COMMAND_ROLES: dict[str, tuple[int, ...]] = {
+    # роли
+    "addrole":        LEADERSHIP + CURATORS + OFFICE,
+    "removerole":     LEADERSHIP + (head_curator_id,),
+    "tempaddrole":    LEADERSHIP + (head_curator_id,),
+    "fullclearroles": LEADERSHIP,
+    "returnroles":    LEADERSHIP,
+    # дисциплина
+    "warn":           LEADERSHIP,
+    "removewarn":     LEADERSHIP,
+    "addrp": (
+        head_ji_id, adjutant_ji_id,
+        leader_office_id, leader_penal_battalion_id,
+        senate_id, head_curator_id, director_office_id,
+        arc_id, lrc_gimel_id, lrc_id,
+    ),
+    # отпуска и отчёты
+    "vacation":       LEADERSHIP + OFFICE,
+    "removevacation": LEADERSHIP + OFFICE,
+    "results":        LEADERSHIP + OFFICE,
+    "denied":         LEADERSHIP + OFFICE,
+    "inactive":       LEADERSHIP + OFFICE,
+    # кураторы
+    "assigncurator":  LEADERSHIP + CURATORS,
+    "removecurator":  LEADERSHIP + CURATORS,
+    "whoiscurator":   LEADERSHIP + CURATORS,
+    "mentees":        LEADERSHIP + CURATORS,
+    "curatorload":    LEADERSHIP + CURATORS,
+    "reassigncurator":    LEADERSHIP + (head_curator_id,),
+    "distributementees":  LEADERSHIP + (head_curator_id,),
+    # информация
+    "info": (
+        arc_id, lrc_gimel_id, lrc_id,
+        mjr_gimel_id, mjr_id, cpt_id,
+        head_ji_id, adjutant_ji_id,
+        leader_office_id, leader_penal_battalion_id, senate_id,
+        director_office_id, leader_main_corps_id, leader_gimel_id,
+        curator_id, worker_office_id, master_office_id,
+    ),
+    "bindsteam":      LEADERSHIP,
+    "steamid":        LEADERSHIP,
+    "unbindsteam":    LEADERSHIP,
+    # обслуживание бота
+    "backfill":       LEADERSHIP,
+    "botstats":       LEADERSHIP,
+    "tasks":          LEADERSHIP,
+    "reconcile":      LEADERSHIP,
+}
+_COMMAND_ROLES["removerp"] = _COMMAND_ROLES["addrp"]
+
+PERMISSIONS: dict[str, frozenset[int]] = {
+    name: frozenset(roles) for name, roles in _COMMAND_ROLES.items()
+}
+
+
+def _denial_embed(role_ids: tuple[int, ...]) -> discord.Embed:
+    em = discord.Embed(
+        title="❌ Доступ запрещён",
+        description="Вы не имеете доступа к этой команде.",
+        color=discord.Color.red()
+    )
+    em.set_thumbnail(url=config.EMBLEM_URL)
+    em.add_field(
+        name="Доступ имеют следующие роли:",
+        value=" ".join(f"<@&{rid}>" for rid in dict.fromkeys(role_ids)) or "—",
+        inline=False
+    )
+    return em
+
+
+DENIAL_EMBEDS: dict[str, discord.Embed] = {
+    name: _denial_embed(roles) for name, roles in _COMMAND_ROLES.items()
+}
+
+
+class AccessDenied(app_commands.MissingAnyRole):
+    """Отказ по реестру прав; наследник MissingAnyRole, чтобы старые проверки isinstance работали."""
+
+    def __init__(self, command: str):
+        super().__init__(list(_COMMAND_ROLES[command]))
+        self.command = command
+        self.embed = DENIAL_EMBEDS[command]
+
+
+def member_role_ids(interaction: discord.Interaction) -> frozenset[int]:
+    """id ролей автора взаимодействия; считается один раз на interaction."""
+    cached = interaction.extras.get("role_ids")
+    if cached is None:
+        user = interaction.user
+        # Member._roles — отсортированный массив id, без создания объектов Role
+        cached = frozenset(user._roles) if isinstance(user, discord.Member) else frozenset()
+        interaction.extras["role_ids"] = cached
+    return cached
+
+
+def allowed(command: str, interaction: discord.Interaction) -> bool:
+    return not PERMISSIONS[command].isdisjoint(member_role_ids(interaction))
+
+
+def check(command: str):
+    """Проверка доступа для app_commands по реестру PERMISSIONS."""
+    if command not in PERMISSIONS:
+        raise KeyError(f"Команда {command!r} отсутствует в реестре прав")
+
+    def predicate(interaction: discord.Interaction) -> bool:
+        if allowed(command, interaction):
+            return True
+        raise AccessDenied(command)
+
+    return app_commands.check(predicate)
@@ -0,0 +1,212 @@
+# rules.py
+#
+# Недельная норма (дежурства и допросы) — правила вместо зашитого
+# «duties >= 3 and interviews >= 1». Правила читаются из JSON
+# (config.NORM_RULES_PATH); без файла действует норма по умолчанию.
+#
+#     {
+#       "default": {"duties": 3, "interviews": 1},
+#       "rules": [
+#         {"rank": "cpt", "duties": 2},
+#         {"corps": "gimel", "interviews": 2},
+#         {"post": "curator", "duties": 1, "interviews": 0}
+#       ]
+#     }
+#
+# Ключи — из RANKS_MAP, CORPS_MAP и POST_MAP. Каждый порог берётся из самого
+# конкретного правила, где он задан: должность > штат > звание > default;
+# при равенстве — старшая роль (порядок в constants.py). Неизвестный ключ
+# или порог — ValueError при загрузке.
+#
+# Норма зависит только от того, какие роли с правилами есть у участника,
+# поэтому при пакетной оценке она вычисляется один раз на сочетание таких
+# ролей, а не на каждого участника. Для SQL (curators.py) нестандартные нормы
+# передаются одной производной таблицей unnest(id, дежурства, допросы).
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+import discord
+from sqlalchemy import BigInteger, Integer, and_, bindparam, func
+from sqlalchemy.dialects.postgresql import ARRAY
+
+import config  # NORM_RULES_PATH
+from roles.constants import RANKS_MAP, CORPS_MAP, POST_MAP
+
+log = logging.getLogger("rules")
+
+# Специфичность: чем больше, тем важнее правило
+_SCOPES = (
+    ("rank", RANKS_MAP, 1),
+    ("corps", CORPS_MAP, 2),
+    ("post", POST_MAP, 3),
+)
+_THRESHOLDS = ("duties", "interviews")
+
+
+@dataclass(frozen=True, slots=True)
+class Norm:
+    duties: int
+    interviews: int
+
+    def met(self, duties: int, interviews: int) -> bool:
+        return duties >= self.duties and interviews >= self.interviews
+
+
+# Недельная норма по умолчанию
+DEFAULT_NORM = Norm(duties=3, interviews=1)
+
+
+@dataclass(frozen=True, slots=True)
+class Verdict:
+    norm: Norm
+    duties: int
+    interviews: int
+    passed: bool
+
+
+@dataclass(frozen=True, slots=True)
+class _Rule:
+    role_id: int
+    weight: tuple[int, int]         # (специфичность, -старшинство) — больше важнее
+    duties: int | None
+    interviews: int | None
+
+
+class RuleSet:
+    def __init__(self, default: Norm, rules: Iterable[_Rule] = ()):
+        self.default = default
+        self._by_role: dict[int, _Rule] = {}
+        for rule in rules:
+            prev = self._by_role.get(rule.role_id)
+            if prev is not None:
+                # два правила на одну роль — сливаем, позднее переопределяет
+                rule = _Rule(
+                    rule.role_id, rule.weight,
+                    prev.duties if rule.duties is None else rule.duties,
+                    prev.interviews if rule.interviews is None else rule.interviews,
+                )
+            self._by_role[rule.role_id] = rule
+        self._memo: dict[frozenset[int], Norm] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_role)
+
+    def _resolve(self, matched: frozenset[int]) -> Norm:
+        norm = self._memo.get(matched)
+        if norm is None:
+            ordered = sorted((self._by_role[rid] for rid in matched), key=lambda r: r.weight, reverse=True)
+            values = {}
+            for name in _THRESHOLDS:
+                picked = next((getattr(r, name) for r in ordered if getattr(r, name) is not None), None)
+                values[name] = getattr(self.default, name) if picked is None else picked
+            norm = self._memo[matched] = Norm(**values)
+        return norm
+
+    def norm_for(self, role_ids: Iterable[int]) -> Norm:
+        """Норма для участника с такими ролями."""
+        if not self._by_role:
+            return self.default
+        return self._resolve(frozenset(rid for rid in role_ids if rid in self._by_role))
+
+    def norm_for_member(self, member: discord.abc.User | None) -> Norm:
+        # Member._roles — id ролей участника, без построения объектов Role;
+        # не участник сервера (User, None) — норма по умолчанию
+        return self.norm_for(getattr(member, "_roles", ()))
+
+    def verdict(self, norm: Norm, duties: int, interviews: int) -> Verdict:
+        return Verdict(norm, duties, interviews, norm.met(duties, interviews))
+
+    def evaluate(
+        self,
+        roles: Mapping[int, Iterable[int]],
+        totals: Mapping[int, tuple[int, int]]
+    ) -> dict[int, Verdict]:
+        """
+        Вердикты по всему списку за один проход: roles — discord id → id ролей,
+        totals — discord id → (дежурств, допросов); кого нет в totals, у того нули.
+        """
+        out = {}
+        for discord_id, role_ids in roles.items():
+            duties, interviews = totals.get(discord_id, (0, 0))
+            out[discord_id] = self.verdict(self.norm_for(role_ids), duties, interviews)
+        return out
+
+    def guild_norms(self, guild: discord.Guild) -> dict[int, Norm]:
+        """discord id → норма для участников, у которых она отличается от default."""
+        if not self._by_role:
+            return {}
+        out = {}
+        for member in guild.members:
+            norm = self.norm_for(member._roles)
+            if norm != self.default:
+                out[member.id] = norm
+        return out
+
+    def sql_table(self, norms: Mapping[int, Norm]):
+        """Производная таблица (discord_id, duties, interviews) из нестандартных норм — для LEFT JOIN."""
+        ids = list(norms)
+        return (
+            func.unnest(
+                bindparam("norm_ids", ids, type_=ARRAY(BigInteger)),
+                bindparam("norm_duties", [norms[i].duties for i in ids], type_=ARRAY(Integer)),
+                bindparam("norm_interviews", [norms[i].interviews for i in ids], type_=ARRAY(Integer)),
+            )
+            .table_valued("discord_id", "duties", "interviews")
+            .render_derived(name="norms")
+        )
+
+    def sql_passed(self, norms_table, duties, interviews):
+        """SQL-условие «норма выполнена»; без строки в norms_table — default."""
+        return and_(
+            duties >= func.coalesce(norms_table.c.duties, self.default.duties),
+            interviews >= func.coalesce(norms_table.c.interviews, self.default.interviews),
+        )
+
+
+def _threshold(entry: dict, name: str) -> int | None:
+    value = entry.get(name)
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"{name}: ожидается неотрицательное целое, получено {value!r}")
+    return value
+
+
+def parse(data: dict) -> RuleSet:
+    default_entry = data.get("default", {})
+    default = Norm(**{
+        name: getattr(DEFAULT_NORM, name) if _threshold(default_entry, name) is None else default_entry[name]
+        for name in _THRESHOLDS
+    })
+    rules = []
+    for entry in data.get("rules", []):
+        scopes = [(scope, mapping, weight) for scope, mapping, weight in _SCOPES if scope in entry]
+        if len(scopes) != 1:
+            raise ValueError(f"Правило должно указывать ровно одно из rank/corps/post: {entry!r}")
+        scope, mapping, weight = scopes[0]
+        key = entry[scope]
+        if key not in mapping:
+            raise ValueError(f"Неизвестный {scope} {key!r} в правиле нормы")
+        seniority = list(mapping).index(key)
+        rules.append(_Rule(
+            mapping[key], (weight, -seniority),
+            _threshold(entry, "duties"), _threshold(entry, "interviews"),
+        ))
+    return RuleSet(default, rules)
+
+
+def load(path: str | None) -> RuleSet:
+    """Правила из JSON-файла; нет файла — только норма по умолчанию."""
+    if not path or not os.path.exists(path):
+        return RuleSet(DEFAULT_NORM)
+    with open(path, encoding="utf-8") as f:
+        ruleset = parse(json.load(f))
+    log.info("Правила нормы загружены из %s: %d ролей, default %s", path, len(ruleset), ruleset.default)
+    return ruleset
+
+
+RULES: RuleSet = load(config.NORM_RULES_PATH)
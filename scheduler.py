@@ -0,0 +1,178 @@
+# scheduler.py
+#
+# Отложенные задачи, переживающие перезапуск бота (снятие временных ролей,
+# окончание отпусков и т.п.). Задачи хранятся в JSON-файле SCHEDULER_STATE_PATH:
+# при старте загружаются, просроченные выполняются сразу после on_ready.
+#
+# Обработчики регистрируются по типу задачи, обычно в cog_load:
+#
+#     bot.scheduler.register("temprole.remove", self._expire_role)
+#     bot.scheduler.schedule("temprole.remove", run_at, {"guild_id": ..., ...})
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+from supervisor import SupervisedTask, TaskLimitReached
+
+log = logging.getLogger("scheduler")
+
+# Упавшая задача повторяется через 30 c, 1 мин, 2 мин … (не реже раза в час);
+# после MAX_ATTEMPTS неудачных попыток снимается с расписания
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+MAX_ATTEMPTS = 8
+
+
+class Scheduler:
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self.jobs: dict[str, dict] = {}          # id → {"id", "kind", "run_at", "payload"[, "attempts"]}
+        self.handlers: dict[str, callable] = {}
+        self.running: dict[str, SupervisedTask] = {}
+        self.completed = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._supervisor = None
+        self._runner = None
+        self._load()
+
+    # ─────────────────── Состояние ───────────────────
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                self.jobs = {j["id"]: j for j in json.load(f)}
+            log.info("Загружено %d отложенных задач из %s", len(self.jobs), self.state_path)
+        except (OSError, ValueError, KeyError):
+            log.exception("Не удалось прочитать %s — начинаем с пустого расписания", self.state_path)
+
+    def save(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(self.jobs.values(), key=lambda j: j["run_at"]), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.state_path)
+
+    # ─────────────────── API ───────────────────
+    def register(self, kind: str, handler):
+        """handler(payload) — корутина; вызывается, когда подходит срок задачи kind."""
+        self.handlers[kind] = handler
+        self._wakeup.set()
+
+    def schedule(self, kind: str, run_at: float, payload: dict, *, key: str | None = None) -> str:
+        """
+        Ставит задачу на момент run_at (unix time). С key повторный вызов
+        заменяет прежнюю задачу, а не добавляет вторую.
+        """
+        job_id = key or uuid.uuid4().hex
+        self.jobs[job_id] = {"id": job_id, "kind": kind, "run_at": run_at, "payload": payload}
+        self.save()
+        self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        if self.jobs.pop(job_id, None) is None:
+            return False
+        self.save()
+        self._wakeup.set()
+        return True
+
+    def pending(self, kind: str | None = None) -> list[dict]:
+        return [j for j in self.jobs.values() if kind is None or j["kind"] == kind]
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "pending": len(self.jobs),
+            "overdue": sum(1 for j in self.jobs.values() if j["run_at"] <= now and j["id"] not in self.running),
+            "running": len(self.running),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    # ─────────────────── Цикл ───────────────────
+    def start(self, supervisor, wait_until_ready=None):
+        """Цикл планировщика и сами задачи запускаются под надзором supervisor."""
+        self._supervisor = supervisor
+        if self._runner is None or self._runner.done():
+            self._runner = supervisor.spawn(
+                "scheduler", lambda: self._run(wait_until_ready), restart=True
+            )
+
+    async def stop(self, timeout: float = 10.0):
+        """Останавливает таймер, даёт выполняющимся задачам timeout секунд и сохраняет расписание."""
+        if self._runner is not None:
+            self._runner.cancel()
+            await self._runner.wait()
+            self._runner = None
+        if self.running:
+            done, pending = await asyncio.wait([h.task for h in self.running.values()], timeout=timeout)
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        # незавершённые задачи остаются в self.jobs и выполнятся после перезапуска
+        self.save()
+
+    async def _run(self, wait_until_ready):
+        if wait_until_ready is not None:
+            await wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            next_at = None
+            for job in list(self.jobs.values()):
+                if job["id"] in self.running or job["kind"] not in self.handlers:
+                    continue
+                if job["run_at"] <= now:
+                    try:
+                        self.running[job["id"]] = self._supervisor.spawn(
+                            f"job:{job['kind']}", lambda job=job: self._execute(job)
+                        )
+                    except TaskLimitReached:
+                        # задача останется в расписании; попробуем на следующем проходе
+                        next_at = now + 5 if next_at is None else min(next_at, now + 5)
+                elif next_at is None or job["run_at"] < next_at:
+                    next_at = job["run_at"]
+
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: dict):
+        try:
+            await self.handlers[job["kind"]](job["payload"])
+            self.completed += 1
+            failed = False
+        except asyncio.CancelledError:
+            # остановка бота: задача останется в расписании
+            raise
+        except Exception:
+            self.failed += 1
+            failed = True
+            log.exception("Ошибка отложенной задачи %s %s", job["kind"], job["payload"])
+        finally:
+            self.running.pop(job["id"], None)
+
+        # пока задача выполнялась, её могли отменить или заменить по тому же key —
+        # тогда в расписании уже не она, и трогать его нельзя
+        if self.jobs.get(job["id"]) is not job:
+            self._wakeup.set()
+            return
+        attempts = job.get("attempts", 0) + 1
+        if failed and attempts < MAX_ATTEMPTS:
+            delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            job["attempts"] = attempts
+            job["run_at"] = time.time() + delay
+            log.warning("Задача %s %s: попытка %d не удалась, повтор через %.0f c", job["kind"], job["id"], attempts, delay)
+        else:
+            if failed:
+                log.error("Задача %s %s снята после %d неудачных попыток", job["kind"], job["id"], attempts)
+            del self.jobs[job["id"]]
+        self.save()
+        self._wakeup.set()
@@ -0,0 +1,150 @@
+# slowlog.py
+#
+# Журнал медленных SQL-запросов. Запрос дольше SLOW_QUERY_MS попадает в лог
+# с командой/местом вызова и «формой» параметров (типы, без значений).
+# Для первого вхождения каждого отпечатка запроса в фоне снимается план:
+# EXPLAIN (ANALYZE, BUFFERS) для чтения, обычный EXPLAIN для изменяющих запросов
+# (ANALYZE выполнил бы их ещё раз). Всё пишется в SLOW_QUERY_LOG_PATH с ротацией.
+
+import logging
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+import instrumentation
+import logconfig
+
+log = logging.getLogger("slowlog")
+
+# Сколько разных отпечатков запоминаем (и, значит, максимум снятых планов)
+MAX_FINGERPRINTS = 1000
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.join(_ROOT, f) for f in ("slowlog.py", "database.py", "instrumentation.py")}
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|\?")
+_RE_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_RE_SPACE = re.compile(r"\s+")
+# изменяющие данные слова (и SELECT … FOR UPDATE, который берёт блокировки)
+_RE_WRITE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    """Текст запроса без литералов и параметров: одинаков для запросов одной формы."""
+    s = _RE_STRING.sub("?", statement)
+    s = _RE_PARAM.sub("?", s)
+    s = _RE_NUMBER.sub("?", s)
+    s = _RE_LIST.sub("(?)", s)   # IN (?, ?, ?) → IN (?)
+    return _RE_SPACE.sub(" ", s).strip()
+
+
+def read_only(fp: str) -> bool:
+    """SELECT или WITH без INSERT/UPDATE/DELETE — такой запрос можно выполнить ещё раз ради ANALYZE."""
+    return fp.upper().startswith(("SELECT", "WITH")) and not _RE_WRITE.search(fp)
+
+
+def _shape(value) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def bind_shape(parameters, executemany: bool) -> str:
+    if executemany and parameters:
+        return f"{len(parameters)} × {bind_shape(parameters[0], False)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_shape(v)}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_shape(v) for v in parameters) + ")"
+    return "—"
+
+
+def origin() -> str:
+    """Команда из instrumentation или ближайшее место вызова в коде бота."""
+    inv = instrumentation.current()
+    if inv is not None:
+        return f"/{inv.command}"
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(_ROOT) and frame.filename not in _SKIP_FILES \
+                and os.sep + "venv" + os.sep not in frame.filename:
+            return f"{os.path.relpath(frame.filename, _ROOT)}:{frame.lineno} {frame.name}"
+    return "?"
+
+
+class SlowQueryLog:
+    def __init__(self, engine, threshold_ms: float, path: str, explain: bool = True):
+        self.engine = engine
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.seen: set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slowlog-explain")
+
+        # файл пишет поток слушателя logconfig, а не поток, выполнивший запрос
+        handler = RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.file_log = logconfig.route("slowlog.file", handler)
+        self.file_log.setLevel(logging.INFO)
+
+    def install(self):
+        event.listen(self.engine, "before_cursor_execute", self._before)
+        event.listen(self.engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slowlog_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("slowlog_started")
+        if not stack:
+            return
+        elapsed = (time.perf_counter() - stack.pop()) * 1000
+        if elapsed < self.threshold_ms or conn.info.get("slowlog_explain"):
+            return
+
+        fp = fingerprint(statement)
+        where = origin()
+        shape = bind_shape(parameters, executemany)
+        log.warning("Медленный запрос %.0f мс [%s] %s | %s", elapsed, where, fp[:200], shape)
+        self.file_log.info("SLOW %.1f ms [%s] params=%s\n%s", elapsed, where, shape, fp)
+
+        if self.explain and fp not in self.seen and len(self.seen) < MAX_FINGERPRINTS:
+            self.seen.add(fp)
+            params = parameters[0] if executemany and parameters else parameters
+            self._executor.submit(self._capture_plan, fp, statement, params)
+
+    def _capture_plan(self, fp: str, statement: str, parameters):
+        # изменяющий CTE (WITH … AS (UPDATE …)) под ANALYZE выполнился бы второй раз
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if read_only(fp) else "EXPLAIN "
+        try:
+            with self.engine.connect() as conn:
+                conn.info["slowlog_explain"] = True
+                try:
+                    rows = conn.exec_driver_sql(prefix + statement, parameters or None).all()
+                finally:
+                    conn.info.pop("slowlog_explain", None)
+                    conn.rollback()
+            plan = "\n".join(r[0] for r in rows)
+            self.file_log.info("PLAN %s\n%s\n%s", prefix.strip(), fp, plan)
+        except Exception as e:
+            self.file_log.info("PLAN FAILED %s: %s\n%s", type(e).__name__, e, fp)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_instance: SlowQueryLog | None = None
+
+
+def install(engine, threshold_ms: float, path: str, explain: bool = True) -> SlowQueryLog:
+    """Подключает журнал к движку. Повторный вызов возвращает уже установленный."""
+    global _instance
+    if _instance is None:
+        _instance = SlowQueryLog(engine, threshold_ms, path, explain)
+        _instance.install()
+    return _instance
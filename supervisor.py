@@ -0,0 +1,133 @@
+# supervisor.py
+#
+# Надзор за фоновыми задачами. Задачи запускаются через TaskSupervisor.spawn:
+# упавшие циклы (restart=True) перезапускаются с экспоненциальной задержкой,
+# разовые задачи учитываются до завершения, ошибки последних задач сохраняются.
+# Общее число одновременно работающих задач ограничено max_tasks.
+# Сводка — командой /tasks и на /metrics.
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+log = logging.getLogger("supervisor")
+
+# Цикл, проработавший столько секунд без ошибок, снова перезапускается с минимальной задержкой
+HEALTHY_AFTER = 60
+
+
+class TaskLimitReached(RuntimeError):
+    pass
+
+
+class SupervisedTask:
+    """Одна задача под надзором; для restart=True — все её перезапуски."""
+
+    def __init__(self, name: str, factory, restart: bool, max_backoff: float):
+        self.name = name
+        self.factory = factory          # () -> корутина
+        self.restart = restart
+        self.max_backoff = max_backoff
+        self.state = "running"          # running | restarting | finished | failed | cancelled
+        self.restarts = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.last_error_at: float | None = None
+        self.started_at = time.time()
+        self.task = asyncio.create_task(self._run(), name=name)
+
+    async def _run(self):
+        try:
+            await self._loop()
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+
+    async def _loop(self):
+        backoff = 1.0
+        while True:
+            started = time.monotonic()
+            self.state = "running"
+            try:
+                await self.factory()
+                self.state = "finished"
+                return
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.last_error_at = time.time()
+                log.exception("Фоновая задача %s упала", self.name)
+                if not self.restart:
+                    self.state = "failed"
+                    return
+
+            if time.monotonic() - started > HEALTHY_AFTER:
+                backoff = 1.0
+            self.state = "restarting"
+            log.warning("Перезапуск %s через %.0f c", self.name, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            self.restarts += 1
+
+    def done(self) -> bool:
+        return self.task.done()
+
+    def cancel(self):
+        self.task.cancel()
+
+    async def wait(self):
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+class TaskSupervisor:
+    def __init__(self, max_tasks: int = 200, keep_failed: int = 20):
+        self.max_tasks = max_tasks
+        self.tasks: list[SupervisedTask] = []
+        self.recent_failures: deque[SupervisedTask] = deque(maxlen=keep_failed)
+        self.spawned = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def spawn(self, name: str, factory, *, restart: bool = False, max_backoff: float = 60) -> SupervisedTask:
+        """
+        Запускает factory() под надзором. restart=True — для бесконечных циклов:
+        при исключении цикл перезапускается с задержкой 1, 2, 4 … max_backoff секунд.
+        """
+        if self.running() >= self.max_tasks:
+            self.rejected += 1
+            raise TaskLimitReached(f"Достигнут предел фоновых задач ({self.max_tasks})")
+        handle = SupervisedTask(name, factory, restart, max_backoff)
+        handle.task.add_done_callback(lambda _: self._on_done(handle))
+        self.tasks.append(handle)
+        self.spawned += 1
+        return handle
+
+    def _on_done(self, handle: SupervisedTask):
+        if handle.state == "failed":
+            self.failed += 1
+            self.recent_failures.append(handle)
+        # разовые задачи после завершения не храним; постоянные циклы остаются в сводке
+        if not handle.restart and handle in self.tasks:
+            self.tasks.remove(handle)
+
+    def running(self) -> int:
+        return sum(1 for t in self.tasks if not t.done())
+
+    async def stop(self, timeout: float = 5.0):
+        """Отменяет все задачи и ждёт их завершения не дольше timeout."""
+        live = [t for t in self.tasks if not t.done()]
+        for t in live:
+            t.cancel()
+        if live:
+            await asyncio.wait([t.task for t in live], timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running(),
+            "max_tasks": self.max_tasks,
+            "spawned": self.spawned,
+            "failed": self.failed + sum(t.failures for t in self.tasks if t.restart),
+            "rejected": self.rejected,
+            "restarts": sum(t.restarts for t in self.tasks),
+        }
@@ -0,0 +1,179 @@
+# watchdog.py
+#
+# Сторож цикла событий. Корутина-«пульс» отмечается каждые HEARTBEAT секунд,
+# отдельный поток проверяет, давно ли был пульс. Если цикл не отвечает дольше
+# порога — снимаем стек потока цикла через sys._current_frames() и пишем в лог,
+# какой cog и какой обработчик его держит.
+#
+# С WATCHDOG_PROFILE_PATH поток дополнительно постоянно сэмплирует стек цикла
+# и раз в минуту сохраняет его в формате collapsed stacks (flamegraph.pl, speedscope):
+#
+#     flamegraph.pl loop_stacks.txt > loop.svg
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+log = logging.getLogger("watchdog")
+
+HEARTBEAT = 0.1
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_COMMANDS = os.path.join(_ROOT, "commands") + os.sep
+_VENV = os.sep + "venv" + os.sep
+
+
+def _frames(frame) -> list:
+    """Кадры от корня к вершине стека."""
+    out = []
+    while frame is not None:
+        out.append(frame)
+        frame = frame.f_back
+    out.reverse()
+    return out
+
+
+def _label(frame) -> str:
+    fn = frame.f_code.co_filename
+    if fn.startswith(_ROOT) and _VENV not in fn:
+        fn = os.path.relpath(fn, _ROOT)
+    else:
+        fn = os.path.basename(fn)
+    return f"{fn}:{frame.f_code.co_name}"
+
+
+def culprit(frames: list) -> str:
+    """Самый глубокий кадр в commands/ (cog и обработчик), иначе — в коде бота."""
+    own = None
+    for f in reversed(frames):
+        fn = f.f_code.co_filename
+        if fn.startswith(_COMMANDS):
+            # co_qualname (3.11+) уже содержит класс cog'а: "ResultsCog.slash_results"
+            name = getattr(f.f_code, "co_qualname", f.f_code.co_name)
+            return f"{name} ({os.path.relpath(fn, _ROOT)}:{f.f_lineno})"
+        if own is None and fn.startswith(_ROOT) and _VENV not in fn:
+            own = f"{os.path.relpath(fn, _ROOT)}:{f.f_lineno} {f.f_code.co_name}"
+    return own or "вне кода бота"
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        threshold_ms: float,
+        profile_path: str | None = None,
+        sample_hz: float = 50,
+        flush_interval: float = 60
+    ):
+        self.loop = loop
+        self.threshold = threshold_ms / 1000
+        self.profile_path = profile_path
+        self.sample_interval = 1 / sample_hz if sample_hz > 0 else HEARTBEAT
+        self.flush_interval = flush_interval
+
+        self.stalls = 0
+        self.max_stall_ms = 0.0
+        self.samples: Counter[str] = Counter()
+
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._beat_task: asyncio.Task | None = None
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()  # вызывается из потока цикла
+        self._last_beat = time.monotonic()
+        self._beat_task = self.loop.create_task(self._heartbeat(), name="watchdog-heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._beat_task:
+            self._beat_task.cancel()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self.profile_path:
+            self._write_profile()
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(HEARTBEAT)
+
+    # ─────────────────── Поток сторожа ───────────────────
+    def _loop_frames(self) -> list:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return _frames(frame) if frame is not None else []
+
+    def _watch(self):
+        interval = self.sample_interval if self.profile_path else HEARTBEAT
+        stall_started = None
+        reported = None
+        last_flush = time.monotonic()
+
+        while not self._stop.wait(interval):
+            now = time.monotonic()
+            lag = now - self._last_beat - HEARTBEAT
+
+            if self.profile_path:
+                frames = self._loop_frames()
+                if frames:
+                    self.samples[";".join(_label(f) for f in frames)] += 1
+                if now - last_flush >= self.flush_interval:
+                    last_flush = now
+                    self._write_profile()
+
+            if lag > self.threshold:
+                if stall_started is None:
+                    stall_started = self._last_beat
+                    self.stalls += 1
+                frames = self._loop_frames()
+                where = culprit(frames)
+                # один и тот же затык не дублируем на каждой проверке
+                if where != reported:
+                    reported = where
+                    log.warning(
+                        "Цикл событий заблокирован %.0f мс: %s\n%s",
+                        lag * 1000, where,
+                        "\n".join(f"  {_label(f)}:{f.f_lineno}" for f in frames[-15:])
+                    )
+            elif stall_started is not None:
+                total_ms = (self._last_beat - stall_started) * 1000
+                self.max_stall_ms = max(self.max_stall_ms, total_ms)
+                log.warning("Цикл событий снова отвечает, затык длился ~%.0f мс (%s)", total_ms, reported)
+                stall_started = None
+                reported = None
+
+    def _write_profile(self):
+        tmp = self.profile_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp, self.profile_path)
+        except OSError:
+            log.exception("Не удалось записать %s", self.profile_path)
+
+
+_instance: LoopWatchdog | None = None
+
+
+def start(threshold_ms: float, profile_path: str | None = None, sample_hz: float = 50) -> LoopWatchdog:
+    """Запускает сторожа для текущего цикла событий. Повторный вызов — no-op."""
+    global _instance
+    if _instance is None:
+        _instance = LoopWatchdog(asyncio.get_running_loop(), threshold_ms, profile_path, sample_hz)
+        _instance.start()
+    return _instance
+
+
+def stop():
+    global _instance
+    if _instance is not None:
+        _instance.stop()
+        _instance = None
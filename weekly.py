@@ -0,0 +1,284 @@
+# weekly.py
+#
+# Итоги недели (/results и еженедельная публикация): кто из отчётных званий
+# и штатов выполнил норму, кто в отпуске. Снимок считается одним проходом
+# по участникам сервера и одним агрегирующим запросом к БД.
+#
+# Отпечаток недели (число отчётов и md5 по (id, user_id, дежурства) за неделю) —
+# один проход по отчётам недели, по которому кэш понимает, что данные не менялись:
+# любая запись — из событий, /backfill, /denied, в том числе перенос отчёта
+# другому участнику — меняет отпечаток. Смену ролей отпечаток не видит —
+# её ловит ResultsCog.on_member_update.
+#
+# В момент смены недели снимок замораживается в weekly_snapshots (строка на
+# участника: итоги, вердикт, роли). Прошлые недели и диапазоны читаются
+# только оттуда, без пересчёта по таблицам отчётов; серии недель без нормы
+# считаются оконными функциями.
+
+import asyncio
+import datetime
+import time
+from dataclasses import dataclass, field
+
+import discord
+from sqlalchemy import String, and_, case, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+
+from database import session_scope, User, ActivityReport, InterrogationReport, WeekSnapshot
+from roles import index
+from roles.constants import REPORT_ROLE_IDS
+from rules import RULES
+
+
+def week_bounds(day: datetime.date) -> tuple[datetime.date, datetime.date]:
+    """Понедельник и воскресенье недели, в которую входит day."""
+    week_start = day - datetime.timedelta(days=day.weekday())
+    return week_start, week_start + datetime.timedelta(days=6)
+
+
+def parse_rollover(spec: str) -> tuple[int, datetime.time]:
+    """'6 23:00' → (день недели 0=пн…6=вс, время)."""
+    weekday, _, hhmm = spec.strip().partition(" ")
+    hour, _, minute = (hhmm or "00:00").partition(":")
+    return int(weekday) % 7, datetime.time(int(hour), int(minute or 0))
+
+
+def next_rollover(spec: str, now: datetime.datetime | None = None) -> datetime.datetime:
+    """Ближайший момент смены недели после now (локальное время, как date.today())."""
+    now = now or datetime.datetime.now()
+    weekday, at = parse_rollover(spec)
+    day = now.date() + datetime.timedelta(days=(weekday - now.weekday()) % 7)
+    moment = datetime.datetime.combine(day, at)
+    if moment <= now:
+        moment += datetime.timedelta(days=7)
+    return moment
+
+
+@dataclass
+class MemberResult:
+    discord_id: int
+    duties: int
+    interviews: int
+    ok: bool                # норма выполнена (rules.py; для снимка — на момент заморозки)
+
+
+@dataclass
+class WeeklySnapshot:
+    week_start: datetime.date
+    week_end: datetime.date
+    groups: list[tuple[int, list[MemberResult]]] = field(default_factory=list)   # (role_id, участники)
+    vacation: list[int] = field(default_factory=list)
+    roles: dict[int, list[int]] = field(default_factory=dict)                     # discord id → роли из индекса
+    fingerprint: tuple = ()
+    computed_at: float = field(default_factory=time.time)
+    frozen: bool = False                                                          # сохранён в weekly_snapshots
+
+    def members(self) -> dict[int, MemberResult]:
+        return {r.discord_id: r for _, rows in self.groups for r in rows}
+
+
+@dataclass
+class MemberTrend:
+    discord_id: int
+    weeks: int              # недель в диапазоне (без отпускных)
+    passed: int             # из них с нормой
+    duties: int
+    interviews: int
+    fail_streak: int        # недель без нормы подряд на конец диапазона
+    max_fail_streak: int
+
+
+# ─────────────────── Запросы ───────────────────
+def load_totals(discord_ids, week_start: datetime.date, week_end: datetime.date) -> dict[int, tuple[int, int]]:
+    """discord id → (дежурств, допросов) за неделю — один запрос на всех."""
+    if not discord_ids:
+        return {}
+    duties = (
+        select(ActivityReport.user_id, func.sum(ActivityReport.duties).label("n"))
+        .where(ActivityReport.date.between(week_start, week_end))
+        .group_by(ActivityReport.user_id)
+        .subquery()
+    )
+    interviews = (
+        select(InterrogationReport.user_id, func.count().label("n"))
+        .where(InterrogationReport.date.between(week_start, week_end))
+        .group_by(InterrogationReport.user_id)
+        .subquery()
+    )
+    stmt = (
+        select(User.discord_id, func.coalesce(duties.c.n, 0), func.coalesce(interviews.c.n, 0))
+        .outerjoin(duties, duties.c.user_id == User.id)
+        .outerjoin(interviews, interviews.c.user_id == User.id)
+        .where(User.discord_id.in_(list(discord_ids)))
+    )
+    with session_scope() as db:
+        return {d: (int(du), int(iv)) for d, du, iv in db.execute(stmt).all()}
+
+
+def _digest(*columns, order_by):
+    """md5 от строк «id:user_id:…» недели в порядке id; пустая неделя — ''."""
+    row = columns[0].cast(String)
+    for col in columns[1:]:
+        row = row.concat(":").concat(col.cast(String))
+    return func.coalesce(func.md5(func.string_agg(row, aggregate_order_by(literal(","), order_by))), "")
+
+
+def load_fingerprint(week_start: datetime.date, week_end: datetime.date) -> tuple:
+    act = (
+        select(func.count(), _digest(ActivityReport.id, ActivityReport.user_id, ActivityReport.duties, order_by=ActivityReport.id))
+        .where(ActivityReport.date.between(week_start, week_end))
+    )
+    itr = (
+        select(func.count(), _digest(InterrogationReport.id, InterrogationReport.user_id, order_by=InterrogationReport.id))
+        .where(InterrogationReport.date.between(week_start, week_end))
+    )
+    with session_scope() as db:
+        return tuple(db.execute(act).one()) + tuple(db.execute(itr).one())
+
+
+# ─────────────────── Снимок ───────────────────
+async def compute(guild: discord.Guild, week_start: datetime.date, week_end: datetime.date) -> WeeklySnapshot:
+    """Раскладывает участников по отчётным званиям/штатам одним проходом и добирает итоги из БД."""
+    groups: dict[int, list[int]] = {rid: [] for rid in REPORT_ROLE_IDS}
+    vacation: list[int] = []
+    roles: dict[int, list[int]] = {}
+    for member in guild.members:
+        profile = index.classify_member(member)
+        for info in (profile.rank, *profile.corps):
+            if info is not None and info.role_id in groups:
+                groups[info.role_id].append(member.id)
+                roles[member.id] = [i.role_id for i in (profile.rank, *profile.posts, *profile.corps) if i]
+        if profile.vacation:
+            vacation.append(member.id)
+
+    fingerprint = await asyncio.to_thread(load_fingerprint, week_start, week_end)
+    totals = await asyncio.to_thread(load_totals, list(roles), week_start, week_end)
+    verdicts = RULES.evaluate(roles, totals)
+    results = {m: MemberResult(m, v.duties, v.interviews, v.passed) for m, v in verdicts.items()}
+    return WeeklySnapshot(
+        week_start=week_start,
+        week_end=week_end,
+        groups=[
+            (rid, [results[m] for m in members])
+            for rid, members in groups.items()
+            if guild.get_role(rid) is not None
+        ],
+        vacation=vacation,
+        roles=roles,
+        fingerprint=fingerprint,
+    )
+
+
+# ─────────────────── Замороженные снимки ───────────────────
+def save_snapshot(snap: WeeklySnapshot) -> int:
+    """Записывает снимок недели в weekly_snapshots (повторная запись недели перезаписывает строки)."""
+    members = snap.members()
+    if not members:
+        return 0
+    on_vacation = set(snap.vacation)
+    with session_scope() as db:
+        user_ids = dict(db.execute(
+            select(User.discord_id, User.id).where(User.discord_id.in_(list(members)))
+        ).all())
+        stmt = pg_insert(WeekSnapshot).values([
+            {
+                "week_start": snap.week_start,
+                "discord_id": r.discord_id,
+                "user_id": user_ids.get(r.discord_id),
+                "duties": r.duties,
+                "interviews": r.interviews,
+                "passed": r.ok,
+                "on_vacation": r.discord_id in on_vacation,
+                "role_ids": snap.roles.get(r.discord_id, []),
+            }
+            for r in members.values()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["week_start", "discord_id"],
+            set_={c: stmt.excluded[c] for c in ("user_id", "duties", "interviews", "passed", "on_vacation", "role_ids")}
+        )
+        db.execute(stmt)
+        db.commit()
+    return len(members)
+
+
+def load_snapshot(week_start: datetime.date) -> WeeklySnapshot | None:
+    """Снимок прошедшей недели из weekly_snapshots; None, если неделя не сохранялась."""
+    with session_scope() as db:
+        rows = db.execute(
+            select(
+                WeekSnapshot.discord_id, WeekSnapshot.duties, WeekSnapshot.interviews, WeekSnapshot.passed,
+                WeekSnapshot.on_vacation, WeekSnapshot.role_ids, WeekSnapshot.created_at
+            )
+            .where(WeekSnapshot.week_start == week_start)
+            .order_by(WeekSnapshot.id)
+        ).all()
+    if not rows:
+        return None
+    _, week_end = week_bounds(week_start)
+    groups: dict[int, list[MemberResult]] = {rid: [] for rid in REPORT_ROLE_IDS}
+    snap = WeeklySnapshot(week_start, week_end, computed_at=rows[0].created_at.timestamp(), frozen=True)
+    for discord_id, duties, interviews, passed, on_vacation, role_ids, _ in rows:
+        held = set(role_ids)
+        result = MemberResult(discord_id, duties, interviews, passed)
+        for rid in groups:
+            if rid in held:
+                groups[rid].append(result)
+        if on_vacation:
+            snap.vacation.append(discord_id)
+        snap.roles[discord_id] = list(role_ids)
+    snap.groups = [(rid, members) for rid, members in groups.items() if members]
+    return snap
+
+
+def load_trends(first_week: datetime.date, last_week: datetime.date) -> list[MemberTrend]:
+    """
+    Итоги по участникам за диапазон недель из weekly_snapshots.
+    Отпускные недели не считаются и не прерывают серию. Серии без нормы —
+    «острова» одинаковых passed: разность двух row_number() постоянна внутри серии.
+    """
+    ws = WeekSnapshot
+    base = (
+        select(
+            ws.discord_id,
+            ws.week_start,
+            ws.passed,
+            ws.duties,
+            ws.interviews,
+            (
+                func.row_number().over(partition_by=ws.discord_id, order_by=ws.week_start)
+                - func.row_number().over(partition_by=(ws.discord_id, ws.passed), order_by=ws.week_start)
+            ).label("island"),
+            func.max(ws.week_start).over(partition_by=ws.discord_id).label("last_week"),
+        )
+        .where(ws.week_start.between(first_week, last_week), ws.on_vacation.is_(False))
+        .subquery("b")
+    )
+    islands = (
+        select(
+            base.c.discord_id,
+            base.c.passed,
+            func.count().label("length"),
+            func.max(base.c.week_start).label("ended"),
+            func.max(base.c.last_week).label("last_week"),
+            func.sum(base.c.duties).label("duties"),
+            func.sum(base.c.interviews).label("interviews"),
+        )
+        .group_by(base.c.discord_id, base.c.island, base.c.passed)
+        .subquery("i")
+    )
+    failed = ~islands.c.passed
+    stmt = (
+        select(
+            islands.c.discord_id,
+            func.sum(islands.c.length),
+            func.sum(case((islands.c.passed, islands.c.length), else_=0)),
+            func.sum(islands.c.duties),
+            func.sum(islands.c.interviews),
+            func.coalesce(func.max(case((and_(failed, islands.c.ended == islands.c.last_week), islands.c.length))), 0),
+            func.coalesce(func.max(case((failed, islands.c.length))), 0),
+        )
+        .group_by(islands.c.discord_id)
+    )
+    with session_scope() as db:
+        return [MemberTrend(*(int(v) for v in row)) for row in db.execute(stmt).all()]
@@ -0,0 +1,110 @@
+# workers.py
+#
+# Ограниченный пул обработчиков с очередью. Вместо того чтобы каждое событие
+# обрабатывалось своей корутиной (и все они разом стояли в очереди к пулу БД),
+# события кладутся в asyncio.Queue(maxsize) и разбираются фиксированным числом воркеров.
+# Если очередь полна, отправитель ждёт до put_timeout секунд, затем событие сбрасывается.
+
+import asyncio
+import logging
+import time
+
+import instrumentation
+
+log = logging.getLogger("workers")
+
+# Все пулы процесса — для /metrics
+POOLS: dict[str, "BoundedWorkerPool"] = {}
+
+
+class BoundedWorkerPool:
+    def __init__(
+        self,
+        name: str,
+        handler,
+        *,
+        concurrency: int,
+        maxsize: int,
+        put_timeout: float = 5.0
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.put_timeout = put_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._workers: list[asyncio.Task] = []
+
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.delayed = 0   # ждали места в очереди
+        self.shed = 0      # так и не дождались — сброшены
+        self.max_depth = 0
+        self.wait_ms = instrumentation.Histogram()
+        POOLS[name] = self
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self, timeout: float = 10.0):
+        """Дорабатывает очередь (не дольше timeout) и останавливает воркеров."""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                log.warning("[%s] не успели разобрать %d событий при остановке", self.name, self.queue.qsize())
+            for t in self._workers:
+                t.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+        POOLS.pop(self.name, None)
+
+    async def submit(self, *args) -> bool:
+        """Ставит событие в очередь. False — очередь так и не освободилась, событие сброшено."""
+        item = (time.perf_counter(), args)
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.delayed += 1
+            try:
+                await asyncio.wait_for(self.queue.put(item), self.put_timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                log.warning("[%s] очередь переполнена (%d), событие сброшено", self.name, self.queue.qsize())
+                return False
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    async def _worker(self):
+        while True:
+            enqueued, args = await self.queue.get()
+            self.wait_ms.observe((time.perf_counter() - enqueued) * 1000)
+            self.in_flight += 1
+            try:
+                await self.handler(*args)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                log.exception("[%s] ошибка обработчика", self.name)
+            finally:
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+            "delayed": self.delayed,
+            "shed": self.shed,
+            "max_depth": self.max_depth,
+            "wait_p95_ms": self.wait_ms.quantile(0.95),
+        }